@@ -4,14 +4,14 @@ const BACKEND_URL = process.env.NEXT_PUBLIC_BACKEND_URL || "http://localhost:800
 
 export async function POST(request: NextRequest) {
   try {
-    const { text } = await request.json()
+    const { text, persona } = await request.json()
 
     const response = await fetch(`${BACKEND_URL}/api/speech/tts`, {
       method: "POST",
       headers: {
         "Content-Type": "application/json",
       },
-      body: JSON.stringify({ text }),
+      body: JSON.stringify({ text, persona }),
     })
 
     if (!response.ok) {
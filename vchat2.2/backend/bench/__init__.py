@@ -0,0 +1,3 @@
+"""
+벤치마크 / 부하 테스트 도구 (스텁 업스트림 서버, 가짜 Firestore, 부하 드라이버)
+"""
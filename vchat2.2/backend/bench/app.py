@@ -0,0 +1,62 @@
+"""
+벤치마크용 앱 모듈
+업스트림 API를 스텁 서버로, Firestore를 가짜 저장소로 바꾼 main.app (uvicorn bench.app:app)
+
+설정은 환경변수(VCHAT_BENCH_STUB_URL, VCHAT_BENCH_FIRESTORE, VCHAT_BENCH_DIR)로 받으므로
+여러 워커로 띄워도 워커마다 같은 설정이 적용됩니다.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from bench.fake_firestore import FakeFirestore
+from bench.profiles import LatencyProfile
+
+DEFAULT_STUB_URL = "http://127.0.0.1:8900"
+PERSONAS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "personas.json")
+
+
+def configure_environment():
+    """스텁 주소와 임시 저장 경로 설정 (실제 키가 .env에 있어도 스텁으로만 요청)"""
+    stub_url = os.environ.setdefault("VCHAT_BENCH_STUB_URL", DEFAULT_STUB_URL).rstrip("/")
+    os.environ["OPENAI_BASE_URL"] = f"{stub_url}/v1"
+    os.environ["ELEVENLABS_BASE_URL"] = stub_url
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["ELEVENLABS_API_KEY"] = "bench"
+
+    work_dir = os.environ.setdefault("VCHAT_BENCH_DIR", os.path.join(tempfile.gettempdir(), "vchat_bench"))
+    os.makedirs(work_dir, exist_ok=True)
+    os.environ.setdefault("VCHAT_SESSION_DB", os.path.join(work_dir, "sessions.sqlite3"))
+    os.environ.setdefault("VCHAT_TTS_CACHE_DIR", os.path.join(work_dir, "tts_cache"))
+    os.environ.setdefault("VCHAT_AUDIO_DIR", os.path.join(work_dir, "audio"))
+    return work_dir
+
+
+def install_fake_firestore(persona_manager, work_dir):
+    """
+    PersonaManager에 가짜 Firestore 연결 (로컬 페르소나 데이터로 채움)
+
+    로컬 백업 파일도 작업 디렉터리의 복사본을 쓰게 해 저장소의 data/personas.json은 건드리지 않습니다.
+    """
+    personas_file = os.path.join(work_dir, "personas.json")
+    if os.path.exists(PERSONAS_FILE):
+        shutil.copyfile(PERSONAS_FILE, personas_file)
+        with open(PERSONAS_FILE, 'r', encoding='utf-8') as f:
+            personas = json.load(f)
+    else:
+        personas = {}
+
+    profile = LatencyProfile.parse(os.getenv("VCHAT_BENCH_FIRESTORE", ""))
+    persona_manager.personas_file = personas_file
+    persona_manager.db = FakeFirestore(profile, {"personas": personas})
+    return profile
+
+
+_work_dir = configure_environment()
+
+import main  # noqa: E402  (환경변수 설정 후 import해야 스텁 주소로 클라이언트가 만들어짐)
+
+firestore_profile = install_fake_firestore(main.persona_manager, _work_dir)
+app = main.app
@@ -0,0 +1,92 @@
+"""
+가짜 Firestore 모듈
+PersonaManager가 쓰는 만큼(collection / document / set / get / stream)만 구현한 메모리 저장소
+"""
+
+import copy
+import threading
+
+from bench.profiles import LatencyProfile
+
+
+class FakeFirestoreError(Exception):
+    """프로필의 error 확률로 발생시키는 Firestore 오류"""
+
+
+class FakeDocumentSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class FakeDocumentReference:
+    def __init__(self, store, collection, doc_id):
+        self._store = store
+        self._collection = collection
+        self.id = doc_id
+
+    def set(self, data):
+        self._store._call()
+        with self._store._lock:
+            self._store._collections.setdefault(self._collection, {})[self.id] = copy.deepcopy(data)
+        self._store.writes += 1
+
+    def get(self):
+        self._store._call()
+        with self._store._lock:
+            data = self._store._collections.get(self._collection, {}).get(self.id)
+        self._store.reads += 1
+        return FakeDocumentSnapshot(self.id, copy.deepcopy(data))
+
+    def delete(self):
+        self._store._call()
+        with self._store._lock:
+            self._store._collections.get(self._collection, {}).pop(self.id, None)
+
+
+class FakeCollectionReference:
+    def __init__(self, store, name):
+        self._store = store
+        self.id = name
+
+    def document(self, doc_id):
+        return FakeDocumentReference(self._store, self.id, doc_id)
+
+    def stream(self):
+        self._store._call()
+        with self._store._lock:
+            documents = copy.deepcopy(self._store._collections.get(self.id, {}))
+        self._store.reads += len(documents)
+        for doc_id, data in documents.items():
+            yield FakeDocumentSnapshot(doc_id, data)
+
+
+class FakeFirestore:
+    """firestore.Client 대용 (호출마다 프로필의 지연 / 오류 적용)"""
+
+    def __init__(self, profile=None, seed_data=None):
+        """
+        Args:
+            profile (LatencyProfile, optional): 호출마다 적용할 응답 특성
+            seed_data (dict, optional): {컬렉션 이름: {문서 ID: 데이터}} 초기 데이터
+        """
+        self.profile = profile or LatencyProfile()
+        self._collections = copy.deepcopy(seed_data or {})
+        self._lock = threading.Lock()
+        self.reads = 0
+        self.writes = 0
+
+    def _call(self):
+        self.profile.wait()
+        if self.profile.should_fail():
+            raise FakeFirestoreError(f"stub firestore error ({self.profile.status})")
+
+    def collection(self, name):
+        return FakeCollectionReference(self, name)
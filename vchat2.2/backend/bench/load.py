@@ -0,0 +1,290 @@
+"""
+부하 테스트 드라이버
+/api/chat, /api/speech/upload, /api/speech/tts 를 지정한 동시성으로 호출하고
+엔드포인트별 처리량과 p50 / p95 / p99 지연 시간을 보고
+
+사용법 (backend 디렉터리에서, bench.stubs와 bench.serve를 먼저 실행):
+    python -m bench.load --url http://127.0.0.1:8000 --concurrency 16 --requests 200
+    python -m bench.load --duration 30 --mixed --json result.json
+    python -m bench.load --baseline result.json --max-regression 0.2   # p95가 20% 넘게 느려지면 종료 코드 1
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import math
+import struct
+import sys
+import time
+import wave
+
+import httpx
+
+ENDPOINTS = ("chat", "upload", "tts")
+CHAT_MESSAGES = ["안녕! 오늘 뭐 했어?", "요즘 재밌는 게임 추천해줘", "방송 언제 해?", "오늘 기분 어때?"]
+
+
+def percentile(sorted_values, p):
+    """정렬된 값 목록의 p 백분위수 (nearest-rank)"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def make_wav(seconds=1.5, sample_rate=16000, frequency=220.0):
+    """업로드용 테스트 음성 (사인파 WAV)"""
+    frames = bytearray()
+    for i in range(int(seconds * sample_rate)):
+        value = int(8000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+        frames += struct.pack('<h', value)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(bytes(frames))
+    return buffer.getvalue()
+
+
+class EndpointStats:
+    """엔드포인트 하나의 요청 결과 집계"""
+
+    def __init__(self, name):
+        self.name = name
+        self.latencies = []
+        self.statuses = {}
+        self.started = None
+        self.finished = None
+
+    def record(self, status, seconds):
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status == 200:
+            self.latencies.append(seconds)
+
+    def summary(self):
+        latencies = sorted(self.latencies)
+        total = sum(self.statuses.values())
+        elapsed = (self.finished or time.perf_counter()) - (self.started or time.perf_counter())
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "requests": total,
+            "ok": len(latencies),
+            "errors": total - len(latencies),
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items(), key=lambda x: str(x[0]))},
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed > 0 else 0.0,
+            "p50_ms": ms(percentile(latencies, 50)),
+            "p95_ms": ms(percentile(latencies, 95)),
+            "p99_ms": ms(percentile(latencies, 99)),
+            "mean_ms": ms(sum(latencies) / len(latencies)) if latencies else None,
+            "max_ms": ms(latencies[-1]) if latencies else None
+        }
+
+
+class LoadDriver:
+    """엔드포인트별 요청 생성 + 동시 실행"""
+
+    def __init__(self, client, persona, repeat_text=False):
+        self.client = client
+        self.persona = persona
+        self.repeat_text = repeat_text
+        self.wav = make_wav()
+        self._sequence = 0
+
+    def _text(self, base):
+        # 기본적으로 매번 다른 문장을 보내 TTS 캐시 적중 없이 업스트림 경로를 측정
+        self._sequence += 1
+        return base if self.repeat_text else f"{base} ({self._sequence})"
+
+    async def call(self, endpoint):
+        """요청 한 번 실행 후 (상태 코드, 소요 시간) 반환 (연결 오류는 상태 'error:<타입>')"""
+        started = time.perf_counter()
+        try:
+            if endpoint == "chat":
+                response = await self.client.post("/api/chat", json={
+                    "message": self._text(CHAT_MESSAGES[self._sequence % len(CHAT_MESSAGES)]),
+                    "mode": "text-to-text",
+                    "persona": self.persona
+                })
+            elif endpoint == "upload":
+                response = await self.client.post(
+                    "/api/speech/upload",
+                    files={"file": ("bench.wav", self.wav, "audio/wav")}
+                )
+            elif endpoint == "tts":
+                response = await self.client.post("/api/speech/tts", json={
+                    "text": self._text("오늘 방송 와줘서 고마워!"),
+                    "persona": self.persona
+                })
+            else:
+                raise ValueError(f"알 수 없는 엔드포인트: {endpoint}")
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = f"error:{type(e).__name__}"
+        return status, time.perf_counter() - started
+
+    async def run(self, endpoint, stats, concurrency, requests=None, duration=None):
+        """concurrency개 작업자로 requests번(또는 duration초 동안) 호출"""
+        deadline = time.perf_counter() + duration if duration else None
+        remaining = [requests if requests is not None else math.inf]
+
+        async def worker():
+            while True:
+                if deadline and time.perf_counter() >= deadline:
+                    return
+                if remaining[0] <= 0:
+                    return
+                remaining[0] -= 1
+                status, seconds = await self.call(endpoint)
+                stats.record(status, seconds)
+
+        stats.started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        stats.finished = time.perf_counter()
+
+
+async def pick_persona(client, persona):
+    if persona:
+        return persona
+    response = await client.get("/api/personas")
+    response.raise_for_status()
+    personas = response.json().get("personas") or []
+    if not personas:
+        raise SystemExit("❌ 페르소나가 없습니다 (--persona로 지정하세요)")
+    first = personas[0]
+    return first if isinstance(first, str) else first.get("name")
+
+
+async def wait_ready(client, timeout=30.0):
+    """/readyz가 200이 될 때까지 대기"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if (await client.get("/readyz")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.5)
+    raise SystemExit("❌ 백엔드가 준비되지 않았습니다 (/readyz)")
+
+
+async def run_benchmark(args):
+    limits = httpx.Limits(max_connections=args.concurrency * len(args.endpoints), max_keepalive_connections=args.concurrency * len(args.endpoints))
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        await wait_ready(client)
+        persona = await pick_persona(client, args.persona)
+        driver = LoadDriver(client, persona, repeat_text=args.repeat_text)
+        print(f"🚀 부하 테스트: {args.url} persona={persona} concurrency={args.concurrency} "
+              f"{'duration=' + str(args.duration) + 's' if args.duration else 'requests=' + str(args.requests)}"
+              f"{' (mixed)' if args.mixed else ''}")
+
+        # 워밍업 (서비스 번들 생성, 연결 수립 등 첫 요청 비용 제외)
+        for endpoint in args.endpoints:
+            for _ in range(args.warmup):
+                await driver.call(endpoint)
+
+        stats = {endpoint: EndpointStats(endpoint) for endpoint in args.endpoints}
+        requests = None if args.duration else args.requests
+        if args.mixed:
+            await asyncio.gather(*(
+                driver.run(endpoint, stats[endpoint], args.concurrency, requests, args.duration)
+                for endpoint in args.endpoints
+            ))
+        else:
+            for endpoint in args.endpoints:
+                await driver.run(endpoint, stats[endpoint], args.concurrency, requests, args.duration)
+
+    return {
+        "url": args.url,
+        "persona": persona,
+        "concurrency": args.concurrency,
+        "mixed": args.mixed,
+        "endpoints": {endpoint: stats[endpoint].summary() for endpoint in args.endpoints}
+    }
+
+
+def print_report(result):
+    print()
+    print(f"{'endpoint':<10}{'req':>7}{'err':>6}{'rps':>9}{'p50':>9}{'p95':>9}{'p99':>9}{'max':>9}  (ms)")
+    for endpoint, summary in result["endpoints"].items():
+        def cell(key):
+            value = summary[key]
+            return f"{value:>9.1f}" if value is not None else f"{'-':>9}"
+        print(f"{endpoint:<10}{summary['requests']:>7}{summary['errors']:>6}{summary['throughput_rps']:>9.2f}"
+              f"{cell('p50_ms')}{cell('p95_ms')}{cell('p99_ms')}{cell('max_ms')}")
+        if summary["errors"]:
+            print(f"{'':<10}statuses: {summary['statuses']}")
+
+
+def compare_baseline(result, baseline, max_regression):
+    """
+    기준 결과와 p95 / 처리량 비교
+
+    Returns:
+        list: 허용치를 넘은 회귀 설명 목록
+    """
+    regressions = []
+    for endpoint, summary in result["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(endpoint)
+        if not base:
+            continue
+        if base.get("p95_ms") and summary.get("p95_ms") and summary["p95_ms"] > base["p95_ms"] * (1 + max_regression):
+            regressions.append(f"{endpoint} p95 {base['p95_ms']}ms → {summary['p95_ms']}ms")
+        if base.get("throughput_rps") and summary["throughput_rps"] < base["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{endpoint} 처리량 {base['throughput_rps']} → {summary['throughput_rps']} rps")
+        if summary["requests"] and base.get("requests"):
+            base_error_rate = base["errors"] / base["requests"]
+            error_rate = summary["errors"] / summary["requests"]
+            if error_rate > base_error_rate + max_regression / 10:
+                regressions.append(f"{endpoint} 오류율 {base_error_rate:.1%} → {error_rate:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="V-Chat 백엔드 부하 테스트")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--endpoints", default=",".join(ENDPOINTS), help="쉼표로 구분 (chat,upload,tts)")
+    parser.add_argument("--concurrency", type=int, default=8, help="엔드포인트별 동시 요청 수")
+    parser.add_argument("--requests", type=int, default=100, help="엔드포인트별 요청 수")
+    parser.add_argument("--duration", type=float, default=None, help="요청 수 대신 엔드포인트별 실행 시간 (초)")
+    parser.add_argument("--mixed", action="store_true", help="엔드포인트를 순서대로가 아니라 동시에 실행")
+    parser.add_argument("--warmup", type=int, default=2, help="엔드포인트별 측정 전 요청 수")
+    parser.add_argument("--persona", default=None, help="기본값: 첫 번째 페르소나")
+    parser.add_argument("--repeat-text", action="store_true", help="같은 문장을 반복해 TTS 캐시 경로 측정")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--json", default=None, help="결과를 JSON으로 저장할 경로")
+    parser.add_argument("--baseline", default=None, help="비교할 이전 결과 JSON")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="허용하는 p95 / 처리량 악화 비율")
+    args = parser.parse_args()
+
+    args.endpoints = [name.strip() for name in args.endpoints.split(",") if name.strip()]
+    unknown = [name for name in args.endpoints if name not in ENDPOINTS]
+    if unknown:
+        parser.error(f"알 수 없는 엔드포인트: {', '.join(unknown)}")
+
+    result = asyncio.run(run_benchmark(args))
+    print_report(result)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 결과 저장: {args.json}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_baseline(result, baseline, args.max_regression)
+        if regressions:
+            print("\n❌ 성능 회귀:")
+            for regression in regressions:
+                print(f"   {regression}")
+            sys.exit(1)
+        print("\n✅ 기준 대비 회귀 없음")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+벤치마크용 지연 / 오류 분포 모듈
+스텁 서버와 가짜 Firestore가 공유하는 응답 시간 + 실패 확률 설정
+"""
+
+import random
+import time
+
+
+class LatencyProfile:
+    """
+    업스트림 하나의 응답 특성
+
+    지연 시간 = latency + 지수 분포 꼬리(평균 jitter) 로 실제 API처럼 오른쪽 꼬리가 긴 분포를 흉내 냅니다.
+    error 확률로 status 오류를 돌려주고, 스트리밍 응답은 청크마다 chunk_ms만큼 쉽니다.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, error=0.0, status=500, chunk=0.0, seed=None):
+        """
+        Args:
+            latency (float): 기본 지연 (ms)
+            jitter (float): 기본 지연 위에 더해지는 지수 분포 꼬리의 평균 (ms)
+            error (float): 오류 응답 확률 (0~1)
+            status (int): 오류 응답 상태 코드 (500, 429, 503 등)
+            chunk (float): 스트리밍 청크 사이 간격 (ms)
+            seed (int, optional): 재현용 난수 시드
+        """
+        self.latency = float(latency)
+        self.jitter = float(jitter)
+        self.error = float(error)
+        self.status = int(status)
+        self.chunk = float(chunk)
+        self._random = random.Random(seed)
+
+    @classmethod
+    def parse(cls, spec, **defaults):
+        """
+        'latency=400,jitter=150,error=0.02,status=429,chunk=20' 형식 문자열로 프로필 생성
+
+        빠진 항목은 defaults, 그다음 생성자 기본값을 씁니다.
+        """
+        options = dict(defaults)
+        for item in (spec or "").split(","):
+            item = item.strip()
+            if not item:
+                continue
+            key, _, value = item.partition("=")
+            key = key.strip()
+            if key not in ("latency", "jitter", "error", "status", "chunk", "seed"):
+                raise ValueError(f"알 수 없는 프로필 항목: {key}")
+            options[key] = float(value)
+        return cls(**options)
+
+    def delay_seconds(self):
+        """이번 응답의 지연 시간 (초)"""
+        tail = self._random.expovariate(1.0 / self.jitter) if self.jitter > 0 else 0.0
+        return (self.latency + tail) / 1000
+
+    def should_fail(self):
+        """이번 응답을 오류로 돌려줄지 여부"""
+        return self.error > 0 and self._random.random() < self.error
+
+    def wait(self):
+        """지연 시간만큼 대기"""
+        delay = self.delay_seconds()
+        if delay > 0:
+            time.sleep(delay)
+
+    def wait_chunk(self):
+        """스트리밍 청크 간격만큼 대기"""
+        if self.chunk > 0:
+            time.sleep(self.chunk / 1000)
+
+    def describe(self):
+        return (f"latency={self.latency:g}ms jitter={self.jitter:g}ms "
+                f"error={self.error:g}({self.status}) chunk={self.chunk:g}ms")
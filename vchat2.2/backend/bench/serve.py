@@ -0,0 +1,41 @@
+"""
+벤치마크용 백엔드 실행 스크립트
+bench.app(스텁 업스트림 + 가짜 Firestore)을 uvicorn으로 띄움 (실제 API 사용량 없음)
+
+사용법 (backend 디렉터리에서, bench.stubs를 먼저 실행):
+    python -m bench.serve --port 8000 --stub-url http://127.0.0.1:8900 \\
+        --firestore "latency=60,jitter=40" --workers 2
+"""
+
+import argparse
+import os
+
+from bench.profiles import LatencyProfile
+
+DEFAULT_STUB_URL = "http://127.0.0.1:8900"
+
+
+def run():
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="스텁 업스트림으로 백엔드 실행")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--stub-url", default=None, help=f"bench.stubs 주소 (기본값: {DEFAULT_STUB_URL})")
+    parser.add_argument("--firestore", default=None, help="가짜 Firestore 응답 프로필 (예: latency=60,jitter=40)")
+    args = parser.parse_args()
+
+    # 워커 프로세스는 환경변수로 설정을 이어받음
+    if args.stub_url:
+        os.environ["VCHAT_BENCH_STUB_URL"] = args.stub_url
+    if args.firestore is not None:
+        os.environ["VCHAT_BENCH_FIRESTORE"] = args.firestore
+
+    print(f"🧪 벤치마크 서버: 업스트림 {os.getenv('VCHAT_BENCH_STUB_URL', DEFAULT_STUB_URL)}, "
+          f"Firestore {LatencyProfile.parse(os.getenv('VCHAT_BENCH_FIRESTORE', '')).describe()}")
+    uvicorn.run("bench.app:app", host=args.host, port=args.port, workers=args.workers, log_level="warning")
+
+
+if __name__ == "__main__":
+    run()
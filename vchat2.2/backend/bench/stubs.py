@@ -0,0 +1,268 @@
+"""
+업스트림 스텁 서버
+OpenAI(채팅 완성 / Whisper 전사)와 ElevenLabs(텍스트 음성 변환) API를 흉내 내는 로컬 HTTP 서버
+
+사용법 (backend 디렉터리에서):
+    python -m bench.stubs --port 8900 \\
+        --chat "latency=400,jitter=200,chunk=15" \\
+        --stt "latency=300,jitter=100" \\
+        --tts "latency=250,jitter=150,error=0.01,status=429,chunk=10"
+
+백엔드는 OPENAI_BASE_URL=http://127.0.0.1:8900/v1, ELEVENLABS_BASE_URL=http://127.0.0.1:8900 으로 연결합니다.
+(bench.serve가 자동으로 설정)
+"""
+
+import argparse
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from bench.profiles import LatencyProfile
+
+CHAT_REPLY = "안녕! 오늘 뭐 했어? 나는 방송 준비하느라 바빴어~ 그래도 너랑 얘기하니까 좋다 ㅎㅎ"
+TRANSCRIPT = "오늘 방송 몇 시에 해?"
+TTS_CHUNK_SIZE = 4096
+TTS_BYTES_PER_CHAR = 1200  # 128kbps MP3 기준 대략 글자당 75ms 분량
+
+CACHE_MIN_TOKENS = 1024  # OpenAI 프롬프트 캐싱이 적용되는 최소 입력 토큰 수
+CACHE_INCREMENT = 128  # 캐시된 토큰은 이 단위로 늘어남
+
+TTS_PATH = re.compile(r"^/v1/text-to-speech/(?P<voice_id>[^/]+)(?P<stream>/stream)?$")
+
+
+class StubState:
+    """스텁 서버 설정과 요청 수 집계"""
+
+    def __init__(self, chat, stt, tts, cache_min_tokens=CACHE_MIN_TOKENS):
+        self.profiles = {"chat": chat, "stt": stt, "tts": tts}
+        self.counts = {}
+        self.cache_min_tokens = cache_min_tokens
+        self._prefixes = set()
+        self._lock = threading.Lock()
+
+    def count(self, name, status):
+        with self._lock:
+            key = f"{name}:{status}"
+            self.counts[key] = self.counts.get(key, 0) + 1
+
+    def prompt_usage(self, messages, completion_tokens):
+        """
+        프롬프트 캐싱을 흉내 낸 usage (마지막 메시지 앞부분이 전에 본 것과 같으면 그만큼 cached_tokens)
+
+        토큰 수는 UTF-8 3바이트당 1토큰 + 메시지당 3토큰으로 근사합니다.
+        """
+        def tokens(items):
+            return sum(3 + len(str(m.get("content", "")).encode("utf-8")) // 3 for m in items)
+
+        prefix = messages[:-1]
+        prompt_tokens = tokens(messages) + 3
+        prefix_tokens = tokens(prefix)
+        digest = hashlib.sha1(json.dumps(prefix, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()
+        cached = 0
+        with self._lock:
+            if prompt_tokens >= self.cache_min_tokens and digest in self._prefixes:
+                cached = prefix_tokens // CACHE_INCREMENT * CACHE_INCREMENT
+            self._prefixes.add(digest)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached}
+        }
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """OpenAI / ElevenLabs 요청을 경로로 구분해 응답하는 핸들러"""
+
+    protocol_version = "HTTP/1.1"  # keep-alive 연결 풀 재사용을 실제 API와 같게
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, name, profile):
+        self.state.count(name, profile.status)
+        headers = {"Retry-After": "1"} if profile.status in (429, 503) else None
+        self._send_json(profile.status, {"error": {"message": f"stub {name} error", "type": "stub_error"}}, headers)
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+    def _end_chunks(self):
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, {
+                "profiles": {name: profile.describe() for name, profile in self.state.profiles.items()},
+                "counts": self.state.counts
+            })
+            return
+        self._send_json(404, {"error": {"message": "not found"}})
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0]
+        body = self._read_body()
+
+        if path == "/v1/chat/completions":
+            self._chat(body)
+        elif path == "/v1/audio/transcriptions":
+            self._transcribe()
+        elif TTS_PATH.match(path):
+            self._tts(body)
+        else:
+            self._send_json(404, {"error": {"message": f"unknown path {path}"}})
+
+    def _chat(self, body):
+        profile = self.state.profiles["chat"]
+        request = json.loads(body or b"{}")
+        profile.wait()
+        if profile.should_fail():
+            self._send_error("chat", profile)
+            return
+
+        model = request.get("model", "gpt-stub")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        usage = self.state.prompt_usage(request.get("messages") or [], len(CHAT_REPLY) // 2)
+
+        if not request.get("stream"):
+            self.state.count("chat", 200)
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": CHAT_REPLY},
+                    "finish_reason": "stop"
+                }],
+                "usage": usage
+            })
+            return
+
+        # SSE 스트리밍: 몇 글자씩 delta로 보내고 [DONE]으로 종료
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def event(choices, extra=None):
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created,
+                       "model": model, "choices": choices}
+            payload.update(extra or {})
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
+
+        self._write_chunk(event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}]))
+        for start in range(0, len(CHAT_REPLY), 4):
+            profile.wait_chunk()
+            piece = CHAT_REPLY[start:start + 4]
+            self._write_chunk(event([{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+        self._write_chunk(event([{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (request.get("stream_options") or {}).get("include_usage"):
+            self._write_chunk(event([], {"usage": usage}))
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._end_chunks()
+        self.state.count("chat", 200)
+
+    def _transcribe(self):
+        profile = self.state.profiles["stt"]
+        profile.wait()
+        if profile.should_fail():
+            self._send_error("stt", profile)
+            return
+        self.state.count("stt", 200)
+        self._send_json(200, {"text": TRANSCRIPT})
+
+    def _tts(self, body):
+        profile = self.state.profiles["tts"]
+        request = json.loads(body or b"{}")
+        profile.wait()
+        if profile.should_fail():
+            self._send_error("tts", profile)
+            return
+
+        # 텍스트 길이에 비례하는 크기의 가짜 MP3 데이터를 청크로 전송
+        size = max(TTS_CHUNK_SIZE, len(request.get("text", "")) * TTS_BYTES_PER_CHAR)
+        self.send_response(200)
+        self.send_header("Content-Type", "audio/mpeg")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        sent = 0
+        while sent < size:
+            chunk = min(TTS_CHUNK_SIZE, size - sent)
+            self._write_chunk(b"\xff\xfb\x90\x00" + bytes(chunk - 4))
+            sent += chunk
+            profile.wait_chunk()
+        self._end_chunks()
+        self.state.count("tts", 200)
+
+
+def create_server(host="127.0.0.1", port=8900, chat=None, stt=None, tts=None, cache_min_tokens=CACHE_MIN_TOKENS):
+    """
+    스텁 서버 생성 (serve_forever는 호출하는 쪽에서)
+
+    Args:
+        chat / stt / tts (LatencyProfile, optional): 업스트림별 응답 특성 (기본값: 지연 없음)
+        cache_min_tokens (int): 프롬프트 캐싱을 흉내 낼 최소 입력 토큰 수
+    """
+    state = StubState(chat or LatencyProfile(), stt or LatencyProfile(), tts or LatencyProfile(), cache_min_tokens)
+    handler = type("BoundStubHandler", (StubHandler,), {"state": state})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenAI / ElevenLabs 스텁 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--chat", default="latency=400,jitter=200,chunk=15", help="채팅 완성 응답 프로필")
+    parser.add_argument("--stt", default="latency=300,jitter=100", help="Whisper 전사 응답 프로필")
+    parser.add_argument("--tts", default="latency=250,jitter=150,chunk=10", help="ElevenLabs 음성 변환 응답 프로필")
+    parser.add_argument("--seed", type=int, default=None, help="재현용 난수 시드")
+    parser.add_argument("--cache-min-tokens", type=int, default=CACHE_MIN_TOKENS,
+                        help="이 토큰 수 이상인 요청에만 cached_tokens를 돌려줌 (짧은 프롬프트로 캐시 경로를 확인할 때 낮춤)")
+    args = parser.parse_args()
+
+    seed = {"seed": args.seed} if args.seed is not None else {}
+    profiles = {
+        "chat": LatencyProfile.parse(args.chat, **seed),
+        "stt": LatencyProfile.parse(args.stt, **seed),
+        "tts": LatencyProfile.parse(args.tts, **seed)
+    }
+    server = create_server(args.host, args.port, cache_min_tokens=args.cache_min_tokens, **profiles)
+    print(f"🧪 스텁 서버 시작: http://{args.host}:{args.port}")
+    for name, profile in profiles.items():
+        print(f"   {name}: {profile.describe()}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,20 @@
+import time
+_import_started = time.perf_counter()
+
 import uvicorn
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import FastAPI, HTTPException, UploadFile, File, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import sys
 import os
-import tempfile
+import asyncio
 import uuid
+import json
+import itertools
+from urllib.parse import quote
 from typing import Optional, List
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # .env 파일 로드 (모듈 import 전에)
@@ -19,12 +26,34 @@ sys.path.append(project_root)
 
 # 기존 모듈들 import
 from modules.persona_manager import PersonaManager
-from modules.vchat_bot import VChatBot
-from modules.tts_service import VoiceConverter
-from modules.stt_service import RealTimeSTT
+from modules.service_pool import PersonaServicePool
+from modules.session_store import get_session_store
+from modules.tts_service import tee_audio
+from modules.tts_cache import get_tts_cache
+from modules.prompt_cache import get_prompt_cache, usage_stats
+from modules.conversation_memory import get_conversation_memory
+from modules.response_cache import get_response_cache
+from modules.stt_service import RealTimeSTT, SpeechSegmenter, AudioTooLargeError, read_audio_stream
+from modules import audio_preprocess
 from modules.audio_utils import AudioConfig
+from modules.async_utils import run_blocking, run_audio_task, iterate_blocking, shutdown_executor
+from modules.clients import close_clients
+from modules.speech_pipeline import pipeline_events
+from modules.audio_store import AudioStore
+from modules.http_utils import ranged_file_response
+from modules import metrics
+from modules.tracing import TracingMiddleware, span, close_exporters
+from modules.admission import OverloadedError, ensure_capacity
+from modules.resilience import shutdown_hedge_executor
+
+@asynccontextmanager
+async def lifespan(app):
+    """앱 시작/종료 처리 (startup_sequence / shutdown_sequence는 아래에 정의)"""
+    await startup_sequence()
+    yield
+    await shutdown_sequence()
 
-app = FastAPI(title="VChat Backend API")
+app = FastAPI(title="VChat Backend API", lifespan=lifespan)
 
 # CORS 설정
 app.add_middleware(
@@ -36,12 +65,55 @@ app.add_middleware(
     expose_headers=["*"]
 )
 
+# 요청별 단계 시간을 Server-Timing 헤더로 노출 (VCHAT_TRACE_FILE이 있으면 span을 JSONL로 기록)
+app.add_middleware(TracingMiddleware)
+
+@app.exception_handler(OverloadedError)
+async def overloaded_handler(request: Request, exc: OverloadedError):
+    """업스트림 한도 초과는 오류 문자열 대신 빠른 503 + Retry-After로 응답"""
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "detail": str(exc), "upstream": exc.upstream},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# WebSocket 음성 대화 설정
+WS_SILENCE_SECONDS = float(os.getenv('VCHAT_WS_SILENCE_SECONDS', '0.8'))
+WS_MAX_UTTERANCE_BYTES = 25 * 1024 * 1024  # Whisper 업로드 제한
+WS_SAMPLE_RATES = (8000, 48000)  # pcm16 입력으로 받는 샘플링 레이트 범위
+WS_ENCODED_FORMATS = {"webm": ".webm", "ogg": ".ogg", "opus": ".ogg", "mp4": ".mp4", "wav": ".wav"}
+
+# 시작 단계별 제한 시간 (넘으면 해당 단계 없이 계속 진행)
+STARTUP_STEP_TIMEOUT = float(os.getenv('VCHAT_STARTUP_TIMEOUT', '10'))
+FIRESTORE_SYNC_TIMEOUT = float(os.getenv('VCHAT_FIRESTORE_TIMEOUT', '30'))
+
+# 저장소에 없다고 확인한 페르소나 이름을 다시 조회하기까지의 시간 (다른 워커에서 추가된 페르소나 반영)
+PERSONA_RELOAD_SECONDS = float(os.getenv('VCHAT_PERSONA_RELOAD_SECONDS', '30'))
+
+# 업로드 허용 형식 → Whisper가 형식을 판단할 확장자
+UPLOAD_AUDIO_EXTENSIONS = {
+    "audio/wav": ".wav",
+    "audio/x-wav": ".wav",
+    "audio/wave": ".wav",
+    "audio/mpeg": ".mp3",
+    "audio/mp4": ".mp4",
+    "audio/webm": ".webm",
+    "audio/ogg": ".ogg"
+}
+
 # 전역 변수들
-persona_manager = PersonaManager()
-chatbot = None
-tts_service = None
+persona_manager = PersonaManager(auto_load=False)  # 데이터는 startup에서 로드
+service_pool = PersonaServicePool(persona_manager)
+session_store = get_session_store()
+audio_store = AudioStore()
 stt_service = None
 
+# 시작 시간 보고 (import / 단계별 소요 초)
+startup_report = {}
+# /readyz 판단용 시작 단계 상태
+readiness = {"personas": "pending", "firestore": "pending", "services": "pending"}
+background_tasks = set()
+
 # Pydantic 모델들
 class PersonaCreateRequest(BaseModel):
     name: str
@@ -51,26 +123,33 @@ class PersonaCreateRequest(BaseModel):
 
 class PersonaSelectRequest(BaseModel):
     persona_name: str
+    session_id: Optional[str] = None  # 없으면 모든 워커가 공유하는 기본 페르소나 변경
 
 class ChatRequest(BaseModel):
     message: str
     mode: str  # 'text-to-text', 'speech-to-speech', 'text-to-speech'
-    persona: str
+    persona: Optional[str] = None  # 없으면 세션에서 선택한 페르소나
+    session_id: Optional[str] = None  # 있으면 세션별 대화 기록을 이어감
 
 class SpeechRequest(BaseModel):
     action: str  # 'start' or 'stop'
 
 class TTSRequest(BaseModel):
     text: str
+    persona: Optional[str] = None  # 없으면 세션에서 선택한 페르소나
+    session_id: Optional[str] = None
+
+class TTSStreamRequest(BaseModel):
+    text: str
+    persona: Optional[str] = None
+    session_id: Optional[str] = None
+    keep: bool = False  # True면 스트리밍과 동시에 파일로 저장해 /api/audio로 다시 재생 가능
 
 def initialize_services():
-    """서비스들 초기화"""
-    global chatbot, tts_service, stt_service
+    """페르소나와 무관한 공용 서비스(STT) 초기화"""
+    global stt_service
     
-    if persona_manager.get_current_persona():
-        chatbot = VChatBot(persona_manager=persona_manager)
-        tts_service = VoiceConverter(persona_manager=persona_manager)
-        
+    if stt_service is None:
         audio_config = AudioConfig()
         stt_service = RealTimeSTT(
             silence_threshold=2.0,
@@ -78,13 +157,76 @@ def initialize_services():
             chunk_size=audio_config.chunk_size
         )
 
+def get_stt_service():
+    """공용 STT 서비스 반환 (예열 전에 요청이 오면 그때 생성)"""
+    if stt_service is None:
+        initialize_services()
+    return stt_service
+
+def warm_up_services():
+    """첫 요청 지연을 줄이기 위해 STT와 기본 페르소나 서비스를 미리 생성"""
+    initialize_services()
+    persona_name = selected_persona_name()
+    if persona_name and persona_manager.get_persona(persona_name):
+        service_pool.get(persona_name)
+    return True
+
+def selected_persona_name(session_id=None):
+    """세션에서 선택한 페르소나 → 공유 기본 페르소나 → 이 워커의 시작 시 페르소나 순으로 이름 반환"""
+    persona_name = session_store.get_persona(session_id)
+    if not persona_name:
+        current_persona = persona_manager.get_current_persona()
+        persona_name = current_persona.get('name') if current_persona else None
+    return persona_name
+
+def find_persona(persona_name):
+    """페르소나가 있는지 확인 (이 워커에 없으면 저장소에서 그 페르소나만 조회, 없는 이름은 잠시 기억)"""
+    return persona_manager.fetch_persona(persona_name, PERSONA_RELOAD_SECONDS) is not None
+
+def resolve_services(persona_name=None, session_id=None):
+    """
+    요청한 페르소나의 서비스 번들(챗봇 + TTS) 반환 (워커 스레드에서 실행)
+    
+    페르소나는 요청 → 세션 저장소 순으로 정해지므로 워커 프로세스 전역 상태에 의존하지 않고,
+    어느 워커가 받아도 같은 페르소나로 응답합니다.
+    """
+    with span("persona_resolve"):
+        persona_name = persona_name or selected_persona_name(session_id)
+        if not persona_name:
+            raise HTTPException(status_code=400, detail="페르소나가 선택되지 않았습니다")
+        
+        if not find_persona(persona_name):
+            raise HTTPException(status_code=404, detail="페르소나를 찾을 수 없습니다")
+        services = service_pool.get(persona_name)
+        if services is None:
+            raise HTTPException(status_code=404, detail="페르소나를 찾을 수 없습니다")
+        return services
+
+def sse_event(event, data):
+    """Server-Sent Events 형식의 메시지 생성"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def synthesize_segment(text, service):
+    """텍스트를 음성으로 변환해 오디오 저장소에 넣고 audio_url 반환 (워커 스레드에서 실행, 실패 시 None)"""
+    audio = service.convert_text_to_speech(text)
+    if not audio:
+        return None
+    
+    try:
+        audio_id = audio_store.save_stream(audio)
+    except OverloadedError:
+        raise
+    except Exception as e:
+        print(f"❌ 음성 파일 저장 오류: {str(e)}")
+        return None
+    return audio_store.url_for(audio_id) if audio_id else None
+
 @app.get("/api/personas")
-async def get_personas():
+async def get_personas(session_id: Optional[str] = None):
     """사용 가능한 페르소나 목록 반환"""
     try:
         personas = persona_manager.get_available_personas()
-        current_persona = persona_manager.get_current_persona()
-        current_name = current_persona.get('name') if current_persona else None
+        current_name = await run_blocking(selected_persona_name, session_id)
         
         return {
             "success": True,
@@ -96,14 +238,21 @@ async def get_personas():
 
 @app.post("/api/personas/select")
 async def select_persona(request: PersonaSelectRequest):
-    """페르소나 선택"""
+    """
+    페르소나 선택 (persona 필드 없이 오는 요청에 사용)
+    
+    선택은 세션 저장소에 기록되므로 다른 워커 프로세스에도 그대로 적용됩니다.
+    """
     try:
-        success = persona_manager.select_persona(request.persona_name)
-        if success:
-            initialize_services()
+        if await run_blocking(find_persona, request.persona_name):
+            await run_blocking(session_store.set_persona, request.persona_name, request.session_id)
+            # 서비스 번들을 미리 만들어 두어 첫 요청 지연 제거
+            await run_blocking(service_pool.get, request.persona_name)
             return {"success": True, "message": f"{request.persona_name} 선택됨"}
         else:
             raise HTTPException(status_code=404, detail="페르소나를 찾을 수 없습니다")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -111,7 +260,8 @@ async def select_persona(request: PersonaSelectRequest):
 async def create_persona(request: PersonaCreateRequest):
     """새 페르소나 생성"""
     try:
-        success = persona_manager.add_persona_from_url(
+        success = await run_blocking(
+            persona_manager.add_persona_from_url,
             name=request.name,
             url=request.url,
             voice_id=request.voice_id,
@@ -129,11 +279,11 @@ async def create_persona(request: PersonaCreateRequest):
 async def chat(request: ChatRequest):
     """채팅 응답 생성"""
     try:
-        if not chatbot:
-            raise HTTPException(status_code=400, detail="페르소나가 선택되지 않았습니다")
+        services = await run_blocking(resolve_services, request.persona, request.session_id)
+        metrics.set_request_labels(persona=services.name, mode=request.mode)
         
         # 텍스트 응답 생성
-        response_text = chatbot.get_response(request.message)
+        response_text = await run_blocking(services.chatbot.get_response, request.message, request.session_id)
         
         result = {
             "success": True,
@@ -142,62 +292,157 @@ async def chat(request: ChatRequest):
         
         # TTS 모드인 경우 음성 파일 생성
         if request.mode in ['text-to-speech', 'speech-to-speech']:
-            if tts_service:
-                # 임시 파일 생성
-                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-                temp_filename = temp_file.name
-                temp_file.close()
-                
-                # 음성 변환
-                audio = tts_service.convert_text_to_speech(response_text)
-                if audio:
-                    tts_service.save_audio_to_file(audio, temp_filename)
-                    result["audio_url"] = f"/api/audio/{os.path.basename(temp_filename)}"
+            audio_url = await run_blocking(synthesize_segment, response_text, services.tts)
+            if audio_url:
+                result["audio_url"] = audio_url
         
         return result
         
+    except (HTTPException, OverloadedError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/chat/cache")
+async def get_response_cache_stats():
+    """응답 캐시 적중률 및 항목 수 반환 (워커 프로세스별 값)"""
+    cache = get_response_cache()
+    if not cache:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, "stats": cache.stats()}
+
+@app.delete("/api/chat/history")
+async def clear_chat_history(session_id: str, persona: Optional[str] = None):
+    """세션의 대화 기록 삭제 (persona가 있으면 그 페르소나 기록만, 없으면 세션의 모든 페르소나 기록)"""
+    deleted = await run_blocking(get_conversation_memory().clear, session_id, persona)
+    return {"success": True, "persona": persona, "deleted": deleted}
+
+async def audio_stream_response(service, text, keep=False, headers=None):
+    """
+    ElevenLabs 청크를 디스크를 거치지 않고 바로 StreamingResponse로 전달
+    
+    첫 청크를 미리 받아 업스트림 오류는 스트리밍 시작 전에 500으로 응답합니다.
+    keep=True면 전달이 끝난 뒤 같은 오디오를 저장소에 남기고 X-Audio-Url 헤더로 알려줍니다.
+    """
+    headers = dict(headers or {})
+    try:
+        audio = await run_blocking(service.stream_text_to_speech, text)
+        iterator = iter(audio) if audio else iter(())
+        first = await run_blocking(next, iterator, None)
+    except OverloadedError:
+        raise
+    except Exception as e:
+        print(f"❌ 음성 스트리밍 오류: {str(e)}")
+        first = None
+    
+    if first is None:
+        raise HTTPException(status_code=500, detail="음성 변환에 실패했습니다")
+    
+    chunks = itertools.chain([first], iterator)
+    if keep:
+        audio_id = audio_store.new_id()
+        chunks = tee_audio(chunks, lambda data: audio_store.save(data, audio_id))
+        headers["X-Audio-Url"] = audio_store.url_for(audio_id)
+    
+    headers.setdefault("Cache-Control", "no-store")
+    return StreamingResponse(iterate_blocking(chunks), media_type="audio/mpeg", headers=headers)
+
+@app.post("/api/chat/audio")
+async def chat_audio(request: ChatRequest):
+    """채팅 응답을 음성으로 바로 스트리밍 (응답 텍스트는 X-Response-Text 헤더에 URL 인코딩)"""
+    services = await run_blocking(resolve_services, request.persona, request.session_id)
+    metrics.set_request_labels(persona=services.name, mode=request.mode)
+    response_text = await run_blocking(services.chatbot.get_response, request.message, request.session_id)
+    return await audio_stream_response(
+        services.tts,
+        response_text,
+        headers={"X-Response-Text": quote(response_text)}
+    )
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    채팅 응답을 토큰 단위로 스트리밍 (Server-Sent Events)
+    
+    음성 모드에서는 문장이 완성될 때마다 바로 음성을 합성해
+    sentence 이벤트(index, text, audio_url)를 문장 순서대로 함께 보냅니다.
+    """
+    services = await run_blocking(resolve_services, request.persona, request.session_id)
+    metrics.set_request_labels(persona=services.name, mode=request.mode)
+    bot = services.chatbot
+    voice = services.tts if request.mode in ['text-to-speech', 'speech-to-speech'] else None
+    # 스트림을 시작한 뒤에는 503을 보낼 수 없으므로 LLM 대기열이 가득 찼으면 미리 거절
+    ensure_capacity("llm")
+    
+    async def event_stream():
+        parts = []
+        try:
+            deltas = iterate_blocking(bot.stream_response(request.message, request.session_id))
+            if voice:
+                async for event in pipeline_events(deltas, lambda text: synthesize_segment(text, voice)):
+                    if event[0] == "delta":
+                        parts.append(event[1])
+                        yield sse_event("delta", {"text": event[1]})
+                    else:
+                        _, index, sentence, audio_url = event
+                        yield sse_event("sentence", {"index": index, "text": sentence, "audio_url": audio_url})
+            else:
+                async for delta in deltas:
+                    parts.append(delta)
+                    yield sse_event("delta", {"text": delta})
+            yield sse_event("done", {"success": True, "response": "".join(parts).strip()})
+        except OverloadedError as e:
+            yield sse_event("error", {"success": False, "detail": str(e), "retry_after": e.retry_after})
+        except Exception as e:
+            yield sse_event("error", {"success": False, "detail": str(e)})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/speech/upload")
 async def upload_audio_for_transcription(file: UploadFile = File(...)):
     """업로드된 오디오 파일을 텍스트로 변환"""
     try:
-        if not stt_service:
-            raise HTTPException(status_code=400, detail="STT 서비스가 초기화되지 않았습니다")
+        stt = await run_blocking(get_stt_service)
+        metrics.set_request_labels(mode="stt")
         
-        # 지원되는 오디오 형식 확인
-        allowed_types = ["audio/wav", "audio/mpeg", "audio/mp4", "audio/webm", "audio/ogg"]
-        if file.content_type not in allowed_types:
+        # 지원되는 오디오 형식 확인 ("audio/webm;codecs=opus" 같은 파라미터는 무시)
+        content_type = (file.content_type or "").split(";")[0].strip().lower()
+        extension = UPLOAD_AUDIO_EXTENSIONS.get(content_type)
+        if not extension:
             raise HTTPException(status_code=400, detail="지원되지 않는 오디오 형식입니다")
         
-        # 임시 파일에 저장
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.wav')
-        temp_filename = temp_file.name
-        
-        # 파일 내용 읽기 및 저장
-        contents = await file.read()
-        temp_file.write(contents)
-        temp_file.close()
-        
-        # STT 처리
-        transcription = stt_service.transcribe_audio_file(temp_filename)
-        
-        # 임시 파일 삭제
+        filename = f"upload{extension}"
+        preprocess_stats = None
         try:
-            os.unlink(temp_filename)
-        except:
-            pass
+            if audio_preprocess.is_enabled():
+                # 16kHz 모노 + 작은 코덱으로 변환 후 전송 (CPU 작업은 오디오 전용 풀에서)
+                data = await run_blocking(read_audio_stream, file.file)
+                data, filename, preprocess_stats = await run_audio_task(
+                    audio_preprocess.prepare_for_whisper, data, filename
+                )
+                transcription = await run_blocking(stt.transcribe_bytes, data, filename)
+            else:
+                # 업로드 버퍼(메모리 1MB 초과 시 디스크)를 임시 파일 복사 없이 그대로 Whisper에 전달
+                transcription = await run_blocking(stt.transcribe_stream, file.file, filename)
+        except AudioTooLargeError as e:
+            raise HTTPException(status_code=413, detail=str(e))
         
         if transcription and not transcription.startswith("❌"):
-            return {
+            result = {
                 "success": True,
                 "transcription": transcription
             }
+            if preprocess_stats:
+                result["preprocess"] = preprocess_stats
+            return result
         else:
             raise HTTPException(status_code=500, detail=transcription or "음성 인식에 실패했습니다")
         
-    except HTTPException:
+    except (HTTPException, OverloadedError):
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"음성 처리 중 오류: {str(e)}")
@@ -220,73 +465,379 @@ async def handle_speech_recording(request: SpeechRequest):
 async def text_to_speech(request: TTSRequest):
     """텍스트를 음성으로 변환"""
     try:
-        if not tts_service:
-            raise HTTPException(status_code=400, detail="TTS 서비스가 초기화되지 않았습니다")
-        
-        # 임시 파일 생성
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mp3')
-        temp_filename = temp_file.name
-        temp_file.close()
+        services = await run_blocking(resolve_services, request.persona, request.session_id)
+        metrics.set_request_labels(persona=services.name, mode="tts")
         
         # 음성 변환
-        audio = tts_service.convert_text_to_speech(request.text)
-        if audio:
-            tts_service.save_audio_to_file(audio, temp_filename)
+        audio_url = await run_blocking(synthesize_segment, request.text, services.tts)
+        if audio_url:
             return {
                 "success": True,
-                "audio_url": f"/api/audio/{os.path.basename(temp_filename)}"
+                "audio_url": audio_url
             }
         else:
             raise HTTPException(status_code=500, detail="음성 변환에 실패했습니다")
         
+    except (HTTPException, OverloadedError):
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.get("/api/audio/{filename}")
-async def get_audio_file(filename: str):
-    """오디오 파일 제공"""
+@app.post("/api/speech/tts/stream")
+async def text_to_speech_stream(request: TTSStreamRequest):
+    """텍스트를 음성으로 변환하며 MP3 청크를 바로 스트리밍"""
+    services = await run_blocking(resolve_services, request.persona, request.session_id)
+    metrics.set_request_labels(persona=services.name, mode="tts")
+    return await audio_stream_response(services.tts, request.text, keep=request.keep)
+
+@app.get("/api/speech/tts/stream")
+async def text_to_speech_stream_get(text: str, keep: bool = False, persona: Optional[str] = None, session_id: Optional[str] = None):
+    """<audio src>에서 바로 재생할 수 있는 GET 버전의 스트리밍 TTS"""
+    services = await run_blocking(resolve_services, persona, session_id)
+    metrics.set_request_labels(persona=services.name, mode="tts")
+    return await audio_stream_response(services.tts, text, keep=keep)
+
+def synthesize_bytes(service, text):
+    """문장 하나를 음성 바이트로 변환 (워커 스레드에서 실행, 실패 시 None)"""
+    audio = service.convert_text_to_speech(text)
+    return b"".join(audio) if audio else None
+
+@app.websocket("/ws/voice")
+async def voice_socket(websocket: WebSocket, sample_rate: int = 16000, format: str = "pcm16", silence: float = None,
+                       persona: Optional[str] = None, session_id: Optional[str] = None):
+    """
+    전이중 음성 대화 WebSocket
+    
+    클라이언트 → 서버:
+      - 바이너리: 오디오 프레임 (format=pcm16이면 16bit mono PCM, webm/ogg/opus/mp4/wav면 MediaRecorder 청크)
+      - 텍스트: {"type": "end"} 발화 종료 강제 (컨테이너 형식은 필수), {"type": "reset"} 버퍼 비우기
+    서버 → 클라이언트:
+      - 텍스트: ready / speech_end / transcript / delta / sentence / audio_end / done / error (JSON)
+      - 바이너리: sentence 이벤트 직후 해당 문장의 MP3 오디오
+    
+    pcm16은 서버에서 침묵을 감지해 발화 종료 시 바로 STT → 챗봇 → TTS를 실행하고,
+    응답 음성은 문장 단위로 합성되는 대로 같은 소켓으로 보냅니다.
+    """
+    await websocket.accept()
+    
+    try:
+        services = await run_blocking(resolve_services, persona, session_id)
+    except HTTPException as e:
+        await websocket.send_json({"type": "error", "detail": e.detail})
+        await websocket.close(code=1011)
+        return
+    bot, voice = services.chatbot, services.tts
+    stt = await run_blocking(get_stt_service)
+    metrics.set_request_labels(persona=services.name, mode="voice-ws")
+    
+    format = format.lower()
+    if format != "pcm16" and format not in WS_ENCODED_FORMATS:
+        await websocket.send_json({"type": "error", "detail": "지원되지 않는 오디오 형식입니다"})
+        await websocket.close(code=1003)
+        return
+    if format == "pcm16" and not WS_SAMPLE_RATES[0] <= sample_rate <= WS_SAMPLE_RATES[1]:
+        await websocket.send_json({
+            "type": "error",
+            "detail": f"지원되지 않는 샘플링 레이트입니다 ({WS_SAMPLE_RATES[0]}~{WS_SAMPLE_RATES[1]}Hz)"
+        })
+        await websocket.close(code=1003)
+        return
+    
+    segmenter = None
+    if format == "pcm16":
+        segmenter = SpeechSegmenter(
+            sample_rate=sample_rate,
+            silence_threshold=silence if silence is not None else WS_SILENCE_SECONDS,
+            volume_threshold=AudioConfig().volume_threshold
+        )
+    encoded = bytearray()
+    utterances = asyncio.Queue()
+    send_lock = asyncio.Lock()
+    
+    async def send_json(data):
+        async with send_lock:
+            await websocket.send_json(data)
+    
+    async def send_audio(index, audio):
+        # 문장 이벤트와 오디오 바이트가 다른 메시지에 끼어들지 않도록 함께 전송
+        async with send_lock:
+            await websocket.send_bytes(audio)
+            await websocket.send_json({"type": "audio_end", "index": index})
+    
+    async def run_turn(kind, data):
+        if kind == "pcm":
+            if audio_preprocess.is_enabled():
+                audio, filename, _ = await run_audio_task(audio_preprocess.prepare_pcm_for_whisper, data, sample_rate)
+                transcription = await run_blocking(stt.transcribe_bytes, audio, filename)
+            else:
+                transcription = await run_blocking(stt.transcribe_pcm, data, sample_rate, preprocess=False)
+        else:
+            filename = f"speech{WS_ENCODED_FORMATS[format]}"
+            if audio_preprocess.is_enabled():
+                data, filename, _ = await run_audio_task(audio_preprocess.prepare_for_whisper, data, filename)
+            transcription = await run_blocking(stt.transcribe_bytes, data, filename)
+        
+        if not transcription or transcription.startswith("❌"):
+            await send_json({"type": "error", "detail": transcription or "음성 인식에 실패했습니다"})
+            return
+        await send_json({"type": "transcript", "text": transcription})
+        
+        parts = []
+        deltas = iterate_blocking(bot.stream_response(transcription, session_id))
+        async for event in pipeline_events(deltas, lambda text: synthesize_bytes(voice, text)):
+            if event[0] == "delta":
+                parts.append(event[1])
+                await send_json({"type": "delta", "text": event[1]})
+            else:
+                _, index, sentence, audio = event
+                await send_json({"type": "sentence", "index": index, "text": sentence, "has_audio": bool(audio)})
+                if audio:
+                    await send_audio(index, audio)
+        await send_json({"type": "done", "response": "".join(parts).strip()})
+    
+    async def run_turns():
+        # 발화는 들어온 순서대로 하나씩 처리 (수신은 그동안에도 계속됨)
+        while True:
+            kind, data = await utterances.get()
+            try:
+                await run_turn(kind, data)
+            except WebSocketDisconnect:
+                return
+            except OverloadedError as e:
+                try:
+                    await send_json({"type": "error", "detail": str(e), "retry_after": e.retry_after})
+                except Exception:
+                    return
+            except Exception as e:
+                print(f"❌ 음성 대화 처리 오류: {str(e)}")
+                try:
+                    await send_json({"type": "error", "detail": str(e)})
+                except Exception:
+                    return
+    
+    def end_of_speech():
+        if segmenter:
+            utterance = segmenter.flush()
+            return ("pcm", utterance) if utterance else None
+        if not encoded:
+            return None
+        data = bytes(encoded)
+        encoded.clear()
+        return ("encoded", data)
+    
+    worker = asyncio.ensure_future(run_turns())
+    await send_json({"type": "ready", "format": format, "sample_rate": sample_rate})
+    
     try:
-        file_path = os.path.join(tempfile.gettempdir(), filename)
-        if os.path.exists(file_path):
-            return FileResponse(
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+            
+            utterance = None
+            if message.get("bytes"):
+                if segmenter:
+                    pcm = segmenter.feed(message["bytes"])
+                    utterance = ("pcm", pcm) if pcm else None
+                else:
+                    encoded.extend(message["bytes"])
+                    if len(encoded) > WS_MAX_UTTERANCE_BYTES:
+                        encoded.clear()
+                        await send_json({"type": "error", "detail": "발화가 너무 깁니다"})
+            elif message.get("text"):
+                try:
+                    command = json.loads(message["text"]).get("type")
+                except (ValueError, AttributeError):
+                    command = None
+                if command == "end":
+                    utterance = end_of_speech()
+                elif command == "reset":
+                    encoded.clear()
+                    if segmenter:
+                        segmenter.reset()
+            
+            if utterance:
+                await send_json({"type": "speech_end"})
+                await utterances.put(utterance)
+                
+    except WebSocketDisconnect:
+        pass
+    finally:
+        worker.cancel()
+
+@app.get("/api/speech/tts/cache")
+async def get_tts_cache_stats():
+    """TTS 캐시 적중률 및 사용량 반환"""
+    cache = get_tts_cache()
+    if not cache:
+        return {"success": True, "enabled": False}
+    return {"success": True, "enabled": True, "stats": cache.stats()}
+
+@app.get("/api/llm/prompt-cache")
+async def get_prompt_cache_stats():
+    """페르소나별 프롬프트 접두부 캐시 현황과 업스트림 프롬프트 캐시 적중률 (워커 프로세스별 값)"""
+    return {"success": True, "prefixes": get_prompt_cache().stats(), "personas": usage_stats()}
+
+@app.get("/api/audio/{audio_id}")
+async def get_audio_file(audio_id: str, request: Request):
+    """
+    오디오 파일 제공 (저장소가 발급한 ID만 허용, 만료된 파일은 404)
+    
+    저장된 클립은 바뀌지 않으므로 내용 해시 ETag와 immutable 캐시를 붙이고,
+    Range 요청(206)과 If-None-Match(304)로 탐색/재생 시 재다운로드를 피합니다.
+    """
+    try:
+        file_path = audio_store.path(audio_id)
+        if file_path:
+            etag = await run_blocking(audio_store.etag, file_path)
+            expires_in = audio_store.expires_in(file_path)
+            if expires_in is None:
+                cache_control = "public, max-age=31536000, immutable"
+            else:
+                cache_control = f"public, max-age={expires_in}, immutable"
+            return ranged_file_response(
+                request,
                 file_path,
+                etag=etag,
                 media_type="audio/mpeg",
-                filename=filename
+                cache_control=cache_control,
+                filename=f"{audio_id}.mp3"
             )
         else:
             raise HTTPException(status_code=404, detail="파일을 찾을 수 없습니다")
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.on_event("startup")
-async def startup_event():
-    """앱 시작시 초기화"""
-    print("VChat Backend API 시작됨")
-    print(f"프로젝트 루트: {project_root}")
+@app.get("/healthz")
+async def healthz():
+    """프로세스 생존 확인 (이벤트 루프가 응답하면 200)"""
+    return {"status": "ok"}
+
+@app.get("/metrics")
+async def get_metrics():
+    """단계별 지연 시간 / 진행 중 / 오류 지표 (Prometheus 텍스트 형식, 워커 프로세스별 값)"""
+    return PlainTextResponse(metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/readyz")
+async def readyz():
+    """
+    트래픽을 받을 준비가 됐는지 확인 (로드밸런서용)
     
-    # Firebase 연결 테스트 및 데이터 로드
+    페르소나 데이터(로컬 백업 또는 Firestore)와 서비스 예열이 끝나야 200, 그 전에는 503.
+    Firestore 동기화는 준비 조건이 아니며 상태만 알려줍니다.
+    """
+    ready = readiness["personas"] in ("local", "firestore", "empty") and readiness["services"] != "pending"
+    body = {
+        "status": "ready" if ready else "starting",
+        "checks": dict(readiness),
+        "personas": len(persona_manager.get_available_personas()),
+        "startup": startup_report
+    }
+    return JSONResponse(body, status_code=200 if ready else 503)
+
+async def run_startup_step(name, func, *args, timeout=STARTUP_STEP_TIMEOUT):
+    """
+    시작 단계를 워커 스레드에서 제한 시간과 함께 실행하고 소요 시간 기록
+    
+    Returns:
+        tuple: (상태, 결과) / 상태는 "ok", "timeout", "error"
+    """
+    started = time.perf_counter()
     try:
-        # 페르소나 매니저에서 Firebase 연결 확인
-        if persona_manager.db:
-            print("✅ Firebase 연결 확인됨")
-            # 로컬 데이터가 있고 Firebase가 비어있다면 마이그레이션 제안
-            personas = persona_manager.get_available_personas()
-            if not personas and os.path.exists(os.path.join(project_root, 'data/personas.json')):
-                print("🔄 로컬 데이터를 Firebase로 마이그레이션합니다...")
-                if persona_manager.migrate_local_to_firebase():
-                    personas = persona_manager.get_available_personas()
-        else:
-            print("⚠️ Firebase 연결 실패, 로컬 파일 시스템 사용")
-        
-        # 기본 페르소나가 있으면 자동 선택
-        personas = persona_manager.get_available_personas()
-        if personas:
-            persona_manager.select_persona(personas[0])
-            initialize_services()
-            print(f"기본 페르소나 '{personas[0]}' 선택됨")
-            
+        return "ok", await asyncio.wait_for(run_blocking(func, *args), timeout)
+    except asyncio.TimeoutError:
+        print(f"⚠️ 시작 단계 시간 초과: {name} ({timeout:.0f}s)")
+        return "timeout", None
     except Exception as e:
-        print(f"⚠️ 시작 시 오류: {str(e)}")
+        print(f"⚠️ 시작 단계 오류 ({name}): {str(e)}")
+        return "error", None
+    finally:
+        startup_report[f"{name}_seconds"] = round(time.perf_counter() - started, 3)
+
+def select_default_persona():
+    """이 워커의 기본 페르소나가 없으면 첫 번째 페르소나 선택"""
+    personas = persona_manager.get_available_personas()
+    if personas and not persona_manager.get_current_persona():
+        persona_manager.select_persona(personas[0])
+        print(f"기본 페르소나 '{selected_persona_name()}' 선택됨")
+
+async def warm_up():
+    """STT / 기본 페르소나 서비스 예열 후 준비 상태로 전환"""
+    status, _ = await run_startup_step("warmup", warm_up_services)
+    # 예열에 실패해도 요청 때 다시 만들 수 있으므로 트래픽은 받음
+    readiness["services"] = "ready" if status == "ok" else f"lazy ({status})"
+
+async def sync_personas():
+    """Firestore에서 최신 페르소나를 받아 로컬 백업 데이터를 교체 (백그라운드)"""
+    status, synced = await run_startup_step("firestore", persona_manager.sync_from_firebase, timeout=FIRESTORE_SYNC_TIMEOUT)
+    if status == "ok":
+        readiness["firestore"] = "synced" if synced else "unavailable"
+    else:
+        readiness["firestore"] = status
+    
+    if readiness["personas"] == "pending":
+        # 로컬 백업이 없었으면 Firestore 결과로 서비스 시작
+        select_default_persona()
+        readiness["personas"] = "firestore" if persona_manager.get_available_personas() else "empty"
+        await warm_up()
+
+def start_background(coro):
+    task = asyncio.ensure_future(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+async def startup_sequence():
+    """
+    앱 시작 처리
+    
+    로컬 백업 로드와 세션 정리를 동시에 실행해 바로 서비스를 시작하고,
+    Firebase 초기화 / Firestore 동기화와 서비스 예열은 백그라운드에서 진행합니다.
+    """
+    print("VChat Backend API 시작됨")
+    print(f"프로젝트 루트: {project_root}")
+    started = time.perf_counter()
+    
+    # 오래된 오디오 파일 정리 스레드 시작
+    audio_store.start_sweeper()
+    
+    (backup_status, has_backup), (_, purged) = await asyncio.gather(
+        run_startup_step("backup", persona_manager.load_backup),
+        run_startup_step("sessions", session_store.purge_expired)
+    )
+    if purged:
+        print(f"🧹 만료된 세션 값 {purged}개 삭제")
+    
+    # Firestore는 느릴 수 있으므로 기다리지 않음 (끝나면 데이터만 교체)
+    start_background(sync_personas())
+    
+    if backup_status == "ok" and has_backup:
+        readiness["personas"] = "local"
+        select_default_persona()
+        start_background(warm_up())
+    else:
+        print("📁 로컬 백업이 없어 Firestore 로드를 기다립니다")
+    
+    startup_report["startup_seconds"] = round(time.perf_counter() - started, 3)
+    print(
+        f"⏱️ 시작 시간: import {startup_report['import_seconds']:.2f}s, "
+        f"startup {startup_report['startup_seconds']:.2f}s"
+    )
+
+async def shutdown_sequence():
+    """앱 종료시 정리"""
+    for task in list(background_tasks):
+        task.cancel()
+    audio_store.stop_sweeper()
+    shutdown_executor(wait=False)
+    shutdown_hedge_executor()
+    get_conversation_memory().shutdown()
+    close_exporters()
+    close_clients()
+
+startup_report["import_seconds"] = round(time.perf_counter() - _import_started, 3)
 
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,322 @@
+"""
+업스트림 입장 제어 모듈
+OpenAI(LLM / STT)와 ElevenLabs(TTS) 호출마다 동시 실행 수 제한 + 토큰 버킷 속도 제한 + 제한된 대기열을 적용해
+트래픽이 몰릴 때 업스트림 429로 무너지는 대신 빠르게 503(Retry-After)으로 거절
+"""
+
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from .metrics import Counter, Gauge, observe_stage
+
+DEFAULT_MAX_WAIT = 10.0  # 대기열에서 기다리는 최대 시간 (초)
+
+# 업스트림별 기본값 (동시 실행 수, 대기열 길이) - 대기 중인 요청도 워커 스레드를 쓰므로
+# 합계가 VCHAT_MAX_WORKERS(기본 32)를 크게 넘지 않도록 설정
+UPSTREAM_DEFAULTS = {
+    "llm": {"max_concurrency": 16, "max_queue": 32},
+    "stt": {"max_concurrency": 8, "max_queue": 16},
+    "tts": {"max_concurrency": 5, "max_queue": 20}  # ElevenLabs 요금제별 동시 요청 한도 기준
+}
+
+ADMISSION_IN_FLIGHT = Gauge(
+    "vchat_admission_in_flight",
+    "업스트림별 실행 중인 호출 수",
+    ("upstream",)
+)
+ADMISSION_QUEUED = Gauge(
+    "vchat_admission_queued",
+    "업스트림별 입장 대기 중인 호출 수",
+    ("upstream",)
+)
+ADMISSION_REJECTED = Counter(
+    "vchat_admission_rejected_total",
+    "입장 거절 수 (queue_full: 대기열 가득, timeout: 대기 시간 초과, upstream_429: 업스트림 한도 초과)",
+    ("upstream", "reason")
+)
+
+
+class OverloadedError(Exception):
+    """업스트림 한도에 걸려 요청을 처리할 수 없을 때 발생 (HTTP 503 + Retry-After로 응답)"""
+
+    def __init__(self, upstream, retry_after=1, reason="queue_full"):
+        self.upstream = upstream
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+        self.reason = reason
+        super().__init__(f"{upstream} 요청이 많아 잠시 후 다시 시도해주세요 ({reason}, {self.retry_after}초 후)")
+
+
+def _env_number(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class UpstreamLimiter:
+    """
+    업스트림 하나의 입장 제어 클래스 (스레드 안전, 도착 순서대로 입장)
+
+    - max_concurrency: 동시에 실행할 수 있는 호출 수 (0이면 제한 없음)
+    - rate / burst: 초당 허용 호출 수와 순간 허용량 (토큰 버킷, rate 0이면 제한 없음)
+    - max_queue: 자리가 없을 때 기다릴 수 있는 호출 수 (넘으면 바로 거절)
+    - max_wait: 대기열에서 기다리는 최대 시간 (넘으면 거절)
+    """
+
+    def __init__(self, name, max_concurrency=0, rate=0.0, burst=None, max_queue=0, max_wait=DEFAULT_MAX_WAIT):
+        self.name = name
+        self.max_concurrency = int(max_concurrency)
+        self.rate = float(rate)
+        self.burst = float(burst) if burst else float(max(1, self.max_concurrency or 1))
+        self.max_queue = int(max_queue)
+        self.max_wait = float(max_wait)
+
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._in_flight = 0
+        self._tokens = self.burst
+        self._refilled = time.monotonic()
+        self._paused_until = 0.0
+        self._avg_hold = 1.0  # 호출 한 번이 자리를 차지하는 평균 시간 (Retry-After 추정용)
+
+    @classmethod
+    def from_env(cls, name):
+        """
+        환경변수로 입장 제어 설정 (NAME은 LLM / STT / TTS)
+
+        VCHAT_<NAME>_MAX_CONCURRENCY, VCHAT_<NAME>_RPM(분당 호출 수), VCHAT_<NAME>_BURST,
+        VCHAT_<NAME>_QUEUE, VCHAT_ADMISSION_MAX_WAIT
+        """
+        prefix = f"VCHAT_{name.upper()}_"
+        defaults = UPSTREAM_DEFAULTS.get(name, {})
+        return cls(
+            name,
+            max_concurrency=int(_env_number(prefix + "MAX_CONCURRENCY", defaults.get("max_concurrency", 0))),
+            rate=_env_number(prefix + "RPM", 0) / 60,
+            burst=_env_number(prefix + "BURST", 0) or None,
+            max_queue=int(_env_number(prefix + "QUEUE", defaults.get("max_queue", 0))),
+            max_wait=_env_number("VCHAT_ADMISSION_MAX_WAIT", DEFAULT_MAX_WAIT)
+        )
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._refilled) * self.rate)
+        self._refilled = now
+
+    def _wait_time(self, now):
+        """지금 입장하려면 더 기다려야 하는 시간 (0이면 바로 입장, None이면 자리가 날 때까지)"""
+        if now < self._paused_until:
+            return self._paused_until - now
+        if self.max_concurrency > 0 and self._in_flight >= self.max_concurrency:
+            return None
+        if self.rate > 0 and self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        return 0.0
+
+    def retry_after(self):
+        """지금 거절한 요청이 다시 시도할 만한 시간 (초) 추정"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        ahead = len(self._queue) + 1
+        estimates = [1.0]
+        if self.rate > 0:
+            estimates.append(ahead / self.rate)
+        if self.max_concurrency > 0:
+            estimates.append(ahead * self._avg_hold / self.max_concurrency)
+        return min(60.0, max(estimates))
+
+    def _reject(self, reason, retry_after=None):
+        ADMISSION_REJECTED.inc(upstream=self.name, reason=reason)
+        return OverloadedError(self.name, retry_after if retry_after is not None else self.retry_after(), reason)
+
+    def ensure_capacity(self):
+        """대기열이 이미 가득 찼으면 바로 OverloadedError (스트리밍 응답을 시작하기 전 확인용)"""
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            wait = self._wait_time(now)
+            if wait != 0 and len(self._queue) >= self.max_queue:
+                raise self._reject("queue_full")
+            if wait is not None and wait > self.max_wait:
+                raise self._reject("queue_full", wait)
+
+    def acquire(self):
+        """
+        입장할 때까지 대기 (도착 순서대로)
+
+        Returns:
+            float: 입장 시각 (release에 전달)
+
+        Raises:
+            OverloadedError: 대기열이 가득 찼거나 max_wait 안에 입장하지 못한 경우
+        """
+        started = time.monotonic()
+        deadline = started + self.max_wait
+        ticket = object()
+
+        with self._cond:
+            self._refill(started)
+            wait = self._wait_time(started)
+            if not self._queue and wait == 0:
+                return self._enter(started, started)
+
+            if len(self._queue) >= self.max_queue:
+                raise self._reject("queue_full")
+            if wait is not None and started + wait > deadline:
+                raise self._reject("queue_full", wait)
+
+            self._queue.append(ticket)
+            ADMISSION_QUEUED.inc(upstream=self.name)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    wait = self._wait_time(now) if self._queue[0] is ticket else None
+                    if wait == 0:
+                        self._queue.popleft()
+                        self._cond.notify_all()
+                        return self._enter(started, now)
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._queue.remove(ticket)
+                        self._cond.notify_all()
+                        raise self._reject("timeout")
+                    self._cond.wait(min(remaining, wait) if wait else remaining)
+            finally:
+                ADMISSION_QUEUED.dec(upstream=self.name)
+
+    def try_acquire(self):
+        """
+        기다리지 않고 바로 입장할 수 있을 때만 입장 (hedge 요청용, 대기열은 건너뛰지 않음)
+
+        Returns:
+            float: 입장 시각 또는 None
+        """
+        with self._cond:
+            now = time.monotonic()
+            self._refill(now)
+            if self._queue or self._wait_time(now) != 0:
+                return None
+            self._in_flight += 1
+            if self.rate > 0:
+                self._tokens -= 1
+        ADMISSION_IN_FLIGHT.inc(upstream=self.name)
+        return now
+
+    def _enter(self, started, now):
+        self._in_flight += 1
+        if self.rate > 0:
+            self._tokens -= 1
+        ADMISSION_IN_FLIGHT.inc(upstream=self.name)
+        observe_stage(f"{self.name}_queue", now - started)
+        return now
+
+    def release(self, entered):
+        """호출이 끝나 자리를 반납"""
+        held = time.monotonic() - entered
+        with self._cond:
+            self._in_flight -= 1
+            self._avg_hold = 0.8 * self._avg_hold + 0.2 * held
+            self._cond.notify_all()
+        ADMISSION_IN_FLIGHT.dec(upstream=self.name)
+
+    def pause(self, seconds):
+        """업스트림이 429를 돌려준 경우 잠시 새 호출을 보내지 않음"""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "in_flight": self._in_flight,
+                "queued": len(self._queue),
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "rpm": round(self.rate * 60, 2)
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(name):
+    """업스트림 이름(llm / stt / tts)별 프로세스 전역 입장 제어 반환"""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = UpstreamLimiter.from_env(name)
+    return limiter
+
+
+def _upstream_retry_after(error, default=5.0):
+    """업스트림 429 응답의 Retry-After 헤더 값 (없으면 기본값)"""
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    try:
+        value = headers.get("retry-after") if headers else None
+        return float(value) if value else default
+    except (TypeError, ValueError):
+        return default
+
+
+def _check_rate_limited(limiter, error):
+    """업스트림 429 예외를 OverloadedError로 바꿔 반환 (아니면 None)"""
+    if getattr(error, "status_code", None) != 429:
+        return None
+    retry_after = _upstream_retry_after(error)
+    limiter.pause(retry_after)
+    return limiter._reject("upstream_429", retry_after)
+
+
+@contextmanager
+def admit(upstream):
+    """
+    with 블록을 업스트림 호출로 보고 입장 제어 적용
+
+    블록 안에서 업스트림이 429를 돌려주면 잠시 호출을 멈추고 OverloadedError로 바꿔 전달합니다.
+
+    Args:
+        upstream (str): "llm" / "stt" / "tts"
+    """
+    limiter = get_limiter(upstream)
+    entered = limiter.acquire()
+    try:
+        yield
+    except Exception as e:
+        overloaded = _check_rate_limited(limiter, e)
+        if overloaded is not None:
+            raise overloaded from e
+        raise
+    finally:
+        limiter.release(entered)
+
+
+def admit_iter(upstream, iterable):
+    """
+    첫 항목을 요청할 때 실제 호출이 일어나는 스트림(ElevenLabs 청크 등)에 입장 제어 적용
+
+    Yields:
+        이터러블의 각 항목 (끝까지 소비하거나 닫힐 때 자리 반납)
+    """
+    with admit(upstream):
+        yield from iterable
+
+
+def ensure_capacity(upstream):
+    """대기열이 가득 찬 업스트림이면 바로 OverloadedError"""
+    get_limiter(upstream).ensure_capacity()
+
+
+def admission_stats():
+    """업스트림별 입장 제어 현황"""
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,214 @@
+"""
+비동기 실행 유틸리티 모듈
+동기 방식의 OpenAI / ElevenLabs / Whisper 호출을 이벤트 루프 밖에서 실행
+"""
+
+import asyncio
+import contextvars
+import functools
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# 동시에 실행할 수 있는 블로킹 작업 수 (업스트림 API 호출 대부분이 I/O 대기)
+DEFAULT_MAX_WORKERS = 32
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# 오디오 변환 같은 CPU 작업은 별도 풀에서 실행해 API 호출 스레드를 점유하지 않도록 함
+_audio_executor = None
+
+
+def get_max_workers():
+    """환경변수 VCHAT_MAX_WORKERS에서 워커 수를 읽어 반환"""
+    try:
+        value = int(os.getenv('VCHAT_MAX_WORKERS', DEFAULT_MAX_WORKERS))
+    except ValueError:
+        value = DEFAULT_MAX_WORKERS
+    return max(1, value)
+
+
+def get_executor():
+    """프로세스 전역 스레드 풀 반환 (최초 호출 시 생성)"""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_max_workers(),
+                    thread_name_prefix="vchat-worker"
+                )
+    return _executor
+
+
+def get_audio_executor():
+    """오디오 전처리용 스레드 풀 반환 (크기: VCHAT_AUDIO_WORKERS, 기본값 CPU 수)"""
+    global _audio_executor
+    if _audio_executor is None:
+        with _executor_lock:
+            if _audio_executor is None:
+                try:
+                    workers = int(os.getenv('VCHAT_AUDIO_WORKERS', os.cpu_count() or 2))
+                except ValueError:
+                    workers = os.cpu_count() or 2
+                _audio_executor = ThreadPoolExecutor(
+                    max_workers=max(1, workers),
+                    thread_name_prefix="vchat-audio"
+                )
+    return _audio_executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    블로킹 함수를 스레드 풀에서 실행하고 결과를 기다림
+
+    asyncio.to_thread와 같이 contextvars를 복사해서 넘기므로
+    요청 단위 컨텍스트가 워커 스레드에서도 유지됩니다.
+
+    Args:
+        func: 실행할 동기 함수
+        *args, **kwargs: 함수 인자
+
+    Returns:
+        함수 반환값
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_executor(), call)
+
+
+async def run_audio_task(func, *args, **kwargs):
+    """오디오 디코딩/리샘플링/인코딩 작업을 오디오 전용 풀에서 실행 (run_blocking과 동일한 방식)"""
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    return await loop.run_in_executor(get_audio_executor(), call)
+
+
+async def iterate_blocking(iterable, max_buffer=64):
+    """
+    동기 이터레이터(스트리밍 응답 등)를 스레드 풀에서 소비하며 비동기로 전달
+
+    Args:
+        iterable: 블로킹 방식의 이터러블 (예: OpenAI stream=True 응답)
+        max_buffer (int): 소비자가 느릴 때 쌓아둘 최대 항목 수
+
+    Yields:
+        이터러블의 각 항목
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    # 소비자에게 넘겼지만 아직 읽히지 않은 항목 수 제한 (백프레셔)
+    slots = threading.Semaphore(max_buffer)
+    stop_event = threading.Event()
+    done = object()
+
+    def put(item):
+        loop.call_soon_threadsafe(queue.put_nowait, item)
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                # 소비자가 느리면 워커 스레드가 대기하고, 소비자가 멈추면 다음 항목 전에 종료
+                slots.acquire()
+                if stop_event.is_set():
+                    break
+                put((item, None))
+        except BaseException as e:
+            put((done, e))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if stop_event.is_set() and close:
+                try:
+                    close()
+                except Exception:
+                    pass
+        put((done, None))
+
+    ctx = contextvars.copy_context()
+    producer = loop.run_in_executor(get_executor(), ctx.run, produce)
+
+    try:
+        while True:
+            item, error = await queue.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                break
+            slots.release()
+            yield item
+    finally:
+        # 클라이언트 연결이 끊긴 경우 대기 중인 워커 스레드를 깨워 이터레이터를 닫게 함
+        stop_event.set()
+        slots.release()
+        await asyncio.wait([producer])
+
+
+def read_ahead(iterable):
+    """
+    동기 이터러블을 전용 스레드에서 소비자와 무관하게 끝까지 읽으며 전달
+
+    원본(업스트림 스트림)은 자기 속도로 끝까지 읽히므로, 원본 쪽에서 잡은 자원(입장 제어 자리 등)은
+    소비자가 느리거나 생성기를 늦게 닫아도 원본이 끝나는 즉시 반납됩니다.
+    버퍼 크기 제한이 없으므로 길이가 정해진 스트림(max_tokens가 있는 LLM 응답 등)에만 사용합니다.
+
+    Args:
+        iterable: 블로킹 방식의 이터러블
+
+    Yields:
+        이터러블의 각 항목 (중간에 닫으면 원본도 다음 항목에서 닫음)
+    """
+    items = queue.Queue()
+    stop_event = threading.Event()
+    done = object()
+
+    def produce():
+        iterator = iter(iterable)
+        try:
+            for item in iterator:
+                if stop_event.is_set():
+                    break
+                items.put((item, None))
+        except BaseException as e:
+            items.put((done, e))
+            return
+        finally:
+            close = getattr(iterator, "close", None)
+            if stop_event.is_set() and close:
+                try:
+                    close()
+                except Exception:
+                    pass
+        items.put((done, None))
+
+    # 작업 풀 스레드가 서로를 기다리며 막히지 않도록 풀 밖의 스레드에서 실행
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(produce,), name="vchat-read-ahead", daemon=True).start()
+
+    try:
+        while True:
+            item, error = items.get()
+            if item is done:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop_event.set()
+
+
+def shutdown_executor(wait=False):
+    """스레드 풀 종료"""
+    global _executor, _audio_executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=wait)
+            _executor = None
+        if _audio_executor is not None:
+            _audio_executor.shutdown(wait=wait)
+            _audio_executor = None
@@ -0,0 +1,267 @@
+"""
+STT 오디오 전처리 모듈
+Whisper 업로드 전에 16kHz 모노로 다운믹스/리샘플링하고 작은 코덱으로 다시 인코딩
+(numpy는 첫 변환 때 import해 서버 시작 시간에 포함되지 않음)
+"""
+
+import io
+import os
+import time
+import wave
+from .metrics import observe_stage
+
+# Whisper는 내부적으로 16kHz 모노로 처리하므로 그 이상은 대역폭 낭비
+TARGET_SAMPLE_RATE = 16000
+LOWPASS_TAPS = 63
+
+CODEC_EXTENSIONS = {"flac": ".flac", "opus": ".ogg", "wav": ".wav"}
+
+# 인코더가 없는 코덱(pydub / ffmpeg 미설치, ffmpeg에 코덱 없음)은 다시 시도하지 않고 바로 WAV 사용
+# (일시적인 인코딩 실패는 그 요청만 WAV로 보냄)
+_unavailable_codecs = set()
+_MISSING_ENCODER_MESSAGES = ("unknown encoder", "encoder not found")
+
+
+def is_enabled():
+    """환경변수 VCHAT_STT_PREPROCESS로 전처리 사용 여부 확인 (기본값: 사용)"""
+    return os.getenv('VCHAT_STT_PREPROCESS', '1').lower() not in ('0', 'false', 'no', 'off')
+
+
+def get_codec():
+    """환경변수 VCHAT_STT_CODEC에서 출력 코덱 반환 (flac / opus / wav)"""
+    codec = os.getenv('VCHAT_STT_CODEC', 'flac').lower()
+    return codec if codec in CODEC_EXTENSIONS else 'flac'
+
+
+def decode_wav(data):
+    """
+    WAV 바이트를 모노 float 샘플로 디코딩
+
+    Args:
+        data (bytes): WAV 파일 데이터
+
+    Returns:
+        tuple: (samples, sample_rate) / 지원하지 않는 WAV면 None
+    """
+    import numpy as np
+
+    with wave.open(io.BytesIO(data), 'rb') as wf:
+        channels = wf.getnchannels()
+        sample_width = wf.getsampwidth()
+        sample_rate = wf.getframerate()
+        frames = wf.readframes(wf.getnframes())
+
+    if sample_width == 2:
+        samples = np.frombuffer(frames, dtype='<i2').astype(np.float32)
+    elif sample_width == 1:
+        samples = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128.0) * 256.0
+    elif sample_width == 3:
+        # 24bit는 numpy 자료형이 없으므로 하위 바이트를 0으로 채운 32bit로 읽음
+        raw = np.frombuffer(frames, dtype=np.uint8).reshape(-1, 3)
+        padded = np.zeros((len(raw), 4), dtype=np.uint8)
+        padded[:, 1:] = raw
+        samples = padded.view('<i4').reshape(-1).astype(np.float32) / 65536.0
+    elif sample_width == 4:
+        samples = np.frombuffer(frames, dtype='<i4').astype(np.float32) / 65536.0
+    else:
+        return None
+
+    return downmix(samples, channels), sample_rate
+
+
+def downmix(samples, channels):
+    """인터리브된 다채널 샘플을 모노로 평균"""
+    if channels <= 1:
+        return samples
+    usable = len(samples) - len(samples) % channels
+    return samples[:usable].reshape(-1, channels).mean(axis=1)
+
+
+def resample(samples, source_rate, target_rate=TARGET_SAMPLE_RATE):
+    """
+    샘플링 레이트 변환 (다운샘플링 시 에일리어싱 방지용 저역 통과 필터 적용)
+
+    Args:
+        samples (np.ndarray): 모노 float 샘플
+        source_rate (int): 원본 샘플링 레이트
+        target_rate (int): 목표 샘플링 레이트
+
+    Returns:
+        np.ndarray: 변환된 샘플
+    """
+    import numpy as np
+
+    if source_rate == target_rate or len(samples) == 0:
+        return samples
+
+    if target_rate < source_rate and len(samples) > LOWPASS_TAPS:
+        # 목표 나이퀴스트 주파수 직전에서 자르는 윈도우 sinc FIR 필터
+        cutoff = 0.45 * target_rate / source_rate
+        n = np.arange(LOWPASS_TAPS) - (LOWPASS_TAPS - 1) / 2
+        kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(LOWPASS_TAPS)
+        kernel /= kernel.sum()
+        samples = np.convolve(samples, kernel, mode='same')
+
+    duration = len(samples) / source_rate
+    target_length = max(1, int(round(duration * target_rate)))
+    source_times = np.arange(len(samples)) / source_rate
+    target_times = np.arange(target_length) / target_rate
+    return np.interp(target_times, source_times, samples)
+
+
+def to_pcm16(samples):
+    """float 샘플을 16bit PCM 바이트로 변환"""
+    import numpy as np
+
+    return np.clip(np.round(samples), -32768, 32767).astype('<i2').tobytes()
+
+
+def encode_wav(pcm, sample_rate=TARGET_SAMPLE_RATE, channels=1):
+    """16bit PCM을 WAV 바이트로 인코딩"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(pcm)
+    return buffer.getvalue()
+
+
+def encode_pcm(pcm, codec, sample_rate=TARGET_SAMPLE_RATE):
+    """
+    16bit 모노 PCM을 지정한 코덱으로 인코딩 (ffmpeg가 없으면 WAV로 대체)
+
+    Returns:
+        tuple: (인코딩된 바이트, 실제 사용한 코덱)
+    """
+    if codec != 'wav' and codec not in _unavailable_codecs:
+        try:
+            from pydub import AudioSegment
+
+            segment = AudioSegment(data=pcm, sample_width=2, frame_rate=sample_rate, channels=1)
+            buffer = io.BytesIO()
+            if codec == 'opus':
+                segment.export(buffer, format='ogg', codec='libopus', bitrate='24k')
+            else:
+                segment.export(buffer, format='flac')
+            return buffer.getvalue(), codec
+        except Exception as e:
+            if _encoder_missing(e):
+                _unavailable_codecs.add(codec)
+                print(f"⚠️ {codec} 인코더를 사용할 수 없어 이후 WAV로 대체: {str(e)}")
+            else:
+                print(f"⚠️ {codec} 인코딩 실패, 이번 요청은 WAV로 대체: {str(e)}")
+
+    return encode_wav(pcm, sample_rate), 'wav'
+
+
+def _encoder_missing(error):
+    """인코더 자체가 없어 다시 시도해도 실패할 오류인지 판단"""
+    # pydub 미설치 → ImportError, ffmpeg 실행 파일 없음 → FileNotFoundError
+    if isinstance(error, (ImportError, FileNotFoundError)):
+        return True
+    message = str(error).lower()
+    return any(text in message for text in _MISSING_ENCODER_MESSAGES)
+
+
+def _decode_with_ffmpeg(data, extension):
+    """webm/ogg/mp3 등 압축 포맷을 pydub(ffmpeg)로 16kHz 모노 PCM 디코딩"""
+    from pydub import AudioSegment
+
+    segment = AudioSegment.from_file(io.BytesIO(data), format=extension.lstrip('.') or None)
+    segment = segment.set_frame_rate(TARGET_SAMPLE_RATE).set_channels(1).set_sample_width(2)
+    return segment.raw_data
+
+
+def _finish(data, filename, pcm, started, codec):
+    """인코딩 후 원본보다 작을 때만 교체하고 통계 생성"""
+    encoded, used_codec = encode_pcm(pcm, codec)
+    original_bytes = len(data)
+
+    if len(encoded) < original_bytes:
+        stem = os.path.splitext(os.path.basename(filename))[0] or 'audio'
+        data, filename = encoded, f"{stem}{CODEC_EXTENSIONS[used_codec]}"
+    else:
+        used_codec = None
+
+    observe_stage("stt_preprocess", time.perf_counter() - started)
+    stats = {
+        "original_bytes": original_bytes,
+        "bytes": len(data),
+        "bytes_saved": original_bytes - len(data),
+        "codec": used_codec,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+    if stats["bytes_saved"] > 0:
+        print(f"🎚️ STT 전처리: {original_bytes} → {len(data)} bytes ({stats['bytes_saved']} bytes 절약, {used_codec})")
+    return data, filename, stats
+
+
+def _unchanged(data, filename, started):
+    observe_stage("stt_preprocess", time.perf_counter() - started)
+    return data, filename, {
+        "original_bytes": len(data),
+        "bytes": len(data),
+        "bytes_saved": 0,
+        "codec": None,
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def prepare_for_whisper(data, filename, codec=None):
+    """
+    업로드된 오디오를 16kHz 모노 + 작은 코덱으로 변환
+
+    WAV는 numpy로 직접 처리하고, 그 외 형식은 pydub(ffmpeg)가 있을 때만 변환합니다.
+    변환에 실패하거나 결과가 더 크면 원본을 그대로 돌려줍니다.
+
+    Args:
+        data (bytes): 원본 오디오
+        filename (str): 원본 파일명 (확장자로 형식 판단)
+        codec (str, optional): 출력 코덱 (기본값: VCHAT_STT_CODEC)
+
+    Returns:
+        tuple: (오디오 바이트, 파일명, 통계 dict)
+    """
+    started = time.perf_counter()
+    codec = codec or get_codec()
+    extension = os.path.splitext(filename)[1].lower()
+
+    try:
+        if extension == '.wav' or data[:4] == b'RIFF':
+            decoded = decode_wav(data)
+            if decoded is None:
+                return _unchanged(data, filename, started)
+            samples, sample_rate = decoded
+            pcm = to_pcm16(resample(samples, sample_rate))
+        else:
+            pcm = _decode_with_ffmpeg(data, extension)
+    except Exception as e:
+        print(f"⚠️ STT 전처리 생략 ({filename}): {str(e)}")
+        return _unchanged(data, filename, started)
+
+    return _finish(data, filename, pcm, started, codec)
+
+
+def prepare_pcm_for_whisper(pcm_data, sample_rate, channels=1, codec=None):
+    """
+    16bit PCM 녹음(CLI 44.1kHz, WebSocket 등)을 Whisper 업로드용으로 변환
+
+    Args:
+        pcm_data (bytes): 16bit little-endian PCM
+        sample_rate (int): 원본 샘플링 레이트
+        channels (int): 원본 채널 수
+        codec (str, optional): 출력 코덱 (기본값: VCHAT_STT_CODEC)
+
+    Returns:
+        tuple: (오디오 바이트, 파일명, 통계 dict)
+    """
+    import numpy as np
+
+    started = time.perf_counter()
+    samples = downmix(np.frombuffer(pcm_data, dtype='<i2').astype(np.float32), channels)
+    pcm = to_pcm16(resample(samples, sample_rate))
+
+    # 비교 기준은 원본을 그대로 WAV로 보냈을 때의 크기
+    original = encode_wav(pcm_data, sample_rate, channels)
+    return _finish(original, "speech.wav", pcm, started, codec or get_codec())
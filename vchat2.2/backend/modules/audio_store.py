@@ -0,0 +1,268 @@
+"""
+오디오 파일 저장소 모듈
+/api/audio로 제공하는 합성 음성 파일을 전용 디렉토리에 보관하고 TTL/용량 기준으로 정리
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from .metrics import observe_stage, record_stage_error
+
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_MB = 256
+DEFAULT_SWEEP_SECONDS = 60
+ETAG_MEMO_SIZE = 1024
+
+AUDIO_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def _env_number(name, default):
+    """환경변수 숫자 값 읽기 (잘못된 값이면 기본값)"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class AudioStore:
+    """TTL과 총 용량 제한이 있는 오디오 파일 저장소 클래스"""
+
+    def __init__(self, directory=None, ttl_seconds=None, max_bytes=None, sweep_interval=None):
+        """
+        오디오 저장소 초기화
+
+        Args:
+            directory (str, optional): 저장 디렉토리
+            ttl_seconds (float, optional): 파일 보관 시간 (초)
+            max_bytes (int, optional): 저장소 최대 용량 (바이트)
+            sweep_interval (float, optional): 백그라운드 정리 주기 (초)
+        """
+        self.directory = directory or os.getenv(
+            'VCHAT_AUDIO_DIR',
+            os.path.join(tempfile.gettempdir(), 'vchat_audio')
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_number('VCHAT_AUDIO_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+        self.max_bytes = max_bytes if max_bytes is not None else int(_env_number('VCHAT_AUDIO_MAX_MB', DEFAULT_MAX_MB) * 1024 * 1024)
+        self.sweep_interval = sweep_interval if sweep_interval is not None else _env_number('VCHAT_AUDIO_SWEEP_SECONDS', DEFAULT_SWEEP_SECONDS)
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._stop_event = threading.Event()
+        self._sweeper = None
+
+        # 저장된 파일은 바뀌지 않으므로 (경로, 수정시각, 크기)별로 해시를 한 번만 계산
+        self._etags = OrderedDict()
+        self._etag_lock = threading.Lock()
+
+    @staticmethod
+    def new_id():
+        """추측할 수 없는 새 오디오 ID 생성"""
+        return uuid.uuid4().hex
+
+    @staticmethod
+    def url_for(audio_id):
+        """오디오 ID의 재생 URL 반환"""
+        return f"/api/audio/{audio_id}"
+
+    def _file_path(self, audio_id):
+        return os.path.join(self.directory, f"{audio_id}.mp3")
+
+    def save(self, data, audio_id=None):
+        """
+        완성된 오디오 바이트 저장
+
+        Args:
+            data (bytes): 오디오 데이터
+            audio_id (str, optional): 미리 발급한 ID (없으면 새로 발급)
+
+        Returns:
+            str: 오디오 ID
+        """
+        return self.save_stream([data], audio_id)
+
+    def save_stream(self, chunks, audio_id=None):
+        """
+        오디오 청크를 받아 저장 (끝까지 받은 뒤에만 조회 가능)
+
+        Args:
+            chunks: 오디오 청크 이터러블
+            audio_id (str, optional): 미리 발급한 ID (없으면 새로 발급)
+
+        Returns:
+            str: 오디오 ID 또는 None (받은 데이터가 없는 경우)
+        """
+        audio_id = audio_id or self.new_id()
+        path = self._file_path(audio_id)
+        partial = f"{path}.part"
+
+        size = 0
+        # 청크가 스트리밍으로 들어오는 경우 업스트림 대기 시간은 빼고 디스크 쓰기 시간만 기록
+        write_seconds = 0.0
+        try:
+            with open(partial, 'wb') as f:
+                for chunk in chunks:
+                    started = time.perf_counter()
+                    f.write(chunk)
+                    write_seconds += time.perf_counter() - started
+                    size += len(chunk)
+            if size == 0:
+                os.unlink(partial)
+                return None
+            started = time.perf_counter()
+            os.replace(partial, path)
+            write_seconds += time.perf_counter() - started
+            observe_stage("audio_save", write_seconds)
+        except BaseException as e:
+            if isinstance(e, OSError):
+                record_stage_error("audio_save", type(e).__name__)
+            try:
+                os.unlink(partial)
+            except OSError:
+                pass
+            raise
+
+        return audio_id
+
+    def path(self, audio_id):
+        """
+        오디오 ID에 해당하는 파일 경로 반환
+
+        Args:
+            audio_id (str): 오디오 ID
+
+        Returns:
+            str: 파일 경로 또는 None (잘못된 ID, 없는 파일, 만료된 파일)
+        """
+        if not audio_id or not AUDIO_ID_PATTERN.match(audio_id):
+            return None
+
+        path = self._file_path(audio_id)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        if self.ttl_seconds > 0 and time.time() - mtime > self.ttl_seconds:
+            return None
+        return path
+
+    def etag(self, path):
+        """
+        파일 내용의 SHA-256으로 강한 ETag 생성
+
+        Args:
+            path (str): path()로 얻은 파일 경로
+
+        Returns:
+            str: 따옴표를 포함한 ETag
+        """
+        stat = os.stat(path)
+        memo_key = (path, stat.st_mtime_ns, stat.st_size)
+        with self._etag_lock:
+            etag = self._etags.get(memo_key)
+            if etag:
+                self._etags.move_to_end(memo_key)
+                return etag
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(64 * 1024), b''):
+                digest.update(block)
+        etag = f'"{digest.hexdigest()[:32]}"'
+
+        with self._etag_lock:
+            self._etags[memo_key] = etag
+            while len(self._etags) > ETAG_MEMO_SIZE:
+                self._etags.popitem(last=False)
+        return etag
+
+    def expires_in(self, path):
+        """파일이 만료되기까지 남은 시간 (초, TTL이 없으면 None)"""
+        if self.ttl_seconds <= 0:
+            return None
+        try:
+            age = time.time() - os.path.getmtime(path)
+        except OSError:
+            return 0
+        return max(0, int(self.ttl_seconds - age))
+
+    def sweep(self):
+        """
+        만료된 파일을 지우고 총 용량이 제한을 넘으면 오래된 파일부터 삭제
+
+        Returns:
+            dict: 삭제한 파일 수와 남은 용량
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return {"removed": 0, "files": 0, "bytes": 0}
+
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+
+            # 중단된 .part 파일도 TTL이 지나면 정리
+            expired = self.ttl_seconds > 0 and now - stat.st_mtime > self.ttl_seconds
+            if expired or (name.endswith('.part') and now - stat.st_mtime > max(self.ttl_seconds, 60)):
+                if self._remove(path):
+                    removed += 1
+                continue
+
+            if name.endswith('.mp3'):
+                entries.append((stat.st_mtime, path, stat.st_size))
+
+        total = sum(size for _, _, size in entries)
+        if self.max_bytes > 0 and total > self.max_bytes:
+            for _, path, size in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if self._remove(path):
+                    removed += 1
+                    total -= size
+
+        return {"removed": removed, "files": len(entries), "bytes": total}
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.unlink(path)
+            return True
+        except OSError:
+            return False
+
+    def start_sweeper(self):
+        """백그라운드 정리 스레드 시작"""
+        if self._sweeper and self._sweeper.is_alive():
+            return
+        self._stop_event.clear()
+        self._sweeper = threading.Thread(target=self._sweep_loop, name="vchat-audio-sweeper", daemon=True)
+        self._sweeper.start()
+
+    def stop_sweeper(self):
+        """백그라운드 정리 스레드 종료"""
+        self._stop_event.set()
+        if self._sweeper:
+            self._sweeper.join(timeout=5)
+            self._sweeper = None
+
+    def _sweep_loop(self):
+        while not self._stop_event.wait(self.sweep_interval):
+            try:
+                result = self.sweep()
+                if result["removed"]:
+                    print(f"🧹 오디오 파일 {result['removed']}개 정리 (남은 용량 {result['bytes']} bytes)")
+            except Exception as e:
+                print(f"⚠️ 오디오 파일 정리 오류: {str(e)}")
@@ -0,0 +1,123 @@
+"""
+업스트림 API 클라이언트 레지스트리 모듈
+OpenAI / ElevenLabs 클라이언트를 프로세스 전역으로 한 번만 만들고 keep-alive 연결 풀을 공유
+"""
+
+import os
+import threading
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_KEEPALIVE = 20
+DEFAULT_KEEPALIVE_EXPIRY = 60.0
+DEFAULT_CONNECT_TIMEOUT = 5.0
+DEFAULT_READ_TIMEOUT = 60.0
+
+_clients = {}
+_http_clients = []
+_lock = threading.Lock()
+
+
+def _env_number(name, default):
+    """환경변수 숫자 값 읽기 (잘못된 값이면 기본값)"""
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def get_pool_config():
+    """연결 풀 / 타임아웃 설정 반환"""
+    return {
+        "max_connections": int(_env_number('VCHAT_HTTP_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS)),
+        "max_keepalive_connections": int(_env_number('VCHAT_HTTP_MAX_KEEPALIVE', DEFAULT_MAX_KEEPALIVE)),
+        "keepalive_expiry": _env_number('VCHAT_HTTP_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY),
+        "connect_timeout": _env_number('VCHAT_HTTP_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT),
+        "read_timeout": _env_number('VCHAT_HTTP_READ_TIMEOUT', DEFAULT_READ_TIMEOUT)
+    }
+
+
+def build_http_client():
+    """keep-alive 연결 풀이 설정된 httpx 클라이언트 생성"""
+    import httpx
+
+    config = get_pool_config()
+    client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config["max_connections"],
+            max_keepalive_connections=config["max_keepalive_connections"],
+            keepalive_expiry=config["keepalive_expiry"]
+        ),
+        timeout=httpx.Timeout(config["read_timeout"], connect=config["connect_timeout"]),
+        follow_redirects=True
+    )
+    _http_clients.append(client)
+    return client
+
+
+def _get_or_create(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = factory()
+                _clients[name] = client
+    return client
+
+
+def get_openai_client():
+    """
+    공유 OpenAI 클라이언트 반환 (VChatBot, PersonaManager, RealTimeSTT 공용)
+
+    OPENAI_BASE_URL 환경변수가 있으면 해당 주소를 사용합니다.
+    재시도는 SDK 대신 resilience.call_with_retry가 마감 시간 안에서 처리합니다.
+    """
+    def create():
+        import openai
+
+        return openai.OpenAI(
+            api_key=os.getenv('OPENAI_API_KEY'),
+            base_url=os.getenv('OPENAI_BASE_URL') or None,
+            http_client=build_http_client(),
+            max_retries=0
+        )
+
+    return _get_or_create("openai", create)
+
+
+def get_elevenlabs_client():
+    """
+    공유 ElevenLabs 클라이언트 반환 (VoiceConverter 공용)
+
+    ELEVENLABS_BASE_URL 환경변수가 있으면 해당 주소를 사용합니다.
+    """
+    def create():
+        try:
+            # 최신 버전 시도
+            from elevenlabs.client import ElevenLabs
+        except ImportError:
+            # 구 버전 시도
+            from elevenlabs import ElevenLabs
+
+        options = {
+            "api_key": os.getenv('ELEVENLABS_API_KEY'),
+            "httpx_client": build_http_client()
+        }
+        base_url = os.getenv('ELEVENLABS_BASE_URL')
+        if base_url:
+            options["base_url"] = base_url
+        return ElevenLabs(**options)
+
+    return _get_or_create("elevenlabs", create)
+
+
+def close_clients():
+    """모든 공유 클라이언트의 연결 풀 종료"""
+    with _lock:
+        for client in _http_clients:
+            try:
+                client.close()
+            except Exception:
+                pass
+        _http_clients.clear()
+        _clients.clear()
@@ -0,0 +1,253 @@
+"""
+대화 기록 모듈
+세션 + 페르소나별 대화 기록을 세션 저장소(SQLite)에 보관하고, 토큰 예산을 넘으면 오래된 턴부터 잘라냄
+(선택: 잘린 턴은 요약 한 문단으로 합쳐 유지)
+
+LLM 요청은 [고정 접두부] + [요약] + [최근 턴] + [사용자 입력] 순서이므로
+기록이 얼마나 길어져도 입력 토큰은 접두부 + 예산 이하로 유지됩니다.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from .admission import admit, OverloadedError
+from .metrics import Counter
+from .resilience import call_with_retry
+from .session_store import get_session_store
+from .token_utils import TOKENS_PER_MESSAGE, count_tokens
+
+DEFAULT_HISTORY_TOKENS = 1200
+DEFAULT_SUMMARY_TOKENS = 200
+DEFAULT_SUMMARY_MODEL = "gpt-4o-mini"
+HISTORY_KEY_PREFIX = "history:"
+SUMMARY_PREFIX = "지금까지 나눈 대화 요약 (이어서 자연스럽게 대화해주세요):\n"
+
+SUMMARY_INSTRUCTION = """다음은 방송인과 시청자의 이전 대화 요약과 그 뒤에 이어진 대화입니다.
+이후 대화에 필요한 사실(시청자 이름, 취향, 약속, 진행 중인 화제)을 빠짐없이 담아 한국어 한 문단으로 다시 요약해주세요.
+말투는 설명하지 말고 내용만 간결하게 적어주세요."""
+
+HISTORY_TRUNCATED = Counter(
+    "vchat_history_truncated_turns_total",
+    "토큰 예산을 넘어 대화 기록에서 잘라낸 턴 수 (summarized: 요약에 합침, dropped: 버림)",
+    ("outcome",)
+)
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _turn_tokens(user, assistant, model):
+    # 턴 하나 = user / assistant 메시지 두 개
+    return 2 * TOKENS_PER_MESSAGE + count_tokens(user, model) + count_tokens(assistant, model) + 2
+
+
+class ConversationMemory:
+    """
+    토큰 예산 안에서 세션별 대화 기록을 유지하는 클래스 (스레드 안전)
+
+    세션 값 `history:<페르소나>`에 {"summary": str, "turns": [{"user", "assistant", "tokens"}]}를 저장합니다.
+    """
+
+    def __init__(self, store=None, budget_tokens=None, summarize=None, summary_tokens=None, summary_model=None,
+                 client=None):
+        """
+        Args:
+            store (SessionStore, optional): 세션 저장소 (기본값: 프로세스 전역 저장소)
+            budget_tokens (int, optional): 요약 + 최근 턴의 최대 토큰 수 (기본값: VCHAT_HISTORY_TOKENS, 0이면 기록 안 함)
+            summarize (bool, optional): 잘린 턴을 요약으로 유지할지 여부 (기본값: VCHAT_HISTORY_SUMMARY)
+            summary_tokens (int, optional): 요약 최대 토큰 수 (기본값: VCHAT_HISTORY_SUMMARY_TOKENS)
+            summary_model (str, optional): 요약에 쓸 모델 (기본값: VCHAT_SUMMARY_MODEL)
+            client: 요약용 OpenAI 클라이언트 (기본값: 프로세스 전역 클라이언트)
+        """
+        self._store = store
+        self.budget_tokens = budget_tokens if budget_tokens is not None else _env_int(
+            'VCHAT_HISTORY_TOKENS', DEFAULT_HISTORY_TOKENS
+        )
+        self.summarize = summarize if summarize is not None else os.getenv('VCHAT_HISTORY_SUMMARY', '0') == '1'
+        self.summary_tokens = summary_tokens if summary_tokens is not None else _env_int(
+            'VCHAT_HISTORY_SUMMARY_TOKENS', DEFAULT_SUMMARY_TOKENS
+        )
+        self.summary_model = summary_model or os.getenv('VCHAT_SUMMARY_MODEL', DEFAULT_SUMMARY_MODEL)
+        self._client = client
+        self._lock = threading.Lock()
+        # 요약은 응답을 늦추지 않도록 백그라운드에서, 같은 세션 요약이 겹치지 않도록 하나씩 실행
+        self._summarizer = None
+
+    @property
+    def enabled(self):
+        return self.budget_tokens > 0
+
+    @property
+    def store(self):
+        if self._store is None:
+            self._store = get_session_store()
+        return self._store
+
+    @property
+    def client(self):
+        if self._client is None:
+            from .clients import get_openai_client
+            self._client = get_openai_client()
+        return self._client
+
+    @staticmethod
+    def _key(persona):
+        return f"{HISTORY_KEY_PREFIX}{persona or ''}"
+
+    def _load(self, session_id, persona):
+        state = self.store.get(session_id, self._key(persona)) or {}
+        return {"summary": state.get("summary", ""), "turns": state.get("turns", [])}
+
+    def load_messages(self, session_id, persona):
+        """
+        고정 접두부와 사용자 입력 사이에 넣을 기록 메시지 (요약 + 예산 안의 최근 턴)
+
+        Returns:
+            list: {"role", "content"} 메시지 목록 (기록이 없거나 꺼져 있으면 빈 목록)
+        """
+        if not session_id or not self.enabled:
+            return []
+        state = self._load(session_id, persona)
+
+        # 예산이 줄어든 경우에도 넘지 않도록 저장된 토큰 수로 최근 턴부터 채움
+        remaining = self.budget_tokens
+        messages = []
+        if state["summary"]:
+            summary = SUMMARY_PREFIX + state["summary"]
+            remaining -= TOKENS_PER_MESSAGE + count_tokens(summary)
+        kept = []
+        for turn in reversed(state["turns"]):
+            remaining -= turn.get("tokens", 0)
+            if remaining < 0:
+                break
+            kept.append(turn)
+
+        if state["summary"]:
+            messages.append({"role": "system", "content": summary})
+        for turn in reversed(kept):
+            messages.append({"role": "user", "content": turn["user"]})
+            messages.append({"role": "assistant", "content": turn["assistant"]})
+        return messages
+
+    def has_history(self, session_id, persona):
+        """세션에 이어갈 대화 기록(요약 또는 턴)이 있는지 여부"""
+        if not session_id or not self.enabled:
+            return False
+        state = self._load(session_id, persona)
+        return bool(state["summary"] or state["turns"])
+
+    def append(self, session_id, persona, user, assistant, model=None):
+        """
+        턴 하나를 기록하고 예산을 넘은 오래된 턴을 잘라냄
+
+        Args:
+            session_id (str): 세션 ID (없으면 기록하지 않음)
+            persona (str): 페르소나 이름
+            user (str): 사용자 입력
+            assistant (str): 응답
+            model (str, optional): 토큰 계산에 쓸 모델 ID
+        """
+        if not session_id or not self.enabled or not user or not assistant:
+            return
+        turn = {"user": user, "assistant": assistant, "tokens": _turn_tokens(user, assistant, model)}
+
+        with self._lock:
+            state = self._load(session_id, persona)
+            turns = state["turns"] + [turn]
+            budget = self.budget_tokens - (self.summary_tokens if self.summarize else 0)
+            total = sum(t.get("tokens", 0) for t in turns)
+            evicted = []
+            while turns and total > budget:
+                oldest = turns.pop(0)
+                total -= oldest.get("tokens", 0)
+                evicted.append(oldest)
+            state["turns"] = turns
+            self.store.set(session_id, self._key(persona), state)
+
+        if evicted:
+            if self.summarize:
+                HISTORY_TRUNCATED.inc(len(evicted), outcome="summarized")
+                self._submit_summary(session_id, persona, evicted)
+            else:
+                HISTORY_TRUNCATED.inc(len(evicted), outcome="dropped")
+
+    def clear(self, session_id, persona=None):
+        """
+        세션의 대화 기록 삭제
+
+        Args:
+            session_id (str): 세션 ID
+            persona (str, optional): 이 페르소나의 기록만 삭제 (없으면 세션의 모든 페르소나 기록)
+
+        Returns:
+            int: 삭제한 기록 수
+        """
+        if not session_id:
+            return 0
+        if persona is not None:
+            return self.store.delete(session_id, self._key(persona))
+        return self.store.delete_prefix(session_id, HISTORY_KEY_PREFIX)
+
+    def _submit_summary(self, session_id, persona, evicted):
+        with self._lock:
+            if self._summarizer is None:
+                self._summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="vchat-summary")
+            executor = self._summarizer
+        executor.submit(self._summarize, session_id, persona, evicted)
+
+    def _summarize(self, session_id, persona, evicted):
+        """이전 요약 + 잘린 턴을 새 요약으로 합쳐 저장 (실패하면 이전 요약 유지)"""
+        try:
+            previous = self._load(session_id, persona)["summary"]
+            lines = [f"[이전 요약]\n{previous}"] if previous else []
+            for turn in evicted:
+                lines.append(f"시청자: {turn['user']}\n{persona or '방송인'}: {turn['assistant']}")
+            messages = [
+                {"role": "system", "content": SUMMARY_INSTRUCTION},
+                {"role": "user", "content": "\n\n".join(lines)}
+            ]
+            with admit("llm"):
+                response = call_with_retry("llm", lambda timeout: self.client.chat.completions.create(
+                    model=self.summary_model,
+                    messages=messages,
+                    temperature=0.2,
+                    max_tokens=self.summary_tokens,
+                    timeout=timeout
+                ))
+            summary = (response.choices[0].message.content or "").strip()
+            if not summary:
+                return
+
+            with self._lock:
+                state = self._load(session_id, persona)
+                state["summary"] = summary
+                self.store.set(session_id, self._key(persona), state)
+        except OverloadedError:
+            print("⚠️ 대화 요약 건너뜀: LLM 요청이 많아 잘린 턴은 요약 없이 버립니다")
+        except Exception as e:
+            print(f"⚠️ 대화 요약 실패: {str(e)}")
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._summarizer = self._summarizer, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+_memory = None
+_memory_lock = threading.Lock()
+
+
+def get_conversation_memory():
+    """프로세스 전역 대화 기록 반환"""
+    global _memory
+    if _memory is None:
+        with _memory_lock:
+            if _memory is None:
+                _memory = ConversationMemory()
+    return _memory
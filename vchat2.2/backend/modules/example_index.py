@@ -0,0 +1,142 @@
+"""
+few-shot 예시 검색 모듈
+페르소나의 예시가 많을 때 매 턴 전부 보내는 대신, 사용자 입력과 가까운 예시만 토큰 예산 안에서 골라 보냄
+
+한국어는 띄어쓰기 / 조사 변화가 많아 단어 대신 글자 2~3-gram을 색인하고 BM25로 점수를 매깁니다.
+"""
+
+import math
+import re
+from collections import Counter as TermCounter
+
+from .token_utils import TOKENS_PER_MESSAGE, count_tokens
+
+NGRAM_SIZES = (2, 3)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_SPACES = re.compile(r"\s+")
+
+
+def char_ngrams(text, sizes=NGRAM_SIZES):
+    """
+    공백을 정리한 텍스트의 글자 n-gram 목록 (대소문자 무시, 한 글자 입력은 그대로)
+
+    Args:
+        text (str): 입력 텍스트
+        sizes (tuple): n-gram 길이들
+
+    Returns:
+        list: n-gram 문자열 목록
+    """
+    text = _SPACES.sub(" ", str(text).lower()).strip()
+    if not text:
+        return []
+    grams = []
+    for n in sizes:
+        if len(text) < n:
+            continue
+        grams.extend(text[i:i + n] for i in range(len(text) - n + 1))
+    return grams or [text]
+
+
+class ExampleIndex:
+    """
+    예시(user / assistant 쌍)의 user 문장을 BM25로 색인하는 클래스 (만든 뒤에는 읽기 전용, 스레드 안전)
+
+    예시별 메시지 토큰 수를 미리 계산해 두므로 턴마다 토큰을 다시 세지 않습니다.
+    """
+
+    def __init__(self, examples, model=None):
+        """
+        Args:
+            examples (list): {"user", "assistant"} 예시 목록 (저장된 순서 유지)
+            model (str, optional): 토큰 계산에 쓸 모델 ID
+        """
+        self.examples = list(examples)
+        self.tokens = [
+            2 * TOKENS_PER_MESSAGE + count_tokens(example["user"], model) + count_tokens(example["assistant"], model)
+            for example in self.examples
+        ]
+
+        self._postings = {}
+        self._lengths = []
+        for position, example in enumerate(self.examples):
+            terms = TermCounter(char_ngrams(example["user"]))
+            self._lengths.append(sum(terms.values()))
+            for term, frequency in terms.items():
+                self._postings.setdefault(term, []).append((position, frequency))
+
+        count = len(self.examples)
+        self._average_length = (sum(self._lengths) / count) if count else 0.0
+        # BM25 idf (음수가 되지 않는 변형)
+        self._idf = {
+            term: math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for term, postings in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.examples)
+
+    @property
+    def total_tokens(self):
+        return sum(self.tokens)
+
+    def scores(self, query):
+        """
+        입력과 각 예시의 BM25 점수
+
+        Returns:
+            dict: {예시 위치: 점수} (겹치는 n-gram이 없는 예시는 빠짐)
+        """
+        scores = {}
+        for term in set(char_ngrams(query)):
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = self._idf[term]
+            for position, frequency in postings:
+                normalized = 1 - BM25_B + BM25_B * self._lengths[position] / (self._average_length or 1)
+                scores[position] = scores.get(position, 0.0) + idf * frequency * (BM25_K1 + 1) / (
+                    frequency + BM25_K1 * normalized
+                )
+        return scores
+
+    def select(self, query, budget_tokens, limit):
+        """
+        입력과 가까운 예시를 점수 순으로 토큰 예산 / 개수 한도 안에서 선택
+
+        겹치는 예시가 부족하면 저장된 앞쪽 예시로 채우고, 결과는 저장된 순서로 돌려줍니다
+        (같은 예시 조합이면 메시지 순서도 같아 업스트림 프롬프트 캐시에 걸리기 쉬움).
+
+        Args:
+            query (str): 사용자 입력
+            budget_tokens (int): 선택한 예시 메시지의 최대 토큰 수
+            limit (int): 최대 예시 수
+
+        Returns:
+            list: 선택한 예시 위치 목록 (오름차순)
+        """
+        scores = self.scores(query)
+        ranked = sorted(scores, key=lambda position: (-scores[position], position))
+        ranked += [position for position in range(len(self.examples)) if position not in scores]
+
+        chosen = []
+        remaining = budget_tokens
+        for position in ranked:
+            if len(chosen) >= limit:
+                break
+            if self.tokens[position] > remaining:
+                continue
+            chosen.append(position)
+            remaining -= self.tokens[position]
+        return sorted(chosen)
+
+    def messages(self, query, budget_tokens, limit):
+        """select 결과를 user / assistant 메시지 목록으로 반환"""
+        messages = []
+        for position in self.select(query, budget_tokens, limit):
+            example = self.examples[position]
+            messages.append({"role": "user", "content": example["user"]})
+            messages.append({"role": "assistant", "content": example["assistant"]})
+        return messages
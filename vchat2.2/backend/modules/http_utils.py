@@ -0,0 +1,134 @@
+"""
+HTTP 응답 유틸리티 모듈
+오디오 파일의 Range(206), ETag, 조건부 GET(304) 처리
+"""
+
+import os
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def parse_byte_range(range_header, size):
+    """
+    Range 헤더를 해석해 (start, end) 반환 (end 포함)
+
+    Args:
+        range_header (str): 예) "bytes=0-1023", "bytes=500-", "bytes=-500"
+        size (int): 전체 파일 크기
+
+    Returns:
+        tuple: (start, end) / 범위를 무시하고 전체를 보내야 하면 None
+            (형식이 잘못된 Range 헤더도 RFC 9110에 따라 무시하고 200으로 전체 응답)
+
+    Raises:
+        ValueError: 형식은 맞지만 파일 크기로 만족할 수 없는 범위 (416 응답 대상)
+    """
+    if not range_header or not range_header.startswith('bytes='):
+        return None
+
+    ranges = range_header[len('bytes='):].split(',')
+    if len(ranges) != 1:
+        # 다중 범위는 지원하지 않으므로 전체 응답 (RFC 9110에서 허용)
+        return None
+
+    start_text, sep, end_text = ranges[0].strip().partition('-')
+    start_text, end_text = start_text.strip(), end_text.strip()
+    # 숫자만 허용 (int()는 "+5", "-5", " 5" 같은 값도 받아들임)
+    if not sep or not (start_text.isdigit() or start_text == '') or not (end_text.isdigit() or end_text == ''):
+        return None
+
+    if start_text == '':
+        if end_text == '':
+            return None
+        # 끝에서부터 N바이트
+        suffix = int(end_text)
+        if suffix <= 0 or size <= 0:
+            raise ValueError("만족할 수 없는 범위")
+        return max(0, size - suffix), size - 1
+
+    start = int(start_text)
+    end = int(end_text) if end_text else size - 1
+    if end_text and end < start:
+        # 끝이 시작보다 앞선 범위는 형식 오류로 보고 무시
+        return None
+
+    if start >= size:
+        raise ValueError("만족할 수 없는 범위")
+    return start, min(end, size - 1)
+
+
+def etag_matches(if_none_match, etag):
+    """If-None-Match 헤더가 ETag와 일치하는지 확인"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(',')]
+    # 약한 비교: W/ 접두사는 무시
+    return any(tag.removeprefix('W/') == etag for tag in candidates)
+
+
+def _iter_file_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def ranged_file_response(request, path, etag, media_type, cache_control, filename=None):
+    """
+    조건부 GET과 바이트 범위 요청을 지원하는 파일 응답 생성
+
+    Args:
+        request: FastAPI Request
+        path (str): 파일 경로
+        etag (str): 따옴표를 포함한 강한 ETag
+        media_type (str): 응답 MIME 타입
+        cache_control (str): Cache-Control 헤더 값
+        filename (str, optional): Content-Disposition 파일명
+
+    Returns:
+        Response: 200 / 206 / 304 / 416 응답
+    """
+    headers = {
+        "ETag": etag,
+        "Accept-Ranges": "bytes",
+        "Cache-Control": cache_control
+    }
+
+    if etag_matches(request.headers.get('if-none-match'), etag):
+        return Response(status_code=304, headers=headers)
+
+    size = os.path.getsize(path)
+    range_header = request.headers.get('range')
+
+    # If-Range가 현재 ETag와 다르면 파일이 바뀐 것이므로 전체 응답
+    if_range = request.headers.get('if-range')
+    if if_range and if_range.strip() != etag:
+        range_header = None
+
+    try:
+        byte_range = parse_byte_range(range_header, size)
+    except ValueError:
+        headers["Content-Range"] = f"bytes */{size}"
+        return Response(status_code=416, headers=headers)
+
+    if byte_range is None:
+        return FileResponse(path, media_type=media_type, filename=filename, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(length)
+    return StreamingResponse(
+        _iter_file_range(path, start, length),
+        status_code=206,
+        media_type=media_type,
+        headers=headers
+    )
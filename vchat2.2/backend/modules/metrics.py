@@ -0,0 +1,253 @@
+"""
+지표 수집 모듈
+단계별(STT / LLM / TTS / 저장 / Firestore / 스크래핑) 지연 시간 히스토그램, 진행 중 게이지, 오류 카운터를
+Prometheus 텍스트 형식으로 노출 (워커 프로세스별 값)
+"""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from .tracing import record_span, span
+
+CONTENT_TYPE = "text/plain; version=0.0.4"  # charset은 응답 클래스가 붙임
+
+# 업스트림 API 호출(수백 ms ~ 수 초)과 로컬 I/O(수 ms)를 모두 구분할 수 있는 구간
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# 요청 단위 라벨 (run_blocking / iterate_blocking이 컨텍스트를 복사하므로 워커 스레드에서도 유지)
+_persona_label = contextvars.ContextVar('vchat_metrics_persona', default='')
+_mode_label = contextvars.ContextVar('vchat_metrics_mode', default='')
+
+_registry = []
+_registry_lock = threading.Lock()
+
+
+# mode 라벨로 허용하는 값 (클라이언트가 보낸 임의 문자열로 시계열이 끝없이 늘어나지 않도록 나머지는 "other")
+KNOWN_MODES = frozenset({
+    "text-to-text", "text-to-speech", "speech-to-speech",  # 채팅 요청 모드
+    "stt", "tts", "voice-ws"                                # 서버가 정하는 엔드포인트 모드
+})
+
+
+def set_request_labels(persona=None, mode=None):
+    """현재 요청의 지표 라벨 설정 (페르소나, 대화 모드)"""
+    if persona is not None:
+        _persona_label.set(persona)
+    if mode is not None:
+        _mode_label.set(mode if mode in KNOWN_MODES else "other")
+
+
+def current_labels():
+    """현재 컨텍스트의 지표 라벨 반환"""
+    return {"persona": _persona_label.get() or "none", "mode": _mode_label.get() or "none"}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_number(value):
+    if value == float('inf'):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """라벨별 값을 보관하는 지표 기본 클래스"""
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels_text(self, key, extra=()):
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def _samples(self):
+        raise NotImplementedError
+
+    def render(self):
+        """Prometheus 텍스트 형식 줄 목록 반환"""
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            lines.extend(self._samples())
+        return lines
+
+
+class Counter(_Metric):
+    """증가만 하는 카운터"""
+
+    kind = "counter"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _samples(self):
+        return [f"{self.name}{self._labels_text(key)} {_format_number(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Gauge(_Metric):
+    """오르내리는 현재 값 (진행 중인 작업 수 등)"""
+
+    kind = "gauge"
+
+    def inc(self, amount=1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount=1.0, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = float(value)
+
+    def _samples(self):
+        return [f"{self.name}{self._labels_text(key)} {_format_number(value)}"
+                for key, value in sorted(self._values.items())]
+
+
+class Histogram(_Metric):
+    """구간별 누적 개수 + 합계 + 개수를 기록하는 히스토그램"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            counts = state[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        lines = []
+        for key, (counts, total, count) in sorted(self._values.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{self._labels_text(key, [('le', _format_number(bound))])} {cumulative}")
+            lines.append(f"{self.name}_bucket{self._labels_text(key, [('le', '+Inf')])} {count}")
+            lines.append(f"{self.name}_sum{self._labels_text(key)} {_format_number(total)}")
+            lines.append(f"{self.name}_count{self._labels_text(key)} {count}")
+        return lines
+
+
+def render_metrics():
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로 반환"""
+    with _registry_lock:
+        metrics = list(_registry)
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_LABELS = ("stage", "persona", "mode")
+
+STAGE_DURATION = Histogram(
+    "vchat_stage_duration_seconds",
+    "단계별 처리 시간 (stt, llm, tts, audio_save, firestore_read, scrape 등)",
+    STAGE_LABELS
+)
+STAGE_IN_FLIGHT = Gauge(
+    "vchat_stage_in_flight",
+    "현재 실행 중인 단계 수",
+    STAGE_LABELS
+)
+STAGE_ERRORS = Counter(
+    "vchat_stage_errors_total",
+    "예외로 끝난 단계 실행 수 (예외 타입별)",
+    STAGE_LABELS + ("error",)
+)
+
+
+def observe_stage(stage, seconds):
+    """이미 측정한 시간을 단계 히스토그램과 요청 trace에 기록 (첫 토큰까지의 시간 등)"""
+    STAGE_DURATION.observe(seconds, stage=stage, **current_labels())
+    record_span(stage, seconds)
+
+
+def record_stage_error(stage, error):
+    """예외로 끝나지 않은 실패(오류 응답 등)를 단계 오류로 기록"""
+    STAGE_ERRORS.inc(stage=stage, error=error, **current_labels())
+
+
+@contextmanager
+def track_stage(stage):
+    """
+    with 블록 실행 시간을 단계 지표와 요청 trace span으로 기록
+
+    진행 중 게이지를 올렸다 내리고, 예외가 나면 예외 타입별 오류 카운터를 올립니다.
+    (생성기가 중간에 닫히는 GeneratorExit는 오류로 세지 않음)
+
+    Args:
+        stage (str): 단계 이름 (예: "stt", "llm", "tts")
+    """
+    labels = dict(current_labels(), stage=stage)
+    STAGE_IN_FLIGHT.inc(**labels)
+    started = time.perf_counter()
+    try:
+        with span(stage):
+            yield
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        STAGE_ERRORS.inc(error=type(e).__name__, **labels)
+        raise
+    finally:
+        STAGE_IN_FLIGHT.dec(**labels)
+        STAGE_DURATION.observe(time.perf_counter() - started, **labels)
+
+
+def track_iter(stage, iterable, first_item_stage=None):
+    """
+    지연 실행되는 스트림(ElevenLabs 청크 등)을 끝까지 소비하는 시간을 단계로 기록
+
+    Args:
+        stage (str): 전체 소비 시간 단계 이름
+        iterable: 감쌀 이터러블
+        first_item_stage (str, optional): 첫 항목까지의 시간을 기록할 단계 이름
+
+    Yields:
+        이터러블의 각 항목
+    """
+    with track_stage(stage):
+        started = time.perf_counter()
+        waiting_first = first_item_stage is not None
+        for item in iterable:
+            if waiting_first:
+                observe_stage(first_item_stage, time.perf_counter() - started)
+                waiting_first = False
+            yield item
@@ -1,36 +1,157 @@
 import json
 import os
-import requests
-from bs4 import BeautifulSoup
-import openai
+import hashlib
+import time
+import threading
+from collections import OrderedDict
 from dotenv import load_dotenv
-import firebase_admin
-from firebase_admin import credentials, firestore
 from typing import Dict, List, Optional
+from .clients import get_openai_client
+from .metrics import track_stage
+from .resilience import call_with_retry
+
+MAX_MISSING_NAMES = 1024  # 없다고 확인한 이름을 기억하는 최대 개수
+
+
+def build_system_prompt(persona):
+    """페르소나 데이터로 시스템 프롬프트 생성"""
+    if not persona:
+        return ""
+    
+    persona_data = persona.get('persona_data', {})
+    name = persona.get('name', '')
+    
+    prompt = f"""당신은 '{name}'라는 {persona_data.get('gender', '여성')} {persona_data.get('occupation', '방송인')}입니다.
+
+페르소나 특성:
+- 성격: {persona_data.get('personality', '활발하고 친근함')}
+- 나이대: {persona_data.get('age_group', '20대')}
+- 말투: {persona_data.get('speaking_style', '반말, 애교 섞인 말투')}
+
+대화할 때 다음 특징들을 반드시 지켜주세요:
+
+1. **말투와 어조**:
+   - 친한 친구와 대화하듯이 친근한 말투 사용
+   - 애교 섞인 밝고 여성적인 말투 사용
+   - 감정이 풍부하게 드러나도록 '!', '?', '~' 등 활용
+   - 자연스러운 감탄사 사용
+
+2. **성격 표현**:
+   - 밝고 에너지 넘치는 분위기
+   - 친근하고 장난스러운 태도
+   - 시청자를 친구처럼 대하는 편안한 관계
+   - 솔직하고 감정 표현이 풍부함
+
+3. **절대 피해야 할 것**:
+   - 경어체 사용 금지
+   - 같은 말 반복하지 말기
+   - 사무적이고 딱딱한 답변 금지
+   - 맥락에 맞지 않는 엉뚱한 대답 금지
+
+4. **반응 스타일**:
+   - 게임이나 재미있는 주제에 큰 리액션
+   - 귀엽고 애교 있는 반응
+   - 자연스러운 대화 흐름 유지
+
+항상 '{name}'의 캐릭터를 유지하면서 자연스럽고 일관성 있게 대답해주세요."""
+
+    return prompt
+
+
+def data_fingerprint(data):
+    """JSON 데이터 내용 해시 (키 순서와 무관)"""
+    payload = json.dumps(data or {}, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def persona_version(persona):
+    """페르소나 데이터 내용으로 버전 해시 생성 (내용이 바뀌면 값도 바뀜)"""
+    return data_fingerprint(persona)
+
+
+class PersonaContext:
+    """
+    페르소나 하나에 고정된 읽기 전용 뷰
+    
+    PersonaManager와 같은 조회 메서드를 제공하므로 VChatBot / VoiceConverter에
+    persona_manager 대신 넘기면, 전역 current_persona와 무관하게 해당 페르소나로 동작합니다.
+    """
+    
+    def __init__(self, persona):
+        self.current_persona = persona
+        self.name = persona.get('name', '') if persona else ''
+        self.version = persona_version(persona)
+    
+    def get_current_persona(self):
+        return self.current_persona
+    
+    def get_voice_id(self):
+        return self.current_persona.get('voice_id') if self.current_persona else None
+    
+    def get_model_id(self):
+        return self.current_persona.get('fine_tuned_model_id') if self.current_persona else None
+    
+    def get_few_shot_examples(self):
+        return self.current_persona.get('few_shot_examples', []) if self.current_persona else []
+    
+    def get_persona_url(self):
+        return self.current_persona.get('url') if self.current_persona else None
+    
+    def generate_system_prompt(self):
+        return build_system_prompt(self.current_persona)
 
 
 class PersonaManager:
     """페르소나 데이터 관리 클래스 - Firebase Firestore 연동"""
     
-    def __init__(self, personas_file='data/personas.json', auto_load=True):
+    def __init__(self, personas_file='data/personas.json', auto_load=True, openai_client=None):
         self.personas_file = personas_file
         self.personas_data = {}
         self.current_persona = None
+        self._backup_fingerprint = None  # 로컬 백업 파일 내용 해시 (같으면 다시 쓰지 않음)
+        self._missing = OrderedDict()  # 없다고 확인한 페르소나 이름 -> 확인 시각
+        self._missing_lock = threading.Lock()
         
-        # OpenAI 클라이언트 초기화
-        self.openai_client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        # OpenAI 클라이언트 (프로세스 전역 공유, 페르소나 생성 때 처음 만듦)
+        self._openai_client = openai_client
         
-        # Firebase 초기화
-        self._initialize_firebase()
+        # Firebase는 db에 처음 접근할 때 초기화 (자격 증명 탐색이 수 초 걸릴 수 있음)
+        self._db = None
+        self._db_initialized = False
+        self._db_lock = threading.Lock()
         
         # 자동 로드 옵션 (마이그레이션 시에는 False로 설정)
         if auto_load:
             # 페르소나 데이터 로드 (Firebase 우선, 로컬 백업)
             self.load_personas()
     
+    @property
+    def openai_client(self):
+        """페르소나 분석용 OpenAI 클라이언트"""
+        if self._openai_client is None:
+            self._openai_client = get_openai_client()
+        return self._openai_client
+    
+    @property
+    def db(self):
+        """Firestore 클라이언트 (처음 접근할 때 초기화, 실패하면 None)"""
+        if not self._db_initialized:
+            with self._db_lock:
+                if not self._db_initialized:
+                    self._initialize_firebase()
+        return self._db
+    
+    @db.setter
+    def db(self, value):
+        self._db = value
+        self._db_initialized = True
+    
     def _initialize_firebase(self):
         """Firebase 초기화"""
         try:
+            import firebase_admin
+            from firebase_admin import credentials, firestore
+            
             if not firebase_admin._apps:
                 # Firebase 서비스 계정 키를 환경변수에서 JSON 문자열로 가져오기
                 cred_json = os.getenv('FIREBASE_SERVICE_ACCOUNT_KEY')
@@ -86,15 +207,65 @@ class PersonaManager:
                 print("📁 로컬 백업 파일에서 로드 시도...")
                 self._load_from_local()
     
+    def load_backup(self):
+        """
+        로컬 백업 파일에서만 로드 (시작 직후 Firestore를 기다리지 않고 바로 서비스)
+        
+        Returns:
+            bool: 페르소나가 하나 이상 로드됐는지 여부
+        """
+        self._load_from_local()
+        return bool(self.personas_data)
+    
+    def sync_from_firebase(self):
+        """
+        Firestore의 최신 데이터로 교체 (load_backup 이후 백그라운드에서 호출)
+        
+        Firestore가 비어 있고 로컬 데이터가 있으면 로컬 데이터를 Firebase로 마이그레이션합니다.
+        실패하면 기존 데이터를 그대로 유지합니다.
+        
+        Returns:
+            bool: Firestore와 동기화했는지 여부
+        """
+        if not self.db:
+            return False
+        
+        try:
+            personas_data = self._fetch_from_firebase()
+        except Exception as e:
+            print(f"❌ Firebase 로드 실패: {str(e)}")
+            return False
+        
+        if not personas_data and self.personas_data:
+            print("🔄 로컬 데이터를 Firebase로 마이그레이션합니다...")
+            return self.migrate_local_to_firebase()
+        
+        self._set_personas_data(personas_data)
+        print(f"✅ Firebase에서 {len(personas_data)}개 페르소나 동기화 완료")
+        self._save_local_backup()
+        return True
+    
+    def _fetch_from_firebase(self):
+        """Firestore personas 컬렉션 전체 읽기"""
+        with track_stage("firestore_read"):
+            personas_ref = self.db.collection('personas')
+            return {doc.id: doc.to_dict() for doc in personas_ref.stream()}
+    
+    def _set_personas_data(self, personas_data):
+        """
+        페르소나 데이터를 한 번에 교체 (다른 스레드가 읽는 중일 수 있으므로 다 채운 dict로 교체)
+        
+        현재 선택된 페르소나는 이름으로 새 데이터에 다시 연결합니다.
+        """
+        current_name = self.current_persona.get('name') if self.current_persona else None
+        self.personas_data = personas_data
+        if current_name:
+            self.current_persona = personas_data.get(current_name)
+    
     def _load_from_firebase(self):
         """Firebase에서 페르소나 데이터 로드"""
         try:
-            personas_ref = self.db.collection('personas')
-            docs = personas_ref.stream()
-            
-            self.personas_data = {}
-            for doc in docs:
-                self.personas_data[doc.id] = doc.to_dict()
+            self._set_personas_data(self._fetch_from_firebase())
             
             print(f"✅ Firebase에서 {len(self.personas_data)}개 페르소나 로드 완료")
             
@@ -110,7 +281,9 @@ class PersonaManager:
         try:
             if os.path.exists(self.personas_file):
                 with open(self.personas_file, 'r', encoding='utf-8') as f:
-                    self.personas_data = json.load(f)
+                    personas_data = json.load(f)
+                self._backup_fingerprint = data_fingerprint(personas_data)
+                self._set_personas_data(personas_data)
                 print(f"✅ 로컬에서 {len(self.personas_data)}개 페르소나 로드 완료")
             else:
                 print(f"❌ 페르소나 데이터 파일을 찾을 수 없습니다: {self.personas_file}")
@@ -134,9 +307,10 @@ class PersonaManager:
     def _save_to_firebase(self):
         """Firebase에 페르소나 데이터 저장"""
         try:
-            for persona_name, persona_data in self.personas_data.items():
-                persona_ref = self.db.collection('personas').document(persona_name)
-                persona_ref.set(persona_data)
+            with track_stage("firestore_write"):
+                for persona_name, persona_data in self.personas_data.items():
+                    persona_ref = self.db.collection('personas').document(persona_name)
+                    persona_ref.set(persona_data)
             
             print(f"✅ Firebase에 {len(self.personas_data)}개 페르소나 저장 완료")
             
@@ -145,11 +319,20 @@ class PersonaManager:
             raise
     
     def _save_local_backup(self):
-        """로컬 백업 파일 저장"""
+        """로컬 백업 파일 저장 (내용이 같으면 생략)"""
         try:
+            fingerprint = data_fingerprint(self.personas_data)
+            if fingerprint == self._backup_fingerprint:
+                print("✅ 로컬 백업 변경 없음")
+                return
+            
             os.makedirs('data', exist_ok=True)
-            with open(self.personas_file, 'w', encoding='utf-8') as f:
+            # 시작 시 백업을 먼저 읽으므로 쓰는 도중 끊겨도 깨지지 않도록 임시 파일 후 교체
+            partial = f"{self.personas_file}.part"
+            with open(partial, 'w', encoding='utf-8') as f:
                 json.dump(self.personas_data, f, ensure_ascii=False, indent=2)
+            os.replace(partial, self.personas_file)
+            self._backup_fingerprint = fingerprint
             print("✅ 로컬 백업 저장 완료")
         except Exception as e:
             print(f"⚠️ 로컬 백업 저장 오류: {str(e)}")
@@ -176,15 +359,16 @@ class PersonaManager:
                 # Firebase에 저장
                 for persona_name, persona_data in local_data.items():
                     try:
-                        persona_ref = self.db.collection('personas').document(persona_name)
-                        persona_ref.set(persona_data)
+                        with track_stage("firestore_write"):
+                            persona_ref = self.db.collection('personas').document(persona_name)
+                            persona_ref.set(persona_data)
                         print(f"✅ '{persona_name}' 마이그레이션 완료")
                     except Exception as e:
                         print(f"❌ '{persona_name}' 마이그레이션 실패: {str(e)}")
                         continue
                 
                 # 메모리에 로드
-                self.personas_data = local_data
+                self._set_personas_data(local_data)
                 
                 print("🎉 마이그레이션 완료!")
                 return True
@@ -196,6 +380,61 @@ class PersonaManager:
             print(f"❌ 마이그레이션 실패: {str(e)}")
             return False
     
+    def fetch_persona(self, persona_name, retry_after=30.0):
+        """
+        이름으로 페르소나 조회 (이 워커에 없으면 다른 워커가 추가했을 수 있으므로 저장소에서 그 문서 하나만 읽음)
+        
+        없는 이름은 retry_after초 동안 기억해 두고 다시 조회하지 않으므로,
+        모르는 이름으로 요청이 반복돼도 컬렉션 전체를 읽거나 매번 Firestore에 가지 않습니다.
+        
+        Args:
+            persona_name (str): 페르소나 이름
+            retry_after (float): 없다고 확인한 이름을 다시 조회하기까지의 시간(초)
+        
+        Returns:
+            dict: 페르소나 데이터 (없으면 None)
+        """
+        persona = self.personas_data.get(persona_name)
+        if persona or not persona_name:
+            return persona
+        
+        now = time.monotonic()
+        with self._missing_lock:
+            checked = self._missing.get(persona_name)
+            if checked is not None and now - checked < retry_after:
+                return None
+        
+        persona = self._fetch_one(persona_name)
+        with self._missing_lock:
+            if persona is None:
+                self._missing[persona_name] = now
+                self._missing.move_to_end(persona_name)
+                while len(self._missing) > MAX_MISSING_NAMES:
+                    self._missing.popitem(last=False)
+            else:
+                self._missing.pop(persona_name, None)
+        
+        if persona is not None:
+            # 다른 스레드가 읽는 중일 수 있으므로 새 dict로 교체
+            self.personas_data = {**self.personas_data, persona_name: persona}
+            print(f"✅ '{persona_name}' 페르소나를 저장소에서 찾아 추가했습니다")
+        return persona
+    
+    def _fetch_one(self, persona_name):
+        """Firestore(없으면 로컬 백업 파일)에서 페르소나 하나 읽기 (없거나 실패하면 None)"""
+        try:
+            if self.db:
+                with track_stage("firestore_read"):
+                    doc = self.db.collection('personas').document(persona_name).get()
+                return doc.to_dict() if doc.exists else None
+            
+            if os.path.exists(self.personas_file):
+                with open(self.personas_file, 'r', encoding='utf-8') as f:
+                    return json.load(f).get(persona_name)
+        except Exception as e:
+            print(f"⚠️ 페르소나 조회 실패 ({persona_name}): {str(e)}")
+        return None
+    
     def get_available_personas(self):
         """사용 가능한 페르소나 목록 반환"""
         return list(self.personas_data.keys())
@@ -211,6 +450,15 @@ class PersonaManager:
         """현재 선택된 페르소나 반환"""
         return self.current_persona
     
+    def get_persona(self, persona_name):
+        """이름으로 페르소나 데이터 반환 (없으면 None)"""
+        return self.personas_data.get(persona_name)
+    
+    def get_persona_context(self, persona_name):
+        """이름으로 특정 페르소나에 고정된 PersonaContext 반환 (없으면 None)"""
+        persona = self.get_persona(persona_name)
+        return PersonaContext(persona) if persona else None
+    
     def get_voice_id(self):
         """현재 페르소나의 voice_id 반환"""
         if self.current_persona:
@@ -237,58 +485,23 @@ class PersonaManager:
     
     def generate_system_prompt(self):
         """현재 페르소나 기반 시스템 프롬프트 생성"""
-        if not self.current_persona:
-            return ""
-        
-        persona_data = self.current_persona.get('persona_data', {})
-        name = self.current_persona.get('name', '')
-        
-        prompt = f"""당신은 '{name}'라는 {persona_data.get('gender', '여성')} {persona_data.get('occupation', '방송인')}입니다.
-
-페르소나 특성:
-- 성격: {persona_data.get('personality', '활발하고 친근함')}
-- 나이대: {persona_data.get('age_group', '20대')}
-- 말투: {persona_data.get('speaking_style', '반말, 애교 섞인 말투')}
-
-대화할 때 다음 특징들을 반드시 지켜주세요:
-
-1. **말투와 어조**:
-   - 친한 친구와 대화하듯이 친근한 말투 사용
-   - 애교 섞인 밝고 여성적인 말투 사용
-   - 감정이 풍부하게 드러나도록 '!', '?', '~' 등 활용
-   - 자연스러운 감탄사 사용
-
-2. **성격 표현**:
-   - 밝고 에너지 넘치는 분위기
-   - 친근하고 장난스러운 태도
-   - 시청자를 친구처럼 대하는 편안한 관계
-   - 솔직하고 감정 표현이 풍부함
-
-3. **절대 피해야 할 것**:
-   - 경어체 사용 금지
-   - 같은 말 반복하지 말기
-   - 사무적이고 딱딱한 답변 금지
-   - 맥락에 맞지 않는 엉뚱한 대답 금지
-
-4. **반응 스타일**:
-   - 게임이나 재미있는 주제에 큰 리액션
-   - 귀엽고 애교 있는 반응
-   - 자연스러운 대화 흐름 유지
-
-항상 '{name}'의 캐릭터를 유지하면서 자연스럽고 일관성 있게 대답해주세요."""
-
-        return prompt
+        return build_system_prompt(self.current_persona)
     
     def add_persona_from_url(self, name, url, voice_id=None, model_id=None):
         """URL에서 페르소나 정보를 추출하여 추가"""
+        # 스크래핑 의존성은 페르소나를 만들 때만 필요
+        import requests
+        from bs4 import BeautifulSoup
+        
         try:
             print(f"🌐 웹페이지 접속 중: {url}")
             headers = {
                 'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
             }
             
-            response = requests.get(url, headers=headers, timeout=30)
-            response.raise_for_status()
+            with track_stage("scrape"):
+                response = requests.get(url, headers=headers, timeout=30)
+                response.raise_for_status()
             
             soup = BeautifulSoup(response.content, 'html.parser')
             
@@ -382,15 +595,18 @@ class PersonaManager:
 
 {page_text}"""
 
-            response = self.openai_client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=2000
-            )
+            with track_stage("persona_analysis"):
+                # 긴 분석 응답이라 기본 LLM 마감 시간 대신 넉넉하게
+                response = call_with_retry("llm", lambda timeout: self.openai_client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=0.3,
+                    max_tokens=2000,
+                    timeout=timeout
+                ), deadline=120.0)
             
             response_text = response.choices[0].message.content.strip()
             
@@ -0,0 +1,326 @@
+"""
+프롬프트 접두부 캐시 모듈
+페르소나 버전마다 시스템 프롬프트 + few-shot 예시 메시지(매 턴 같은 앞부분)를 한 번만 만들어
+토큰 수와 함께 보관 (페르소나 데이터가 바뀌면 버전 해시가 바뀌어 새로 만듦)
+
+접두부는 같은 페르소나 버전이면 항상 같은 바이트열이 되도록 만들어 OpenAI 프롬프트 캐싱
+(앞부분이 같은 요청의 입력 토큰 재사용)에 걸리게 하고, 응답의 cached_tokens로 페르소나별 적중률을 집계
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from .example_index import ExampleIndex
+from .metrics import Counter, Gauge
+from .persona_manager import persona_version
+from .token_utils import count_message_tokens
+
+DEFAULT_CACHE_SIZE = 64
+DEFAULT_FEW_SHOT_TOKENS = 1000
+DEFAULT_FEW_SHOT_LIMIT = 8
+
+FEW_SHOT_GUIDE = """
+
+다음은 당신의 말투를 보여주는 완벽한 예시들입니다. 이 예시들의 말투와 톤을 정확히 따라해주세요:
+
+특히 주목할 점:
+- 자연스럽고 즉흥적인 반응
+- 친근하고 편안한 말투
+- 감정이 풍부하게 드러나는 표현
+- 상황에 맞는 적절한 리액션
+- 반말 사용과 애교 있는 톤
+
+위 예시들처럼 자연스럽고 일관된 말투로 대답해주세요."""
+
+PROMPT_PREFIX_TOKENS = Gauge(
+    "vchat_prompt_prefix_tokens",
+    "페르소나별 고정 프롬프트 접두부(시스템 프롬프트 + few-shot 예시) 토큰 수",
+    ("persona",)
+)
+LLM_PROMPT_TOKENS = Counter(
+    "vchat_llm_prompt_tokens_total",
+    "LLM 호출 입력 토큰 수 (응답 usage 기준)",
+    ("persona",)
+)
+LLM_CACHED_TOKENS = Counter(
+    "vchat_llm_cached_prompt_tokens_total",
+    "LLM 입력 토큰 중 업스트림 프롬프트 캐시에서 재사용된 토큰 수",
+    ("persona",)
+)
+LLM_USAGE_REQUESTS = Counter(
+    "vchat_llm_prompt_cache_requests_total",
+    "usage를 받은 LLM 호출 수 (hit: cached_tokens > 0)",
+    ("persona", "result")
+)
+
+
+class PromptPrefix:
+    """
+    페르소나 버전 하나의 고정 프롬프트 접두부
+
+    messages는 여러 요청이 공유하므로 수정하지 말고 `prefix.messages + [...]`처럼 새 목록을 만들어 사용합니다.
+    """
+
+    def __init__(self, name, version, messages, token_count, index=None, budget_tokens=0, limit=0):
+        self.name = name
+        self.version = version
+        self.messages = messages
+        self.token_count = token_count
+        # 예시가 예산보다 많으면 접두부에는 시스템 프롬프트만 두고 턴마다 예시를 검색
+        self.index = index
+        self.budget_tokens = budget_tokens
+        self.limit = limit
+        # 실제로 전송되는 접두부 내용 해시 (같은 버전인데 값이 다르면 캐시 적중이 깨진 것)
+        self.fingerprint = hashlib.sha1(
+            json.dumps(messages, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()[:16]
+
+    @property
+    def cache_key(self):
+        """업스트림 프롬프트 캐시 라우팅 키 (같은 접두부 요청이 같은 캐시 서버로 가도록)"""
+        return f"vchat-{self.fingerprint}"
+
+    def example_messages(self, user_input):
+        """사용자 입력에 맞춰 고른 few-shot 예시 메시지 (예시가 접두부에 모두 들어 있으면 빈 목록)"""
+        if self.index is None:
+            return []
+        return self.index.messages(user_input, self.budget_tokens, self.limit)
+
+
+def _normalize(text):
+    # 줄바꿈 / 앞뒤 공백 차이로 접두부 바이트열이 달라지지 않도록 정리
+    return str(text).replace('\r\n', '\n').replace('\r', '\n').strip()
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def compile_prefix(persona_manager, model=None, budget_tokens=None, limit=None):
+    """
+    페르소나의 시스템 프롬프트와 few-shot 예시를 메시지 목록으로 만들고 토큰 수 계산
+
+    배치는 항상 [system, (user, assistant) * N] 순서이고 매 턴 바뀌는 내용(시각, 세션 값 등)은 넣지 않습니다.
+    대화 기록 / 사용자 입력은 이 접두부 뒤에만 붙여야 업스트림 프롬프트 캐시에 걸립니다.
+
+    예시가 budget_tokens나 limit을 넘으면 접두부에는 [system]만 넣고 예시는 색인(ExampleIndex)으로 만들어
+    턴마다 입력과 가까운 예시만 골라 보냅니다.
+
+    Args:
+        persona_manager: PersonaContext 또는 PersonaManager
+        model (str, optional): 토큰 계산에 쓸 모델 ID
+        budget_tokens (int, optional): few-shot 예시 최대 토큰 수 (기본값: VCHAT_FEW_SHOT_TOKENS)
+        limit (int, optional): few-shot 예시 최대 개수 (기본값: VCHAT_FEW_SHOT_LIMIT)
+
+    Returns:
+        PromptPrefix: 고정 접두부
+    """
+    if budget_tokens is None:
+        budget_tokens = _env_int('VCHAT_FEW_SHOT_TOKENS', DEFAULT_FEW_SHOT_TOKENS)
+    if limit is None:
+        limit = _env_int('VCHAT_FEW_SHOT_LIMIT', DEFAULT_FEW_SHOT_LIMIT)
+
+    system_prompt = persona_manager.generate_system_prompt() + FEW_SHOT_GUIDE
+    messages = [{"role": "system", "content": system_prompt}]
+
+    # Few-shot 예제들 (저장된 순서 그대로, 한쪽이 비어 있는 예시는 제외)
+    examples = []
+    for example in persona_manager.get_few_shot_examples():
+        user = _normalize(example.get("user", ""))
+        assistant = _normalize(example.get("assistant", ""))
+        if user and assistant:
+            examples.append({"user": user, "assistant": assistant})
+
+    index = ExampleIndex(examples, model)
+    if len(index) > limit or index.total_tokens > budget_tokens:
+        print(f"🔎 few-shot 예시 {len(index)}개 ({index.total_tokens} 토큰) → 턴마다 최대 {limit}개 / {budget_tokens} 토큰 검색")
+    else:
+        index = None
+        for example in examples:
+            messages.append({"role": "user", "content": example["user"]})
+            messages.append({"role": "assistant", "content": example["assistant"]})
+
+    persona = persona_manager.get_current_persona()
+    return PromptPrefix(
+        name=persona.get('name', '') if persona else '',
+        version=persona_version(persona),
+        messages=messages,
+        token_count=count_message_tokens(messages, model, reply=False),
+        index=index,
+        budget_tokens=budget_tokens,
+        limit=limit
+    )
+
+
+class PromptPrefixCache:
+    """(페르소나 이름, 버전, 모델) 키의 LRU 접두부 캐시 클래스 (스레드 안전)"""
+
+    def __init__(self, max_entries=None):
+        """
+        Args:
+            max_entries (int, optional): 보관할 접두부 수 (기본값: VCHAT_PROMPT_CACHE_SIZE)
+        """
+        if max_entries is None:
+            max_entries = _env_int('VCHAT_PROMPT_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+        self.max_entries = max(1, max_entries)
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(persona_manager, model):
+        # PersonaContext는 버전을 미리 계산해 두고, PersonaManager는 현재 페르소나로 계산
+        version = getattr(persona_manager, 'version', None)
+        persona = persona_manager.get_current_persona()
+        if version is None:
+            version = persona_version(persona)
+        name = persona.get('name', '') if persona else ''
+        return (name, version, model)
+
+    def get(self, persona_manager, model=None):
+        """
+        페르소나의 고정 접두부 반환 (없거나 페르소나 데이터가 바뀌었으면 새로 만듦)
+
+        Args:
+            persona_manager: PersonaContext 또는 PersonaManager
+            model (str, optional): 모델 ID
+
+        Returns:
+            PromptPrefix: 고정 접두부
+        """
+        key = self._key(persona_manager, model)
+        with self._lock:
+            prefix = self._entries.get(key)
+            if prefix is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return prefix
+            self.misses += 1
+
+        prefix = compile_prefix(persona_manager, model)
+        PROMPT_PREFIX_TOKENS.set(prefix.token_count, persona=prefix.name or "none")
+
+        with self._lock:
+            # 같은 페르소나의 예전 버전은 더 쓰이지 않으므로 바로 제거
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1] != key[1]]:
+                del self._entries[stale]
+            self._entries[key] = prefix
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return prefix
+
+    def peek(self, persona_name):
+        """페르소나의 최근 접두부 (없으면 None, 통계용)"""
+        with self._lock:
+            for key in reversed(self._entries):
+                if key[0] == persona_name:
+                    return self._entries[key]
+        return None
+
+    def invalidate(self, persona_name=None):
+        """특정 페르소나(또는 전체) 접두부 제거"""
+        with self._lock:
+            if persona_name is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == persona_name]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "prefix_tokens": {key[0]: prefix.token_count for key, prefix in self._entries.items()},
+                "example_pools": {
+                    key[0]: len(prefix.index) for key, prefix in self._entries.items() if prefix.index is not None
+                }
+            }
+
+
+def _field(obj, name):
+    # openai 버전에 따라 usage 세부 항목이 객체 또는 dict로 들어옴
+    if obj is None:
+        return None
+    if isinstance(obj, dict):
+        return obj.get(name)
+    return getattr(obj, name, None)
+
+
+class PromptCacheUsage:
+    """페르소나별 LLM 입력 토큰 / 업스트림 캐시 재사용 토큰 집계 클래스 (스레드 안전)"""
+
+    def __init__(self):
+        self._personas = {}
+        self._lock = threading.Lock()
+
+    def record(self, persona, usage):
+        """
+        응답 usage 기록 (prompt_tokens_details.cached_tokens가 없으면 0으로 봄)
+
+        Args:
+            persona (str): 페르소나 이름
+            usage: 응답의 usage (객체 또는 dict, None이면 무시)
+        """
+        prompt_tokens = _field(usage, "prompt_tokens")
+        if not prompt_tokens:
+            return
+        cached_tokens = _field(_field(usage, "prompt_tokens_details"), "cached_tokens") or 0
+        persona = persona or "none"
+
+        LLM_PROMPT_TOKENS.inc(prompt_tokens, persona=persona)
+        LLM_CACHED_TOKENS.inc(cached_tokens, persona=persona)
+        LLM_USAGE_REQUESTS.inc(persona=persona, result="hit" if cached_tokens else "miss")
+
+        with self._lock:
+            entry = self._personas.setdefault(persona, {"requests": 0, "hits": 0, "prompt_tokens": 0, "cached_tokens": 0})
+            entry["requests"] += 1
+            entry["hits"] += 1 if cached_tokens else 0
+            entry["prompt_tokens"] += prompt_tokens
+            entry["cached_tokens"] += cached_tokens
+
+    def stats(self):
+        """페르소나별 요청 적중률(hit_rate)과 입력 토큰 재사용 비율(cached_ratio)"""
+        with self._lock:
+            personas = {name: dict(entry) for name, entry in self._personas.items()}
+        for name, entry in personas.items():
+            entry["hit_rate"] = round(entry["hits"] / entry["requests"], 4) if entry["requests"] else 0.0
+            entry["cached_ratio"] = round(entry["cached_tokens"] / entry["prompt_tokens"], 4) if entry["prompt_tokens"] else 0.0
+            prefix = get_prompt_cache().peek(name)
+            if prefix is not None:
+                entry["prefix_tokens"] = prefix.token_count
+                entry["prefix_fingerprint"] = prefix.fingerprint
+        return personas
+
+
+_cache = None
+_usage = PromptCacheUsage()
+_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """프로세스 전역 프롬프트 접두부 캐시 반환"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PromptPrefixCache()
+    return _cache
+
+
+def record_usage(persona, usage):
+    """LLM 응답 usage를 페르소나별 프롬프트 캐시 통계에 기록"""
+    _usage.record(persona, usage)
+
+
+def usage_stats():
+    """페르소나별 업스트림 프롬프트 캐시 적중 통계"""
+    return _usage.stats()
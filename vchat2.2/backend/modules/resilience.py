@@ -0,0 +1,319 @@
+"""
+업스트림 호출 복원력 모듈
+일시적인 오류(429 / 5xx / 타임아웃)는 마감 시간 안에서 지수 백오프 + 지터로 재시도하고,
+최근 지연 시간의 백분위수를 넘긴 호출에는 두 번째 요청(hedge)을 보내 먼저 끝난 결과를 사용
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from .admission import get_limiter
+from .metrics import Counter
+from .tracing import span
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+DEFAULT_ATTEMPTS = 3
+DEFAULT_BASE_DELAY = 0.2
+DEFAULT_MAX_DELAY = 2.0
+DEFAULT_DEADLINES = {"llm": 20.0, "stt": 30.0, "tts": 15.0}  # 업스트림별 호출 전체 마감 시간 (초)
+DEFAULT_HEDGE_PERCENTILE = 95  # 0이면 hedge 사용 안 함
+DEFAULT_HEDGE_MIN_SAMPLES = 20
+DEFAULT_HEDGE_WORKERS = 32
+MIN_HEDGE_DELAY = 0.05
+
+UPSTREAM_RETRIES = Counter(
+    "vchat_upstream_retries_total",
+    "업스트림 호출 재시도 수 (재시도한 오류 종류별)",
+    ("upstream", "reason")
+)
+UPSTREAM_HEDGES = Counter(
+    "vchat_upstream_hedges_total",
+    "hedge 요청 수 (launched: 보냄, won: hedge 결과 사용, skipped: 입장 제어 자리가 없어 보내지 않음)",
+    ("upstream", "outcome")
+)
+
+
+def _env_number(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+class Deadline:
+    """호출 전체에 주어진 마감 시간"""
+
+    def __init__(self, seconds):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self):
+        return max(0.0, self.expires - time.monotonic())
+
+
+class RetryPolicy:
+    """재시도 횟수 / 백오프 / 마감 시간 설정"""
+
+    def __init__(self, attempts=DEFAULT_ATTEMPTS, base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 deadline=20.0):
+        self.attempts = max(1, int(attempts))
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+    @classmethod
+    def from_env(cls, upstream):
+        """
+        환경변수로 재시도 설정
+
+        VCHAT_RETRY_ATTEMPTS, VCHAT_RETRY_BASE_DELAY, VCHAT_RETRY_MAX_DELAY, VCHAT_<UPSTREAM>_DEADLINE
+        """
+        return cls(
+            attempts=_env_number('VCHAT_RETRY_ATTEMPTS', DEFAULT_ATTEMPTS),
+            base_delay=_env_number('VCHAT_RETRY_BASE_DELAY', DEFAULT_BASE_DELAY),
+            max_delay=_env_number('VCHAT_RETRY_MAX_DELAY', DEFAULT_MAX_DELAY),
+            deadline=_env_number(f'VCHAT_{upstream.upper()}_DEADLINE', DEFAULT_DEADLINES.get(upstream, 20.0))
+        )
+
+    def backoff(self, attempt, retry_after=None):
+        """
+        다음 시도까지 기다릴 시간 (full jitter: 0 ~ base * 2^(attempt-1) 사이 무작위)
+
+        업스트림이 Retry-After를 알려주면 그보다 먼저 다시 보내지 않습니다.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def is_transient(error):
+    """재시도하면 성공할 수 있는 오류인지 판단 (429 / 5xx / 타임아웃 / 연결 오류)"""
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        # 요금 한도 소진(insufficient_quota)은 기다려도 풀리지 않음
+        if getattr(error, "code", None) == "insufficient_quota":
+            return False
+        return status in RETRYABLE_STATUS
+
+    import httpx
+
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError, httpx.RemoteProtocolError)):
+        return True
+    try:
+        import openai
+
+        if isinstance(error, (openai.APITimeoutError, openai.APIConnectionError)):
+            return True
+    except ImportError:
+        pass
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+
+def _retry_after(error):
+    headers = getattr(error, "headers", None) or getattr(getattr(error, "response", None), "headers", None)
+    try:
+        value = headers.get("retry-after") if headers else None
+        return float(value) if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _error_reason(error):
+    status = getattr(error, "status_code", None)
+    return str(status) if status is not None else type(error).__name__
+
+
+class LatencyTracker:
+    """최근 성공 호출의 지연 시간으로 백분위수를 계산하는 클래스 (hedge 기준)"""
+
+    def __init__(self, size=200, min_samples=DEFAULT_HEDGE_MIN_SAMPLES):
+        self.min_samples = min_samples
+        self._samples = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self._cached = {}
+        self._since_cached = 0
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_cached += 1
+            if self._since_cached >= 10:
+                self._cached.clear()
+                self._since_cached = 0
+
+    def percentile(self, p):
+        """p 백분위수 (표본이 부족하면 None)"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return None
+            value = self._cached.get(p)
+            if value is None:
+                ordered = sorted(self._samples)
+                value = ordered[min(len(ordered) - 1, int(len(ordered) * p / 100))]
+                self._cached[p] = value
+            return value
+
+
+_trackers = {}
+_policies = {}
+_hedge_executor = None
+_state_lock = threading.Lock()
+
+
+def get_tracker(upstream):
+    tracker = _trackers.get(upstream)
+    if tracker is None:
+        with _state_lock:
+            tracker = _trackers.setdefault(upstream, LatencyTracker(
+                min_samples=int(_env_number('VCHAT_HEDGE_MIN_SAMPLES', DEFAULT_HEDGE_MIN_SAMPLES))
+            ))
+    return tracker
+
+
+def get_policy(upstream):
+    policy = _policies.get(upstream)
+    if policy is None:
+        with _state_lock:
+            policy = _policies.setdefault(upstream, RetryPolicy.from_env(upstream))
+    return policy
+
+
+def _get_hedge_executor():
+    """hedge 대상 호출 전용 스레드 풀 (run_blocking 풀과 분리해 서로 기다리며 막히지 않게)"""
+    global _hedge_executor
+    if _hedge_executor is None:
+        with _state_lock:
+            if _hedge_executor is None:
+                _hedge_executor = ThreadPoolExecutor(
+                    max_workers=max(2, int(_env_number('VCHAT_HEDGE_WORKERS', DEFAULT_HEDGE_WORKERS))),
+                    thread_name_prefix="vchat-hedge"
+                )
+    return _hedge_executor
+
+
+def shutdown_hedge_executor():
+    global _hedge_executor
+    with _state_lock:
+        if _hedge_executor is not None:
+            _hedge_executor.shutdown(wait=False)
+            _hedge_executor = None
+
+
+def hedge_delay(upstream):
+    """hedge를 보낼 때까지 기다릴 시간 (사용하지 않거나 표본이 부족하면 None)"""
+    percentile = _env_number('VCHAT_HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE)
+    if percentile <= 0:
+        return None
+    value = get_tracker(upstream).percentile(percentile)
+    return max(MIN_HEDGE_DELAY, value) if value is not None else None
+
+
+def _submit(func, *args):
+    # 지표 라벨 / trace가 hedge 스레드에서도 유지되도록 컨텍스트 복사
+    context = contextvars.copy_context()
+    return _get_hedge_executor().submit(context.run, func, *args)
+
+
+def _hedged_attempt(upstream, func, timeout, delay):
+    """
+    한 번의 시도를 hedge와 함께 실행
+
+    첫 요청이 delay 안에 끝나지 않으면 (입장 제어에 빈자리가 있을 때만) 같은 요청을 하나 더 보내고
+    먼저 성공한 결과를 반환합니다. 늦게 끝난 요청은 결과만 버립니다.
+
+    hedge로 얻은 자리는 두 요청이 모두 끝날 때 반납하므로, 호출한 쪽이 자기 자리를 먼저 반납해도
+    아직 실행 중인 요청(hedge에 진 첫 요청 포함)은 계속 동시 실행 수에 포함됩니다.
+    """
+    primary = _submit(func, timeout)
+    done, _ = wait([primary], timeout=delay)
+    if done:
+        return primary.result()
+
+    limiter = get_limiter(upstream)
+    entered = limiter.try_acquire()
+    if entered is None:
+        UPSTREAM_HEDGES.inc(upstream=upstream, outcome="skipped")
+        return primary.result()
+
+    UPSTREAM_HEDGES.inc(upstream=upstream, outcome="launched")
+    hedge = _submit(func, max(0.1, timeout - delay))
+    running = [2]
+    running_lock = threading.Lock()
+
+    def finished(_):
+        with running_lock:
+            running[0] -= 1
+            last = running[0] == 0
+        if last:
+            limiter.release(entered)
+
+    primary.add_done_callback(finished)
+    hedge.add_done_callback(finished)
+
+    pending = {primary, hedge}
+    first_error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    UPSTREAM_HEDGES.inc(upstream=upstream, outcome="won")
+                return future.result()
+            if first_error is None or future is primary:
+                first_error = future.exception()
+    raise first_error
+
+
+def call_with_retry(upstream, func, hedge=False, deadline=None, rewind=None):
+    """
+    업스트림 호출을 마감 시간 안에서 재시도
+
+    Args:
+        upstream (str): "llm" / "stt" / "tts" (재시도 설정, hedge 기준, 입장 제어 구분)
+        func: timeout(남은 시간, 초)을 받아 호출하는 함수
+        hedge (bool): 같은 요청을 두 번 보내도 안전한 호출이면 True
+        deadline (float, optional): 기본 마감 시간 대신 쓸 시간 (초)
+        rewind (callable, optional): 재시도 전에 호출 (파일 위치 되돌리기 등)
+
+    Returns:
+        func의 반환값
+
+    Raises:
+        마지막 시도의 예외 (일시적이지 않은 오류는 바로)
+    """
+    policy = get_policy(upstream)
+    limit = Deadline(deadline if deadline is not None else policy.deadline)
+    tracker = get_tracker(upstream)
+    attempt = 0
+
+    while True:
+        attempt += 1
+        started = time.perf_counter()
+        try:
+            delay = hedge_delay(upstream) if hedge else None
+            if delay is not None and delay < limit.remaining():
+                result = _hedged_attempt(upstream, func, limit.remaining(), delay)
+            else:
+                result = func(limit.remaining())
+            if hedge:
+                # hedge 기준은 같은 종류의 호출끼리 (스트리밍 / 긴 분석 호출은 섞지 않음)
+                tracker.record(time.perf_counter() - started)
+            return result
+        except Exception as e:
+            if attempt >= policy.attempts or not is_transient(e):
+                raise
+            backoff = policy.backoff(attempt, _retry_after(e))
+            if backoff >= limit.remaining():
+                raise
+            UPSTREAM_RETRIES.inc(upstream=upstream, reason=_error_reason(e))
+            print(f"🔁 {upstream} 재시도 {attempt}/{policy.attempts - 1} ({_error_reason(e)}, {backoff:.2f}초 후)")
+            with span(f"{upstream}_backoff"):
+                time.sleep(backoff)
+            if rewind:
+                rewind()
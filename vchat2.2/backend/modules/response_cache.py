@@ -0,0 +1,277 @@
+"""
+응답 캐시 모듈
+"안녕", "뭐해?", "잘자" 같은 짧은 인사/잡담은 페르소나별로 이전 응답을 재사용해 LLM 호출 없이 답함
+
+입력을 정규화한 뒤 글자 n-gram 해시 벡터(numpy)로 만들고 코사인 유사도가 기준 이상인 항목을 찾습니다.
+항목마다 응답 변형을 여러 개 모아 두고 그중 하나를 골라 같은 인사에도 매번 똑같이 답하지 않게 합니다.
+"""
+
+import os
+import random
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from collections import OrderedDict
+
+from .metrics import Counter
+
+DEFAULT_THRESHOLD = 0.88
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_MAX_ENTRIES = 256  # 페르소나별
+DEFAULT_VARIANTS = 3
+DEFAULT_MAX_CHARS = 20
+VECTOR_DIM = 512
+NGRAM_SIZES = (1, 2, 3)
+
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "vchat_response_cache_lookups_total",
+    "응답 캐시 조회 수 (hit: 캐시 응답, fill: 변형을 더 모으려고 LLM 호출, miss: 비슷한 입력 없음)",
+    ("persona", "result")
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]|_")
+_REPEATS = re.compile(r"(.)\1{2,}")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_message(text):
+    """
+    캐시 조회용 입력 정규화 (유니코드 정규화, 소문자, 문장부호 / 공백 제거, 3번 이상 반복 글자는 2번으로)
+
+    "안녕!!", "안녕~ ", "안녕ㅋㅋㅋㅋ" → "안녕", "안녕", "안녕ㅋㅋ"
+    """
+    text = unicodedata.normalize("NFKC", str(text)).lower()
+    text = _PUNCTUATION.sub(" ", text)
+    text = _REPEATS.sub(r"\1\1", text)
+    return _SPACES.sub("", text)
+
+
+def embed(normalized):
+    """
+    정규화한 입력의 글자 n-gram 해시 벡터 (L2 정규화, 프로세스가 달라도 같은 값)
+
+    Returns:
+        np.ndarray: float32 (VECTOR_DIM,) 벡터 (빈 입력이면 0 벡터)
+    """
+    # numpy는 캐시를 켠 경우에만 필요하므로 처음 쓸 때 import (기본 설정의 시작 시간에 포함하지 않음)
+    import numpy as np
+
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    padded = f"^{normalized}$"
+    for n in NGRAM_SIZES:
+        for i in range(len(padded) - n + 1):
+            gram = padded[i:i + n]
+            if not gram.strip("^$"):
+                # 경계 표시만 있는 n-gram ("^", "$", 빈 입력의 "^$")은 제외
+                continue
+            digest = zlib.crc32(gram.encode("utf-8"))
+            # 부호 해시로 충돌한 n-gram끼리 상쇄되게 함
+            vector[digest % VECTOR_DIM] += 1.0 if digest & 0x80000000 else -1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+class _Entry:
+    __slots__ = ("key", "vector", "variants", "samples", "created")
+
+    def __init__(self, key, vector, created):
+        self.key = key
+        self.vector = vector
+        self.variants = []
+        self.samples = 0  # 받은 응답 수 (모델이 같은 답만 주면 변형이 덜 모여도 채운 것으로 봄)
+        self.created = created
+
+
+class _PersonaIndex:
+    """페르소나 하나의 캐시 항목 + 유사도 검색용 행렬"""
+
+    def __init__(self):
+        self.entries = OrderedDict()  # 정규화 입력 -> _Entry (오래 안 쓴 순서)
+        self._matrix = None
+        self._keys = []
+
+    def invalidate(self):
+        self._matrix = None
+
+    def nearest(self, vector):
+        """가장 비슷한 항목과 코사인 유사도 (항목이 없으면 (None, 0.0))"""
+        if not self.entries:
+            return None, 0.0
+        import numpy as np
+
+        if self._matrix is None:
+            self._keys = list(self.entries)
+            self._matrix = np.stack([self.entries[key].vector for key in self._keys])
+        similarities = self._matrix @ vector
+        best = int(np.argmax(similarities))
+        return self.entries.get(self._keys[best]), float(similarities[best])
+
+
+class ResponseCache:
+    """
+    페르소나별 의미 유사 응답 캐시 클래스 (TTL + LRU, 스레드 안전)
+
+    - threshold: 캐시 응답으로 인정할 최소 코사인 유사도
+    - variants: 항목마다 모을 응답 수 (그만큼 받기 전까지는 비슷한 입력에도 LLM을 호출해 변형을 추가)
+    - max_chars: 이보다 긴 입력은 구체적인 질문으로 보고 캐시하지 않음
+    """
+
+    def __init__(self, threshold=None, ttl_seconds=None, max_entries=None, variants=None, max_chars=None):
+        self.threshold = threshold if threshold is not None else _env_float('VCHAT_RESPONSE_CACHE_THRESHOLD', DEFAULT_THRESHOLD)
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else _env_float('VCHAT_RESPONSE_CACHE_TTL', DEFAULT_TTL_SECONDS)
+        self.max_entries = max(1, int(max_entries if max_entries is not None else _env_float('VCHAT_RESPONSE_CACHE_SIZE', DEFAULT_MAX_ENTRIES)))
+        self.variants = max(1, int(variants if variants is not None else _env_float('VCHAT_RESPONSE_CACHE_VARIANTS', DEFAULT_VARIANTS)))
+        self.max_chars = int(max_chars if max_chars is not None else _env_float('VCHAT_RESPONSE_CACHE_MAX_CHARS', DEFAULT_MAX_CHARS))
+
+        self._lock = threading.Lock()
+        self._personas = {}  # (페르소나 이름, 버전) -> _PersonaIndex
+        self.hits = 0
+        self.fills = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _eligible(self, normalized):
+        return 0 < len(normalized) <= self.max_chars
+
+    def _expired(self, entry, now):
+        return self.ttl_seconds > 0 and now - entry.created > self.ttl_seconds
+
+    def _index(self, persona):
+        # 같은 이름의 예전 버전 항목은 페르소나가 바뀐 뒤에는 쓰지 않으므로 제거
+        index = self._personas.get(persona)
+        if index is None:
+            for stale in [key for key in self._personas if key[0] == persona[0]]:
+                del self._personas[stale]
+            index = self._personas[persona] = _PersonaIndex()
+        return index
+
+    def lookup(self, persona, message):
+        """
+        비슷한 입력의 캐시 응답 조회
+
+        Args:
+            persona (tuple): (페르소나 이름, 버전)
+            message (str): 사용자 입력
+
+        Returns:
+            str: 캐시 응답 (없거나 변형을 더 모아야 하면 None)
+        """
+        normalized = normalize_message(message)
+        if not self._eligible(normalized):
+            return None
+        vector = embed(normalized)
+        now = time.time()
+        label = persona[0] or "none"
+
+        with self._lock:
+            index = self._index(persona)
+            entry = index.entries.get(normalized)
+            similarity = 1.0 if entry is not None else 0.0
+            if entry is None:
+                entry, similarity = index.nearest(vector)
+
+            if entry is not None and self._expired(entry, now):
+                del index.entries[entry.key]
+                index.invalidate()
+                entry = None
+
+            if entry is None or similarity < self.threshold:
+                self.misses += 1
+                result = "miss"
+                response = None
+            elif entry.samples < self.variants:
+                self.fills += 1
+                result = "fill"
+                response = None
+            else:
+                index.entries.move_to_end(entry.key)
+                self.hits += 1
+                result = "hit"
+                response = random.choice(entry.variants)
+
+        RESPONSE_CACHE_LOOKUPS.inc(persona=label, result=result)
+        return response
+
+    def store(self, persona, message, response):
+        """
+        LLM 응답을 캐시에 추가 (비슷한 항목이 있으면 그 항목의 변형으로)
+
+        Args:
+            persona (tuple): (페르소나 이름, 버전)
+            message (str): 사용자 입력
+            response (str): 응답
+        """
+        normalized = normalize_message(message)
+        if not response or not self._eligible(normalized):
+            return
+        vector = embed(normalized)
+        now = time.time()
+
+        with self._lock:
+            index = self._index(persona)
+            entry = index.entries.get(normalized)
+            if entry is None:
+                nearest, similarity = index.nearest(vector)
+                if nearest is not None and similarity >= self.threshold and not self._expired(nearest, now):
+                    entry = nearest
+            if entry is None:
+                entry = index.entries[normalized] = _Entry(normalized, vector, now)
+                index.invalidate()
+                while len(index.entries) > self.max_entries:
+                    index.entries.popitem(last=False)
+                    self.evictions += 1
+            elif self._expired(entry, now):
+                # 만료된 항목은 예전 응답을 버리고 새 응답으로 다시 모음
+                entry.created = now
+                entry.variants = []
+                entry.samples = 0
+
+            index.entries.move_to_end(entry.key)
+            entry.samples += 1
+            if response not in entry.variants and len(entry.variants) < self.variants:
+                entry.variants.append(response)
+
+    def clear(self):
+        with self._lock:
+            self._personas.clear()
+
+    def stats(self):
+        """캐시 통계 반환"""
+        with self._lock:
+            lookups = self.hits + self.fills + self.misses
+            return {
+                "hits": self.hits,
+                "fills": self.fills,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "entries": {key[0]: len(index.entries) for key, index in self._personas.items()},
+                "threshold": self.threshold,
+                "ttl_seconds": self.ttl_seconds,
+                "variants": self.variants
+            }
+
+
+def _env_float(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """프로세스 전역 응답 캐시 반환 (VCHAT_RESPONSE_CACHE=1일 때만, 아니면 None)"""
+    global _cache
+    if os.getenv('VCHAT_RESPONSE_CACHE', '0').lower() not in ('1', 'true', 'yes', 'on'):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache()
+    return _cache
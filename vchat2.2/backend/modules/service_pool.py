@@ -0,0 +1,129 @@
+"""
+페르소나별 서비스 풀 모듈
+페르소나마다 VChatBot / VoiceConverter 묶음을 필요할 때 만들고 LRU로 재사용
+"""
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from .vchat_bot import VChatBot
+from .tts_service import VoiceConverter
+from .tracing import span
+
+DEFAULT_POOL_SIZE = 16
+DEFAULT_POOL_MB = 64
+
+
+class PersonaServices:
+    """페르소나 하나에 묶인 서비스 번들 (프롬프트, 모델 ID, 음성 ID, 공유 클라이언트)"""
+
+    def __init__(self, context):
+        """
+        Args:
+            context (PersonaContext): 고정된 페르소나 뷰
+        """
+        self.context = context
+        self.name = context.name
+        self.version = context.version
+        self.chatbot = VChatBot(persona_manager=context)
+        self.tts = VoiceConverter(persona_manager=context)
+        # 풀 메모리 예산 계산용 대략적인 크기 (페르소나 데이터 + 시스템 프롬프트)
+        self.size = len(json.dumps(context.current_persona, ensure_ascii=False).encode('utf-8')) \
+            + len(context.generate_system_prompt().encode('utf-8'))
+
+
+class PersonaServicePool:
+    """페르소나 이름으로 서비스 번들을 조회하는 LRU 풀 클래스"""
+
+    def __init__(self, persona_manager, max_size=None, max_bytes=None):
+        """
+        서비스 풀 초기화
+
+        Args:
+            persona_manager (PersonaManager): 페르소나 데이터 원본
+            max_size (int, optional): 최대 번들 수 (기본값: VCHAT_PERSONA_POOL_SIZE)
+            max_bytes (int, optional): 번들 메모리 예산 (기본값: VCHAT_PERSONA_POOL_MB)
+        """
+        self.persona_manager = persona_manager
+        if max_size is None:
+            max_size = int(os.getenv('VCHAT_PERSONA_POOL_SIZE', DEFAULT_POOL_SIZE))
+        if max_bytes is None:
+            max_bytes = int(float(os.getenv('VCHAT_PERSONA_POOL_MB', DEFAULT_POOL_MB)) * 1024 * 1024)
+        self.max_size = max_size
+        self.max_bytes = max_bytes
+        self._bundles = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.evictions = 0
+
+    def get(self, persona_name):
+        """
+        페르소나 서비스 번들 조회 (없으면 생성, 페르소나 데이터가 바뀌었으면 다시 생성)
+
+        Args:
+            persona_name (str): 페르소나 이름
+
+        Returns:
+            PersonaServices: 서비스 번들 또는 None (없는 페르소나)
+        """
+        context = self.persona_manager.get_persona_context(persona_name)
+        if context is None:
+            return None
+
+        with self._lock:
+            bundle = self._bundles.get(persona_name)
+            if bundle is not None and bundle.version == context.version:
+                self._bundles.move_to_end(persona_name)
+                return bundle
+
+        # 번들 생성은 잠금 밖에서 (클라이언트는 공유되므로 가벼움)
+        with span("service_build"):
+            bundle = PersonaServices(context)
+
+        with self._lock:
+            current = self._bundles.get(persona_name)
+            if current is not None and current.version == bundle.version:
+                self._bundles.move_to_end(persona_name)
+                return current
+            if current is not None:
+                self._remove(persona_name)
+            self._bundles[persona_name] = bundle
+            self._bytes += bundle.size
+            self.builds += 1
+            self._evict()
+        return bundle
+
+    def invalidate(self, persona_name=None):
+        """특정 페르소나(또는 전체) 번들 제거"""
+        with self._lock:
+            if persona_name is None:
+                self._bundles.clear()
+                self._bytes = 0
+            elif persona_name in self._bundles:
+                self._remove(persona_name)
+
+    def _remove(self, persona_name):
+        bundle = self._bundles.pop(persona_name)
+        self._bytes -= bundle.size
+
+    def _evict(self):
+        """개수/메모리 예산을 넘으면 오래 안 쓴 번들부터 제거 (lock 보유 상태에서 호출)"""
+        while len(self._bundles) > 1 and (len(self._bundles) > self.max_size or self._bytes > self.max_bytes):
+            name = next(iter(self._bundles))
+            self._remove(name)
+            self.evictions += 1
+
+    def stats(self):
+        """풀 상태 반환"""
+        with self._lock:
+            return {
+                "personas": list(self._bundles.keys()),
+                "size": len(self._bundles),
+                "max_size": self.max_size,
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "builds": self.builds,
+                "evictions": self.evictions
+            }
@@ -0,0 +1,193 @@
+"""
+세션 저장소 모듈
+세션별 상태(선택한 페르소나 등)를 SQLite에 보관해 여러 워커 프로세스가 같은 값을 보도록 함
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+DEFAULT_SESSION = "_default"  # session_id 없이 들어온 요청이 공유하는 기본 세션
+
+
+class SessionStore:
+    """SQLite 기반 세션 키-값 저장소 클래스 (프로세스 간 공유, 스레드 안전)"""
+
+    def __init__(self, path=None, ttl_seconds=None):
+        """
+        세션 저장소 초기화
+
+        Args:
+            path (str, optional): SQLite 파일 경로 (기본값: VCHAT_SESSION_DB, ':memory:'면 프로세스 내부 전용)
+            ttl_seconds (int, optional): 마지막 수정 후 세션 보관 시간 (기본값: VCHAT_SESSION_TTL_SECONDS)
+        """
+        self.path = path or os.getenv(
+            'VCHAT_SESSION_DB',
+            os.path.join(tempfile.gettempdir(), 'vchat_sessions.sqlite3')
+        )
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else int(
+            os.getenv('VCHAT_SESSION_TTL_SECONDS', DEFAULT_TTL_SECONDS)
+        )
+        self._local = threading.local()
+        self._memory_connection = None
+        self._lock = threading.Lock()
+
+        if self.path == ':memory:':
+            # 메모리 DB는 연결마다 별개이므로 연결 하나를 잠금과 함께 공유
+            self._memory_connection = sqlite3.connect(':memory:', check_same_thread=False, isolation_level=None)
+        else:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            os.makedirs(directory, exist_ok=True)
+
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                " session_id TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (session_id, key))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS sessions_updated_at ON sessions (updated_at)")
+
+    def _connect(self):
+        """스레드별 연결 반환 (WAL 모드로 여러 워커가 동시에 읽기 가능)"""
+        if self._memory_connection is not None:
+            return _LockedConnection(self._memory_connection, self._lock)
+
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return _LockedConnection(connection, None)
+
+    def get(self, session_id, key, default=None):
+        """
+        세션 값 조회
+
+        Args:
+            session_id (str): 세션 ID
+            key (str): 값 이름
+            default: 없거나 만료됐을 때 반환값
+
+        Returns:
+            JSON으로 저장한 값 또는 default
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT value, updated_at FROM sessions WHERE session_id = ? AND key = ?",
+                (session_id, key)
+            ).fetchone()
+
+        if row is None or self._expired(session_id, row[1]):
+            return default
+        return json.loads(row[0])
+
+    def set(self, session_id, key, value):
+        """세션 값 저장 (JSON 직렬화 가능한 값)"""
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT INTO sessions (session_id, key, value, updated_at) VALUES (?, ?, ?, ?)"
+                " ON CONFLICT (session_id, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+                (session_id, key, payload, time.time())
+            )
+
+    def delete(self, session_id, key=None):
+        """
+        세션 값(또는 세션 전체) 삭제
+
+        Returns:
+            int: 삭제한 행 수
+        """
+        with self._connect() as connection:
+            if key is None:
+                cursor = connection.execute("DELETE FROM sessions WHERE session_id = ?", (session_id,))
+            else:
+                cursor = connection.execute("DELETE FROM sessions WHERE session_id = ? AND key = ?", (session_id, key))
+            return cursor.rowcount
+
+    def delete_prefix(self, session_id, key_prefix):
+        """
+        이름이 key_prefix로 시작하는 세션 값 모두 삭제
+
+        Returns:
+            int: 삭제한 행 수
+        """
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM sessions WHERE session_id = ? AND substr(key, 1, ?) = ?",
+                (session_id, len(key_prefix), key_prefix)
+            )
+            return cursor.rowcount
+
+    def purge_expired(self):
+        """
+        만료된 세션 값 삭제
+
+        Returns:
+            int: 삭제한 행 수
+        """
+        if self.ttl_seconds <= 0:
+            return 0
+        cutoff = time.time() - self.ttl_seconds
+        with self._connect() as connection:
+            cursor = connection.execute(
+                "DELETE FROM sessions WHERE updated_at < ? AND session_id != ?",
+                (cutoff, DEFAULT_SESSION)
+            )
+            return cursor.rowcount
+
+    def _expired(self, session_id, updated_at):
+        # 기본 세션(공유 기본 페르소나)은 purge_expired와 같이 만료시키지 않음
+        if session_id == DEFAULT_SESSION:
+            return False
+        return self.ttl_seconds > 0 and time.time() - updated_at > self.ttl_seconds
+
+    # 자주 쓰는 값 헬퍼
+    def get_persona(self, session_id=None):
+        """세션에서 선택한 페르소나 이름 반환 (없으면 기본 세션 값)"""
+        persona = self.get(session_id, 'persona') if session_id else None
+        return persona or self.get(DEFAULT_SESSION, 'persona')
+
+    def set_persona(self, persona_name, session_id=None):
+        """세션(없으면 기본 세션)의 페르소나 선택 저장"""
+        self.set(session_id or DEFAULT_SESSION, 'persona', persona_name)
+
+
+class _LockedConnection:
+    """with 블록 동안 (필요하면) 잠금을 잡고 연결을 빌려주는 래퍼"""
+
+    def __init__(self, connection, lock):
+        self.connection = connection
+        self.lock = lock
+
+    def __enter__(self):
+        if self.lock:
+            self.lock.acquire()
+        return self.connection
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.lock:
+            self.lock.release()
+        return False
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """프로세스 전역 세션 저장소 반환"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
@@ -0,0 +1,178 @@
+"""
+문장 단위 음성 합성 파이프라인 모듈
+스트리밍 LLM 출력을 문장 경계에서 잘라 바로 TTS로 넘기고, 순서대로 결과를 전달
+"""
+
+import asyncio
+import os
+import re
+from .admission import OverloadedError
+from .async_utils import run_blocking
+
+# 문장 끝으로 볼 문자 (뒤에 공백이 오거나 스트림이 끝나야 확정)
+SENTENCE_END_PATTERN = re.compile(r'[.!?~…。！？\n]+(?=\s|$)')
+
+DEFAULT_MIN_CHARS = 8
+DEFAULT_MAX_CHARS = 200
+DEFAULT_MAX_PARALLEL = 3
+
+
+class SentenceSplitter:
+    """토큰 델타를 모아 완성된 문장 단위로 잘라주는 클래스"""
+
+    def __init__(self, min_chars=DEFAULT_MIN_CHARS, max_chars=DEFAULT_MAX_CHARS):
+        """
+        Args:
+            min_chars (int): 이보다 짧은 문장은 다음 문장과 합쳐서 전달 ("응!" 같은 짧은 조각 방지)
+            max_chars (int): 문장 부호 없이 이 길이를 넘으면 쉼표/공백에서 강제로 자름
+        """
+        self.min_chars = min_chars
+        self.max_chars = max_chars
+        self.buffer = ""
+
+    def feed(self, delta):
+        """
+        델타를 추가하고 완성된 문장 목록 반환
+
+        Args:
+            delta (str): LLM 스트림에서 받은 텍스트 조각
+
+        Returns:
+            list: 완성된 문장들 (없으면 빈 리스트)
+        """
+        self.buffer += delta
+        sentences = []
+
+        while True:
+            cut = self._find_cut()
+            if cut is None:
+                break
+            sentence = self.buffer[:cut].strip()
+            self.buffer = self.buffer[cut:]
+            if sentence:
+                sentences.append(sentence)
+
+        return sentences
+
+    def flush(self):
+        """스트림 종료 시 남은 텍스트 반환"""
+        rest = self.buffer.strip()
+        self.buffer = ""
+        return rest
+
+    def _find_cut(self):
+        """버퍼에서 자를 위치 계산 (없으면 None)"""
+        for match in SENTENCE_END_PATTERN.finditer(self.buffer):
+            # 문장 부호 바로 뒤가 버퍼 끝이면 다음 델타에서 부호가 이어질 수 있으므로 대기
+            if match.end() >= len(self.buffer):
+                break
+            if len(self.buffer[:match.end()].strip()) >= self.min_chars:
+                return match.end()
+
+        if len(self.buffer) > self.max_chars:
+            window = self.buffer[:self.max_chars]
+            cut = max(window.rfind(','), window.rfind(' '))
+            return cut + 1 if cut > 0 else self.max_chars
+
+        return None
+
+
+def get_max_parallel():
+    """환경변수 VCHAT_TTS_PIPELINE_PARALLEL에서 동시 합성 문장 수를 읽어 반환"""
+    try:
+        value = int(os.getenv('VCHAT_TTS_PIPELINE_PARALLEL', DEFAULT_MAX_PARALLEL))
+    except ValueError:
+        value = DEFAULT_MAX_PARALLEL
+    return max(1, value)
+
+
+async def pipeline_events(deltas, synthesize, max_parallel=None):
+    """
+    LLM 델타 스트림과 문장 단위 음성 합성을 겹쳐서 실행
+
+    텍스트 델타는 도착하는 즉시, 음성 결과는 문장 순서대로 전달됩니다.
+    앞 문장의 합성이 끝나기 전에도 뒤 문장의 생성과 합성은 계속 진행됩니다.
+
+    Args:
+        deltas: 텍스트 델타를 내보내는 비동기 이터러블
+        synthesize: 문장 하나를 받아 결과(예: audio_url)를 반환하는 동기 함수
+        max_parallel (int, optional): 동시에 합성할 최대 문장 수
+
+    Yields:
+        tuple: ("delta", text) 또는 ("sentence", index, sentence, result)
+
+    Raises:
+        OverloadedError: 합성이 입장 제어 / 업스트림 429에 걸린 경우 (다른 합성 오류는 result=None)
+    """
+    semaphore = asyncio.Semaphore(max_parallel or get_max_parallel())
+    events = asyncio.Queue()
+    pending = asyncio.Queue()
+    end = object()
+
+    async def synthesize_one(sentence):
+        async with semaphore:
+            return await run_blocking(synthesize, sentence)
+
+    async def produce():
+        splitter = SentenceSplitter()
+        try:
+            async for delta in deltas:
+                await events.put(("delta", delta))
+                for sentence in splitter.feed(delta):
+                    await pending.put((sentence, asyncio.ensure_future(synthesize_one(sentence))))
+            rest = splitter.flush()
+            if rest:
+                await pending.put((rest, asyncio.ensure_future(synthesize_one(rest))))
+        finally:
+            await pending.put(end)
+            close = getattr(deltas, "aclose", None)
+            if close:
+                await close()
+
+    async def sequence():
+        index = 0
+        while True:
+            item = await pending.get()
+            if item is end:
+                break
+            sentence, task = item
+            try:
+                result = await task
+            except OverloadedError:
+                # 한도 초과는 문장 하나의 실패가 아니라 요청 전체의 거절 (호출자가 retry_after와 함께 error로 전달)
+                raise
+            except Exception as e:
+                print(f"❌ 문장 음성 합성 오류: {str(e)}")
+                result = None
+            await events.put(("sentence", index, sentence, result))
+            index += 1
+
+    producer = asyncio.ensure_future(produce())
+    sequencer = asyncio.ensure_future(sequence())
+    workers = asyncio.gather(producer, sequencer)
+
+    def finished(future):
+        # 소비자가 먼저 끊긴 경우에도 예외가 회수되지 않은 채 남지 않도록 확인
+        if not future.cancelled():
+            future.exception()
+        events.put_nowait(end)
+
+    workers.add_done_callback(finished)
+
+    try:
+        while True:
+            event = await events.get()
+            if event is end:
+                break
+            yield event
+        # 생성 단계에서 발생한 예외를 호출자에게 전달
+        await workers
+    finally:
+        # 소비자가 중간에 끊거나 오류가 난 경우 남은 생성/합성 작업 취소
+        for task in (producer, sequencer):
+            if not task.done():
+                task.cancel()
+        while not pending.empty():
+            item = pending.get_nowait()
+            if item is not end:
+                item[1].cancel()
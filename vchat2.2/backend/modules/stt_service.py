@@ -3,21 +3,99 @@ STT (Speech-to-Text) 서비스 모듈
 OpenAI Whisper API를 사용한 실시간 음성 인식
 """
 
+import io
 import os
-import pyaudio
 import wave
 import threading
 import time
 import tempfile
-import tiktoken
-import numpy as np
-from openai import OpenAI
 from .audio_utils import validate_api_keys
+from .clients import get_openai_client
+from .metrics import track_stage
+from .admission import admit, OverloadedError
+from .resilience import call_with_retry
+from . import audio_preprocess
+
+# Whisper API 업로드 제한 (25MB)
+DEFAULT_MAX_UPLOAD_MB = 25
+# 이 크기까지는 메모리에, 넘으면 디스크로 넘김
+SPOOL_MEMORY_BYTES = 1024 * 1024
+READ_CHUNK_SIZE = 64 * 1024
+
+class AudioTooLargeError(ValueError):
+    """오디오 크기가 업로드 제한을 넘었을 때 발생"""
+
+def max_upload_bytes():
+    """환경변수 VCHAT_MAX_UPLOAD_MB에서 업로드 최대 크기(바이트) 반환"""
+    try:
+        megabytes = float(os.getenv('VCHAT_MAX_UPLOAD_MB', DEFAULT_MAX_UPLOAD_MB))
+    except ValueError:
+        megabytes = DEFAULT_MAX_UPLOAD_MB
+    return int(megabytes * 1024 * 1024)
+
+def _too_large(max_bytes):
+    return AudioTooLargeError(f"오디오 파일이 너무 큽니다 (최대 {max_bytes / (1024 * 1024):g}MB)")
+
+def _iter_limited(stream, max_bytes):
+    """스트림을 청크 단위로 읽으며 크기 제한 확인"""
+    total = 0
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if total > max_bytes:
+            raise _too_large(max_bytes)
+        yield chunk
+
+def read_audio_stream(stream, max_bytes=None):
+    """스트림을 크기 제한 안에서 바이트로 읽기 (전처리처럼 전체 데이터가 필요한 경우)"""
+    return b"".join(_iter_limited(stream, max_bytes if max_bytes is not None else max_upload_bytes()))
+
+def spool_stream(stream, max_bytes=None):
+    """
+    스트림을 크기 제한을 확인하며 SpooledTemporaryFile로 복사
+    
+    Args:
+        stream: read()를 지원하는 바이너리 스트림
+        max_bytes (int, optional): 최대 허용 크기 (기본값: VCHAT_MAX_UPLOAD_MB)
+        
+    Returns:
+        SpooledTemporaryFile: 처음 위치로 되감긴 버퍼
+        
+    Raises:
+        AudioTooLargeError: 제한을 넘은 경우 (그 시점까지만 읽음)
+    """
+    if max_bytes is None:
+        max_bytes = max_upload_bytes()
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES)
+    try:
+        for chunk in _iter_limited(stream, max_bytes):
+            spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+def _pyaudio():
+    """pyaudio 지연 import (마이크 녹음이 필요할 때만 로드, 서버에서는 불필요)"""
+    import pyaudio
+    return pyaudio
+
+def rms_volume(audio_chunk):
+    """16bit PCM 청크의 RMS 볼륨 계산"""
+    import numpy as np
+    
+    audio_data = np.frombuffer(audio_chunk, dtype=np.int16).astype(np.float32)
+    if audio_data.size == 0:
+        return 0.0
+    return float(np.sqrt(np.mean(audio_data ** 2)))
 
 class RealTimeSTT:
     """실시간 STT 서비스 클래스"""
     
-    def __init__(self, silence_threshold=2.0, sample_rate=44100, chunk_size=1024):
+    def __init__(self, silence_threshold=2.0, sample_rate=44100, chunk_size=1024, client=None):
         """
         STT 서비스 초기화
         
@@ -25,15 +103,15 @@ class RealTimeSTT:
             silence_threshold (float): 침묵 감지 임계값 (초)
             sample_rate (int): 샘플링 레이트
             chunk_size (int): 오디오 청크 크기
+            client (OpenAI, optional): OpenAI 클라이언트 (기본값: 프로세스 전역 공유 클라이언트)
         """
         # API 키 검증
         validate_api_keys()
         
-        self.client = OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+        self.client = client or get_openai_client()
         self.silence_threshold = silence_threshold
         self.sample_rate = sample_rate
         self.chunk_size = chunk_size
-        self.format = pyaudio.paInt16
         self.channels = 1
         
         # 녹음 상태 관리
@@ -43,20 +121,38 @@ class RealTimeSTT:
         self.last_sound_time = 0
         self.volume_threshold = 500
         
-        # PyAudio 초기화
-        self.audio = pyaudio.PyAudio()
-        
-        # tiktoken 인코더 (토큰 계산용)
-        try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except:
-            self.encoding = None
+        # PyAudio / tiktoken은 처음 쓸 때 초기화 (서버는 마이크와 토큰 계산이 필요 없음)
+        self._audio = None
+        self._encoding = None
+        self._encoding_loaded = False
+    
+    @property
+    def audio(self):
+        """PyAudio 인스턴스 (처음 접근할 때 생성)"""
+        if self._audio is None:
+            self._audio = _pyaudio().PyAudio()
+        return self._audio
+    
+    @property
+    def format(self):
+        """녹음 샘플 형식 (16bit)"""
+        return _pyaudio().paInt16
+    
+    @property
+    def encoding(self):
+        """tiktoken 인코더 (토큰 계산용, 처음 접근할 때 로드 / 실패하면 None)"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                import tiktoken
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except:
+                self._encoding = None
+        return self._encoding
     
     def is_silence(self, audio_chunk):
         """오디오 청크가 침묵인지 확인"""
-        audio_data = np.frombuffer(audio_chunk, dtype=np.int16)
-        volume = np.sqrt(np.mean(audio_data**2))
-        return volume < self.volume_threshold
+        return rms_volume(audio_chunk) < self.volume_threshold
     
     def save_audio_to_temp_file(self, audio_frames):
         """오디오 프레임을 임시 WAV 파일로 저장"""
@@ -71,17 +167,24 @@ class RealTimeSTT:
         
         return temp_filename
     
-    def transcribe_audio_file(self, audio_file_path, language="ko"):
-        """오디오 파일을 텍스트로 변환"""
+    def _transcribe(self, file, language):
+        """Whisper API 호출 (file은 파일 객체 또는 (파일명, 내용) 튜플)"""
+        # 재시도 전에 파일 위치를 처음으로 되돌림 (바이트 내용은 hedge 요청도 가능)
+        content = file[1] if isinstance(file, tuple) else file
+        position = content.tell() if hasattr(content, "seek") else None
+        rewind = (lambda: content.seek(position)) if position is not None else None
         try:
-            with open(audio_file_path, "rb") as audio_file:
-                transcript = self.client.audio.transcriptions.create(
+            with admit("stt"), track_stage("stt"):
+                transcript = call_with_retry("stt", lambda timeout: self.client.audio.transcriptions.create(
                     model="whisper-1",
-                    file=audio_file,
+                    file=file,
                     language=language,
-                    response_format="json"
-                )
+                    response_format="json",
+                    timeout=timeout
+                ), hedge=isinstance(content, bytes), rewind=rewind)
             return transcript.text
+        except OverloadedError:
+            raise
         except Exception as e:
             error_msg = str(e)
             if "429" in error_msg and "quota" in error_msg:
@@ -90,6 +193,14 @@ class RealTimeSTT:
                 return "❌ API 키가 유효하지 않습니다."
             else:
                 return f"❌ 변환 오류: {error_msg}"
+    
+    def transcribe_audio_file(self, audio_file_path, language="ko"):
+        """오디오 파일을 텍스트로 변환"""
+        try:
+            with open(audio_file_path, "rb") as audio_file:
+                return self._transcribe(audio_file, language)
+        except OSError as e:
+            return f"❌ 변환 오류: {str(e)}"
         finally:
             # 임시 파일 삭제
             try:
@@ -97,10 +208,92 @@ class RealTimeSTT:
             except:
                 pass
     
+    def transcribe_bytes(self, audio_data, filename="audio.wav", language="ko"):
+        """
+        메모리의 오디오 바이트를 임시 파일 없이 텍스트로 변환
+        
+        Args:
+            audio_data (bytes): 오디오 데이터
+            filename (str): Whisper가 형식을 판단할 파일명 (확장자가 중요)
+            language (str): 인식 언어
+            
+        Returns:
+            str: 변환된 텍스트 (오류 시 "❌"로 시작하는 메시지)
+            
+        Raises:
+            AudioTooLargeError: 업로드 제한을 넘은 경우
+        """
+        max_bytes = max_upload_bytes()
+        if len(audio_data) > max_bytes:
+            raise _too_large(max_bytes)
+        return self._transcribe((filename, audio_data), language)
+    
+    def transcribe_stream(self, stream, filename="audio.wav", language="ko", max_bytes=None):
+        """
+        바이너리 스트림을 텍스트로 변환
+        
+        되감을 수 있는 스트림(업로드 파일 등)은 크기만 확인하고 그대로 넘기고,
+        그 외 스트림은 크기 제한을 확인하며 메모리/디스크 버퍼로 받습니다.
+        
+        Args:
+            stream: 바이너리 스트림
+            filename (str): Whisper가 형식을 판단할 파일명 (확장자가 중요)
+            language (str): 인식 언어
+            max_bytes (int, optional): 최대 허용 크기 (기본값: VCHAT_MAX_UPLOAD_MB)
+            
+        Returns:
+            str: 변환된 텍스트 (오류 시 "❌"로 시작하는 메시지)
+            
+        Raises:
+            AudioTooLargeError: 제한을 넘은 경우
+        """
+        if max_bytes is None:
+            max_bytes = max_upload_bytes()
+        seekable = getattr(stream, "seekable", lambda: False)()
+        if seekable:
+            start = stream.tell()
+            size = stream.seek(0, io.SEEK_END) - start
+            stream.seek(start)
+            if size > max_bytes:
+                raise _too_large(max_bytes)
+            return self._transcribe((filename, stream), language)
+        
+        with spool_stream(stream, max_bytes) as spool:
+            return self._transcribe((filename, spool), language)
+    
+    def transcribe_pcm(self, pcm_data, sample_rate, channels=1, language="ko", preprocess=None):
+        """
+        16bit PCM 바이트를 텍스트로 변환
+        
+        Args:
+            pcm_data (bytes): 16bit little-endian PCM 데이터
+            sample_rate (int): 샘플링 레이트
+            channels (int): 채널 수
+            language (str): 인식 언어
+            preprocess (bool, optional): 16kHz 모노 변환 여부 (기본값: VCHAT_STT_PREPROCESS)
+            
+        Returns:
+            str: 변환된 텍스트 (오류 시 "❌"로 시작하는 메시지)
+        """
+        if preprocess is None:
+            preprocess = audio_preprocess.is_enabled()
+        if preprocess:
+            audio_data, filename, _ = audio_preprocess.prepare_pcm_for_whisper(pcm_data, sample_rate, channels)
+            return self.transcribe_bytes(audio_data, filename=filename, language=language)
+        
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(pcm_data)
+        
+        return self.transcribe_bytes(buffer.getvalue(), filename="speech.wav", language=language)
+    
     def audio_callback(self, in_data, frame_count, time_info, status):
         """실시간 오디오 콜백 함수"""
         if not self.is_recording:
-            return (in_data, pyaudio.paContinue)
+            return (in_data, _pyaudio().paContinue)
 
         current_time = time.time()
         
@@ -116,7 +309,7 @@ class RealTimeSTT:
             elif self.is_speaking:
                 self.audio_frames.append(in_data)
         
-        return (in_data, pyaudio.paContinue)
+        return (in_data, _pyaudio().paContinue)
     
     def record_and_transcribe(self):
         """
@@ -175,8 +368,7 @@ class RealTimeSTT:
         # STT 처리
         if len(self.audio_frames) > 0:
             print("🔄 음성을 텍스트로 변환 중...")
-            temp_file = self.save_audio_to_temp_file(self.audio_frames)
-            result = self.transcribe_audio_file(temp_file)
+            result = self.transcribe_pcm(b''.join(self.audio_frames), self.sample_rate, self.channels)
             
             # 토큰 정보 출력
             if self.encoding and result and not result.startswith("❌"):
@@ -195,7 +387,90 @@ class RealTimeSTT:
     def terminate(self):
         """자원 해제"""
         self.is_recording = False
+        if self._audio is None:
+            return
         try:
-            self.audio.terminate()
+            self._audio.terminate()
         except:
             pass
+
+
+class SpeechSegmenter:
+    """
+    스트리밍 PCM 프레임에서 발화 구간을 잘라내는 클래스
+    
+    RealTimeSTT.audio_callback과 같은 규칙(볼륨 임계값 + 침묵 지속 시간)을 쓰되,
+    벽시계 대신 받은 샘플 수로 시간을 계산하므로 네트워크 지연의 영향을 받지 않습니다.
+    """
+    
+    def __init__(self, sample_rate=16000, channels=1, silence_threshold=0.8, volume_threshold=500, max_duration=30.0):
+        """
+        Args:
+            sample_rate (int): 입력 PCM 샘플링 레이트
+            channels (int): 입력 채널 수
+            silence_threshold (float): 발화 종료로 볼 침묵 지속 시간 (초)
+            volume_threshold (float): 침묵으로 볼 RMS 볼륨 기준
+            max_duration (float): 한 발화의 최대 길이 (초, 넘으면 강제로 자름)
+        
+        Raises:
+            ValueError: sample_rate / channels가 양수가 아닌 경우
+        """
+        if sample_rate <= 0 or channels <= 0:
+            raise ValueError(f"잘못된 오디오 설정입니다 (sample_rate={sample_rate}, channels={channels})")
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.silence_threshold = silence_threshold
+        self.volume_threshold = volume_threshold
+        self.max_duration = max_duration
+        self.reset()
+    
+    def reset(self):
+        """상태 초기화"""
+        self.audio_frames = []
+        self.is_speaking = False
+        self.elapsed = 0.0
+        self.last_sound_time = 0.0
+        self.speech_start_time = 0.0
+        self._remainder = b""
+    
+    def feed(self, pcm_data):
+        """
+        PCM 프레임 추가
+        
+        Args:
+            pcm_data (bytes): 16bit little-endian PCM 데이터
+            
+        Returns:
+            bytes: 발화가 끝났으면 발화 구간 PCM, 아니면 None
+        """
+        data = self._remainder + pcm_data
+        frame_bytes = 2 * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        chunk, self._remainder = data[:usable], data[usable:]
+        if not chunk:
+            return None
+        
+        self.elapsed += len(chunk) / frame_bytes / self.sample_rate
+        
+        if rms_volume(chunk) >= self.volume_threshold:
+            if not self.is_speaking:
+                self.speech_start_time = self.elapsed
+            self.is_speaking = True
+            self.last_sound_time = self.elapsed
+            self.audio_frames.append(chunk)
+        elif self.is_speaking:
+            self.audio_frames.append(chunk)
+            if self.elapsed - self.last_sound_time > self.silence_threshold:
+                return self.flush()
+        
+        if self.is_speaking and self.elapsed - self.speech_start_time > self.max_duration:
+            return self.flush()
+        return None
+    
+    def flush(self):
+        """현재까지의 발화 구간을 반환하고 상태 초기화 (발화가 없으면 None)"""
+        utterance = b"".join(self.audio_frames) if self.is_speaking else None
+        elapsed = self.elapsed
+        self.reset()
+        self.elapsed = elapsed
+        return utterance
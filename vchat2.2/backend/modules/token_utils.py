@@ -0,0 +1,78 @@
+"""
+토큰 계산 모듈
+프롬프트 토큰 수 계산용 tiktoken 헬퍼 (처음 쓸 때 import, 사용할 수 없으면 근사치로 계산)
+"""
+
+import threading
+
+# 채팅 형식 메시지 하나당 추가되는 토큰 (역할 / 구분자)과 응답 시작 토큰
+TOKENS_PER_MESSAGE = 3
+TOKENS_PER_REPLY = 3
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def base_model(model):
+    """파인튜닝 모델 ID(ft:gpt-4o-mini-...:org::id)에서 기반 모델 이름 추출"""
+    if model and model.startswith("ft:"):
+        return model.split(":")[1]
+    return model or ""
+
+
+def get_encoding(model=None):
+    """
+    모델에 맞는 tiktoken 인코더 반환 (처음 한 번만 로드)
+
+    tiktoken이 없거나 인코딩 파일을 받을 수 없으면 None을 기억해 두고 다시 시도하지 않습니다.
+    """
+    name = base_model(model)
+    if name in _encodings:
+        return _encodings[name]
+
+    with _encodings_lock:
+        if name in _encodings:
+            return _encodings[name]
+        encoding = None
+        try:
+            import tiktoken
+
+            try:
+                encoding = tiktoken.encoding_for_model(name)
+            except Exception:
+                # 모르는 모델이거나 구버전 tiktoken에 없는 인코딩이면 cl100k_base 사용
+                encoding = tiktoken.get_encoding("cl100k_base")
+        except Exception as e:
+            print(f"⚠️ tiktoken 인코더를 사용할 수 없어 토큰 수를 근사치로 계산합니다: {type(e).__name__}")
+        _encodings[name] = encoding
+        return encoding
+
+
+def count_tokens(text, model=None):
+    """텍스트 토큰 수 (인코더가 없으면 UTF-8 3바이트당 1토큰으로 근사)"""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        return max(1, len(text.encode('utf-8')) // 3)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(messages, model=None, reply=True):
+    """
+    채팅 메시지 목록의 프롬프트 토큰 수
+
+    Args:
+        messages (list): {"role", "content"} 메시지 목록
+        model (str, optional): 모델 ID (인코더 선택용)
+        reply (bool): 응답 시작 토큰 포함 여부 (접두부만 셀 때는 False)
+
+    Returns:
+        int: 토큰 수
+    """
+    total = TOKENS_PER_REPLY if reply else 0
+    for message in messages:
+        total += TOKENS_PER_MESSAGE
+        total += count_tokens(message.get("content", ""), model)
+        total += count_tokens(message.get("role", ""), model)
+    return total
@@ -0,0 +1,293 @@
+"""
+요청 추적 모듈
+요청 하나 안의 단계(span) 시간을 모아 Server-Timing 헤더로 돌려주고,
+VCHAT_TRACE_FILE이 있으면 span을 JSONL로 기록 (별도 추적 서비스 없이 꼬리 지연 분석용)
+"""
+
+import contextvars
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+MAX_PENDING_TRACES = 10000  # 디스크가 느려 밀린 trace가 이보다 많으면 새 trace는 버림
+
+# 요청 단위 trace와 현재 부모 span (run_blocking / iterate_blocking 워커 스레드로도 전달됨)
+_current_trace = contextvars.ContextVar('vchat_trace', default=None)
+_current_span = contextvars.ContextVar('vchat_span', default=None)
+
+
+class Trace:
+    """요청 하나에서 끝난 span 목록을 모으는 클래스 (스레드 안전)"""
+
+    def __init__(self, name, trace_id=None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.name = name
+        self.started = time.perf_counter()
+        self.start_time = time.time()
+        self._spans = []
+        self._lock = threading.Lock()
+
+    def elapsed_ms(self, at=None):
+        """trace 시작 후 경과 시간 (ms)"""
+        return round(((at or time.perf_counter()) - self.started) * 1000, 3)
+
+    def add(self, record):
+        with self._lock:
+            self._spans.append(record)
+
+    def spans(self):
+        """지금까지 끝난 span 목록"""
+        with self._lock:
+            return list(self._spans)
+
+    def server_timing(self):
+        """
+        Server-Timing 헤더 값 생성 (같은 이름의 span은 합산, 병렬 span은 벽시계 시간보다 클 수 있음)
+
+        Returns:
+            str: 예) 'llm;dur=812.4, tts;dur=355.0;desc="x3", total;dur=1204.9'
+        """
+        totals = {}
+        for record in self.spans():
+            total = totals.setdefault(record["name"], [0.0, 0])
+            total[0] += record["duration_ms"]
+            total[1] += 1
+
+        parts = []
+        for name, (duration, count) in totals.items():
+            part = f"{name};dur={duration:.1f}"
+            if count > 1:
+                part += f';desc="x{count}"'
+            parts.append(part)
+        parts.append(f"total;dur={self.elapsed_ms():.1f}")
+        return ", ".join(parts)
+
+
+def current_trace():
+    """현재 컨텍스트의 trace 반환 (추적 중이 아니면 None)"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    with 블록을 현재 trace의 span으로 기록 (추적 중이 아니면 아무것도 하지 않음)
+
+    Args:
+        name (str): span 이름 (Server-Timing 항목 이름으로도 쓰이므로 공백 없이)
+        **attributes: JSONL에 함께 기록할 값
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    span_id = uuid.uuid4().hex[:16]
+    parent_id = _current_span.get()
+    token = _current_span.set(span_id)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except GeneratorExit:
+        raise
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        try:
+            _current_span.reset(token)
+        except ValueError:
+            # 생성기 안의 span이 다른 컨텍스트에서 닫힌 경우
+            pass
+        record = {
+            "span_id": span_id,
+            "parent_id": parent_id,
+            "name": name,
+            "start_ms": trace.elapsed_ms(started),
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "thread": threading.current_thread().name
+        }
+        if error:
+            record["error"] = error
+        if attributes:
+            record["attributes"] = attributes
+        trace.add(record)
+
+
+def record_span(name, seconds, **attributes):
+    """이미 측정한 구간(첫 토큰까지의 시간 등)을 지금 끝난 span으로 기록"""
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    ended = time.perf_counter()
+    record = {
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": _current_span.get(),
+        "name": name,
+        "start_ms": trace.elapsed_ms(ended - seconds),
+        "duration_ms": round(seconds * 1000, 3),
+        "thread": threading.current_thread().name
+    }
+    if attributes:
+        record["attributes"] = attributes
+    trace.add(record)
+
+
+class JsonlSpanExporter:
+    """
+    끝난 요청의 span을 한 줄에 하나씩 JSON으로 파일에 추가하는 클래스
+
+    이벤트 루프에서 파일을 쓰지 않도록 export는 큐에 넣기만 하고, 백그라운드 스레드가 모아서 기록합니다.
+    """
+
+    def __init__(self, path, max_pending=MAX_PENDING_TRACES):
+        self.path = path
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._thread = None
+        self._lock = threading.Lock()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        _exporters.append(self)
+
+    def export(self, trace, root):
+        """
+        요청 span(root)과 하위 span을 기록 대기열에 추가 (파일 쓰기는 백그라운드 스레드에서)
+
+        Args:
+            trace (Trace): 끝난 요청의 trace
+            root (dict): 요청 전체 span 정보 (method, path, status 등)
+        """
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait((trace, root))
+        except queue.Full:
+            self.dropped += 1
+
+    @staticmethod
+    def _lines(trace, root):
+        lines = []
+        for record in [root] + trace.spans():
+            record = dict(record, trace_id=trace.trace_id)
+            record["start_time"] = round(trace.start_time + record["start_ms"] / 1000, 6)
+            lines.append(json.dumps(record, ensure_ascii=False))
+        return lines
+
+    def _ensure_writer(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="vchat-trace-writer", daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            batch = [item]
+            # 밀린 trace는 파일을 한 번만 열어 함께 기록
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in batch
+            self._write([entry for entry in batch if entry is not None])
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write(self, batch):
+        if not batch:
+            return
+        lines = []
+        for trace, root in batch:
+            lines.extend(self._lines(trace, root))
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"⚠️ trace 기록 오류: {str(e)}")
+
+    def flush(self):
+        """대기 중인 trace를 모두 기록할 때까지 대기 (테스트 / 종료용)"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def close(self):
+        """남은 trace를 기록하고 백그라운드 스레드 종료"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout=5)
+        if self.dropped:
+            print(f"⚠️ trace 대기열이 가득 차 {self.dropped}개 요청의 span을 기록하지 못했습니다")
+
+
+_exporters = []
+
+
+def close_exporters():
+    """앱 종료 시 모든 span 기록기의 남은 trace를 기록"""
+    for exporter in list(_exporters):
+        exporter.close()
+
+
+class TracingMiddleware:
+    """
+    HTTP 요청마다 trace를 시작하는 ASGI 미들웨어
+
+    응답 헤더에 Server-Timing(응답 시작 시점까지 끝난 span)과 X-Trace-Id를 붙이고,
+    trace_file(기본값: VCHAT_TRACE_FILE)이 있으면 요청이 끝난 뒤 전체 span을 JSONL로 기록합니다.
+    """
+
+    def __init__(self, app, trace_file=None):
+        self.app = app
+        trace_file = trace_file or os.getenv('VCHAT_TRACE_FILE')
+        self.exporter = JsonlSpanExporter(trace_file) if trace_file else None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(f"{scope.get('method', '')} {scope.get('path', '')}")
+        token = _current_trace.set(trace)
+        status = None
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", trace.server_timing().encode('latin-1')))
+                headers.append((b"x-trace-id", trace.trace_id.encode('latin-1')))
+                message = dict(message, headers=headers)
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_timing)
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            _current_trace.reset(token)
+            if self.exporter:
+                root = {
+                    "span_id": trace.trace_id[:16],
+                    "parent_id": None,
+                    "name": "http",
+                    "start_ms": 0.0,
+                    "duration_ms": trace.elapsed_ms(),
+                    "attributes": {"method": scope.get("method"), "path": scope.get("path"), "status": status}
+                }
+                if error:
+                    root["error"] = error
+                self.exporter.export(trace, root)
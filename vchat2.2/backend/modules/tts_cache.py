@@ -0,0 +1,229 @@
+"""
+TTS 오디오 캐시 모듈
+(voice_id, model_id, voice_settings, text) 해시를 키로 합성 결과를 메모리/디스크에 보관
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+DEFAULT_MEMORY_MB = 32
+DEFAULT_DISK_MB = 512
+
+
+def _env_megabytes(name, default):
+    """환경변수의 MB 값을 바이트로 변환"""
+    try:
+        value = float(os.getenv(name, default))
+    except ValueError:
+        value = default
+    return max(0, int(value * 1024 * 1024))
+
+
+class TTSCache:
+    """바이트 예산 기반 LRU 메모리 + 디스크 TTS 캐시 클래스"""
+
+    def __init__(self, cache_dir=None, memory_budget=None, disk_budget=None):
+        """
+        TTS 캐시 초기화
+
+        Args:
+            cache_dir (str, optional): 디스크 캐시 디렉토리
+            memory_budget (int, optional): 메모리 캐시 최대 바이트
+            disk_budget (int, optional): 디스크 캐시 최대 바이트
+        """
+        self.cache_dir = cache_dir or os.getenv(
+            'VCHAT_TTS_CACHE_DIR',
+            os.path.join(tempfile.gettempdir(), 'vchat_tts_cache')
+        )
+        self.memory_budget = memory_budget if memory_budget is not None else _env_megabytes('VCHAT_TTS_CACHE_MEMORY_MB', DEFAULT_MEMORY_MB)
+        self.disk_budget = disk_budget if disk_budget is not None else _env_megabytes('VCHAT_TTS_CACHE_DISK_MB', DEFAULT_DISK_MB)
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> bytes
+        self._memory_bytes = 0
+        self._disk = OrderedDict()    # key -> size (오래 안 쓴 순서)
+        self._disk_bytes = 0
+
+        self.hits = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._load_disk_index()
+
+    @staticmethod
+    def make_key(voice_id, model_id, voice_settings, text):
+        """캐시 키 생성 (설정이 하나라도 다르면 다른 키)"""
+        payload = json.dumps(
+            [voice_id, model_id, voice_settings or {}, text],
+            ensure_ascii=False,
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _load_disk_index(self):
+        """기존 디스크 캐시 파일을 마지막 사용 시각 순으로 인덱싱"""
+        if self.disk_budget <= 0:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith('.mp3'):
+                    continue
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, name[:-4], stat.st_size))
+            for _, key, size in sorted(entries):
+                self._disk[key] = size
+                self._disk_bytes += size
+            self._evict_disk()
+        except Exception as e:
+            print(f"⚠️ TTS 캐시 디렉토리 초기화 오류: {str(e)}")
+            self.disk_budget = 0
+
+    def get(self, key):
+        """
+        캐시 조회
+
+        Args:
+            key (str): make_key로 만든 키
+
+        Returns:
+            bytes: 캐시된 오디오 또는 None
+        """
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                self.memory_hits += 1
+                return data
+
+            if key not in self._disk:
+                self.misses += 1
+                return None
+            self._disk.move_to_end(key)
+
+        try:
+            path = self._path(key)
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)
+        except OSError:
+            with self._lock:
+                self._forget_disk(key)
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+            self.disk_hits += 1
+            self._put_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        """
+        캐시 저장
+
+        Args:
+            key (str): make_key로 만든 키
+            data (bytes): 완성된 오디오 바이트
+        """
+        if not data:
+            return
+
+        with self._lock:
+            self._put_memory(key, data)
+            store_on_disk = 0 < len(data) <= self.disk_budget and key not in self._disk
+
+        if not store_on_disk:
+            return
+
+        try:
+            path = self._path(key)
+            partial = f"{path}.{threading.get_ident()}.part"
+            with open(partial, 'wb') as f:
+                f.write(data)
+            os.replace(partial, path)
+        except OSError as e:
+            print(f"⚠️ TTS 캐시 파일 저장 오류: {str(e)}")
+            return
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_bytes += len(data)
+            self._evict_disk()
+
+    def _put_memory(self, key, data):
+        """메모리 캐시에 저장 후 예산 초과분 제거 (lock 보유 상태에서 호출)"""
+        if len(data) > self.memory_budget:
+            return
+        previous = self._memory.pop(key, None)
+        if previous is not None:
+            self._memory_bytes -= len(previous)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_budget:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.evictions += 1
+
+    def _evict_disk(self):
+        """디스크 캐시 예산 초과분을 오래된 것부터 삭제 (lock 보유 상태에서 호출)"""
+        while self._disk_bytes > self.disk_budget and self._disk:
+            key = next(iter(self._disk))
+            self._forget_disk(key)
+            self.evictions += 1
+            try:
+                os.unlink(self._path(key))
+            except OSError:
+                pass
+
+    def _forget_disk(self, key):
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_bytes -= size
+
+    def stats(self):
+        """캐시 통계 반환"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "memory_budget": self.memory_budget,
+                "disk_entries": len(self._disk),
+                "disk_bytes": self._disk_bytes,
+                "disk_budget": self.disk_budget
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_tts_cache():
+    """프로세스 전역 TTS 캐시 반환 (VCHAT_TTS_CACHE=0이면 None)"""
+    global _cache
+    if os.getenv('VCHAT_TTS_CACHE', '1').lower() in ('0', 'false', 'no', 'off'):
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = TTSCache()
+    return _cache
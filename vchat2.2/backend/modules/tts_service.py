@@ -3,28 +3,27 @@ TTS (Text-to-Speech) 서비스 모듈
 ElevenLabs API를 사용한 음성 변환
 """
 
-import os
-try:
-    # 최신 버전 시도
-    from elevenlabs.client import ElevenLabs
-    print("✅ ElevenLabs client import 성공")
-except ImportError:
-    # 구 버전 시도
-    from elevenlabs import ElevenLabs
-    print("✅ ElevenLabs import 성공")
-from elevenlabs import play, VoiceSettings
+import math
+
 from .audio_utils import validate_api_keys
+from .clients import get_elevenlabs_client
+from .tts_cache import TTSCache, get_tts_cache
+from .metrics import track_stage, track_iter, record_stage_error
+from .admission import admit_iter, OverloadedError
+from .resilience import call_with_retry
 
 class VoiceConverter:
     """음성 변환 서비스 클래스"""
     
-    def __init__(self, persona_manager=None, model_id="eleven_multilingual_v2"):
+    def __init__(self, persona_manager=None, model_id="eleven_multilingual_v2", cache=None, client=None):
         """
         TTS 서비스 초기화
         
         Args:
             persona_manager: PersonaManager 인스턴스
             model_id (str): 사용할 모델 ID
+            cache (TTSCache, optional): 오디오 캐시 (기본값: 프로세스 전역 캐시)
+            client (ElevenLabs, optional): ElevenLabs 클라이언트 (기본값: 프로세스 전역 공유 클라이언트)
         """
         # API 키 검증
         validate_api_keys()
@@ -38,17 +37,21 @@ class VoiceConverter:
         else:
             self.voice_id = "HAIQu18Se8Zljrot4frx"  # 기본값
         
-        # ElevenLabs 클라이언트 초기화
-        api_key = os.getenv('ELEVENLABS_API_KEY')
-        self.client = ElevenLabs(api_key=api_key)
+        # ElevenLabs 클라이언트 (프로세스 전역 공유, keep-alive 연결 재사용)
+        self.client = client or get_elevenlabs_client()
+        
+        # 음성 설정 (elevenlabs SDK는 서비스를 처음 만들 때 import)
+        from elevenlabs import VoiceSettings
         
-        # 음성 설정
         self.voice_settings = VoiceSettings(
             stability=0.75,
             similarity_boost=0.75,
             style=0.1,
             use_speaker_boost=True
         )
+        
+        # 동일한 문장은 다시 합성하지 않도록 캐시 사용
+        self.cache = cache if cache is not None else get_tts_cache()
     
     def update_persona(self, persona_manager):
         """페르소나 업데이트"""
@@ -64,25 +67,43 @@ class VoiceConverter:
             text (str): 변환할 텍스트
             
         Returns:
-            audio_generator: 오디오 생성기 또는 None
+            audio_generator: 오디오 생성기 (첫 청크는 이미 받은 상태) 또는 None (변환 실패)
+        
+        Raises:
+            OverloadedError: TTS 입장 제어에 걸렸거나 업스트림이 429를 돌려준 경우
         """
+        requested = False
         try:
             if not text or not text.strip():
                 print("❌ 변환할 텍스트가 없습니다.")
                 return None
             
+            cached = self._cached_audio(text)
+            if cached is not None:
+                return cached
+            
             print(f"🎵 텍스트 변환 중: '{text[:50]}{'...' if len(text) > 50 else ''}'")
             
-            audio = self.client.text_to_speech.convert(
-                text=text,
-                voice_id=self.voice_id,
-                model_id=self.model_id,
-                voice_settings=self.voice_settings
-            )
+            audio = self._request_audio(self.client.text_to_speech.convert, text)
             
-            return audio
+            # SDK는 청크를 받는 동안 요청을 진행하므로 마지막 청크까지를 tts 단계로 기록
+            # (입장 제어도 첫 청크를 요청할 때 자리를 잡고 마지막 청크까지 유지)
+            audio = self._cache_audio(text, admit_iter("tts", track_iter("tts", audio, "tts_first_chunk")))
             
+            # 실제 요청은 첫 청크를 받을 때 일어나므로, 업스트림 오류를 여기서 처리하도록 첫 청크는 바로 받음
+            requested = True
+            first = next(audio, None)
+            if first is None:
+                print("❌ 음성 변환 결과가 비어 있습니다.")
+                return None
+            return prepend_chunk(first, audio)
+            
+        except OverloadedError:
+            raise
         except Exception as e:
+            # 요청 중 오류는 track_iter가 이미 tts 단계 오류로 기록
+            if not requested:
+                record_stage_error("tts", type(e).__name__)
             error_msg = str(e)
             if "401" in error_msg:
                 print("❌ ElevenLabs API 키가 유효하지 않습니다.")
@@ -94,6 +115,83 @@ class VoiceConverter:
                 print(f"❌ 음성 변환 오류: {error_msg}")
             return None
     
+    def stream_text_to_speech(self, text):
+        """
+        텍스트를 음성으로 변환하며 청크를 바로 스트리밍
+        
+        Args:
+            text (str): 변환할 텍스트
+            
+        Returns:
+            audio_generator: 도착하는 대로 MP3 청크를 내보내는 생성기 또는 None
+        """
+        if not text or not text.strip():
+            print("❌ 변환할 텍스트가 없습니다.")
+            return None
+        
+        cached = self._cached_audio(text)
+        if cached is not None:
+            return cached
+        
+        print(f"🎵 텍스트 스트리밍 변환 중: '{text[:50]}{'...' if len(text) > 50 else ''}'")
+        
+        # 스트리밍 엔드포인트가 없는 구버전 SDK는 일반 변환으로 대체
+        stream = getattr(self.client.text_to_speech, "stream", None) or self.client.text_to_speech.convert
+        audio = self._request_audio(stream, text)
+        return self._cache_audio(text, admit_iter("tts", track_iter("tts", audio, "tts_first_chunk")))
+    
+    def _request_audio(self, method, text):
+        """
+        ElevenLabs 요청을 첫 청크를 받을 때까지 재시도하고 이후 청크는 그대로 전달하는 생성기
+        
+        SDK는 첫 청크를 요청할 때 실제로 호출하므로, 429 / 5xx / 타임아웃은 오디오를 내보내기 전에만 재시도합니다.
+        """
+        def attempt(timeout):
+            audio = method(
+                text=text,
+                voice_id=self.voice_id,
+                model_id=self.model_id,
+                voice_settings=self.voice_settings,
+                request_options={"timeout_in_seconds": max(1, math.ceil(timeout)), "max_retries": 0}
+            )
+            chunks = iter(audio)
+            return next(chunks, None), chunks
+        
+        first, chunks = call_with_retry("tts", attempt)
+        if first is not None:
+            yield first
+        yield from chunks
+    
+    def cache_key(self, text):
+        """현재 음성 설정과 텍스트로 캐시 키 생성"""
+        return TTSCache.make_key(self.voice_id, self.model_id, self._voice_settings_dict(), text)
+    
+    def _cached_audio(self, text):
+        """캐시에 있으면 오디오 청크 이터레이터 반환, 없으면 None"""
+        if not self.cache:
+            return None
+        data = self.cache.get(self.cache_key(text))
+        if data is None:
+            return None
+        print(f"⚡ 캐시된 음성 사용: '{text[:50]}{'...' if len(text) > 50 else ''}'")
+        return iter([data])
+    
+    def _cache_audio(self, text, audio):
+        """오디오가 끝까지 소비되면 캐시에 저장되도록 감싸기"""
+        if not self.cache or audio is None:
+            return audio
+        key = self.cache_key(text)
+        return tee_audio(audio, lambda data: self.cache.put(key, data))
+    
+    def _voice_settings_dict(self):
+        """음성 설정을 딕셔너리로 반환"""
+        return {
+            "stability": self.voice_settings.stability,
+            "similarity_boost": self.voice_settings.similarity_boost,
+            "style": self.voice_settings.style,
+            "use_speaker_boost": self.voice_settings.use_speaker_boost
+        }
+    
     def play_audio(self, audio):
         """
         오디오 재생
@@ -108,6 +206,8 @@ class VoiceConverter:
             if audio is None:
                 return False
             
+            from elevenlabs import play
+            
             print("🔊 음성을 재생합니다...")
             play(audio)
             return True
@@ -131,7 +231,7 @@ class VoiceConverter:
             if audio is None:
                 return False
             
-            with open(filename, 'wb') as f:
+            with track_stage("audio_save"), open(filename, 'wb') as f:
                 for chunk in audio:
                     f.write(chunk)
             
@@ -212,10 +312,40 @@ class VoiceConverter:
         return {
             "voice_id": self.voice_id,
             "model_id": self.model_id,
-            "settings": {
-                "stability": self.voice_settings.stability,
-                "similarity_boost": self.voice_settings.similarity_boost,
-                "style": self.voice_settings.style,
-                "use_speaker_boost": self.voice_settings.use_speaker_boost
-            }
+            "settings": self._voice_settings_dict()
         }
+
+
+def prepend_chunk(first, chunks):
+    """
+    미리 받은 첫 청크를 앞에 다시 붙여 내보내는 생성기
+    
+    중간에 닫히면 남은 청크 생성기도 바로 닫아 입장 제어 자리 / 업스트림 연결을 반납합니다.
+    """
+    try:
+        yield first
+        yield from chunks
+    finally:
+        chunks.close()
+
+
+def tee_audio(audio, on_complete):
+    """
+    오디오 청크를 그대로 내보내면서 복사본을 모아 두었다가 끝까지 전달되면 콜백 호출
+    
+    Args:
+        audio: 오디오 청크 이터러블
+        on_complete: 전체 오디오 바이트를 받는 콜백 (중간에 끊기면 호출되지 않음)
+        
+    Yields:
+        bytes: 오디오 청크
+    """
+    parts = []
+    for chunk in audio:
+        parts.append(chunk)
+        yield chunk
+    
+    try:
+        on_complete(b"".join(parts))
+    except Exception as e:
+        print(f"❌ 오디오 저장 콜백 오류: {str(e)}")
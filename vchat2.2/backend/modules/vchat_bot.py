@@ -1,12 +1,29 @@
-import openai
 import os
+import time
+from contextlib import closing
+from typing import Iterator
 from dotenv import load_dotenv
+from .clients import get_openai_client
+from .async_utils import read_ahead
+from .metrics import track_stage, observe_stage
+from .tracing import span
+from .admission import admit, OverloadedError
+from .resilience import call_with_retry
+from .prompt_cache import get_prompt_cache, record_usage
+from .conversation_memory import get_conversation_memory
+from .response_cache import get_response_cache
 
 load_dotenv()
 
+FALLBACK_RESPONSE = "아 미안, 지금 잠깐 말이 안 나오네 ㅋㅋ 다시 말해줘!"
+
+# 같은 접두부 요청을 같은 캐시 서버로 보내도록 prompt_cache_key 전달 (호환 API가 거부하면 0으로 끔)
+SEND_PROMPT_CACHE_KEY = os.getenv('VCHAT_PROMPT_CACHE_KEY', '1') != '0'
+
 class VChatBot:
-    def __init__(self, persona_manager=None):
-        self.client = openai.OpenAI(api_key=os.getenv('OPENAI_API_KEY'))
+    def __init__(self, persona_manager=None, client=None):
+        # 프로세스 전역 클라이언트를 공유해 warm 연결 재사용
+        self.client = client or get_openai_client()
         self.persona_manager = persona_manager
         self.model_id = self.get_model_id()
         
@@ -36,52 +53,165 @@ class VChatBot:
         self.persona_manager = persona_manager
         self.model_id = self.get_model_id()
     
-    def build_few_shot_messages(self, user_input: str):
-        """Few-shot learning을 위한 메시지 구성"""
+    def get_prompt_prefix(self):
+        """페르소나 버전별로 캐시된 고정 프롬프트 접두부 (페르소나가 없으면 None)"""
         if not self.persona_manager:
-            return [{"role": "user", "content": user_input}]
-        
-        system_prompt = self.persona_manager.generate_system_prompt()
-        few_shot_examples = self.persona_manager.get_few_shot_examples()
-        
-        system_prompt += """
-
-다음은 당신의 말투를 보여주는 완벽한 예시들입니다. 이 예시들의 말투와 톤을 정확히 따라해주세요:
-
-특히 주목할 점:
-- 자연스럽고 즉흥적인 반응
-- 친근하고 편안한 말투
-- 감정이 풍부하게 드러나는 표현
-- 상황에 맞는 적절한 리액션
-- 반말 사용과 애교 있는 톤
-
-위 예시들처럼 자연스럽고 일관된 말투로 대답해주세요."""
-
-        messages = [{"role": "system", "content": system_prompt}]
-        
-        # Few-shot 예제들 추가
-        for example in few_shot_examples:
-            messages.append({"role": "user", "content": example["user"]})
-            messages.append({"role": "assistant", "content": example["assistant"]})
+            return None
+        return get_prompt_cache().get(self.persona_manager, self.model_id)
+    
+    def build_few_shot_messages(self, user_input: str, session_id=None):
+        """
+        Few-shot learning을 위한 메시지 구성
         
-        # 실제 사용자 입력
-        messages.append({"role": "user", "content": user_input})
+        항상 [고정 접두부] + [검색한 예시] + [대화 기록] + [사용자 입력] 순서로 만들어 업스트림 프롬프트 캐시가 접두부를 재사용하게 합니다.
+        session_id가 있으면 해당 세션의 대화 기록(토큰 예산 이내)을 접두부 뒤에 넣습니다.
+        """
+        with span("llm_prompt"):
+            history = get_conversation_memory().load_messages(session_id, self._persona_name())
+            prefix = self.get_prompt_prefix()
+            if prefix is None:
+                return history + [{"role": "user", "content": user_input}]
+            # 예시가 많은 페르소나는 입력과 가까운 예시만 접두부 바로 뒤에 붙임
+            examples = prefix.example_messages(user_input)
+            return prefix.messages + examples + history + [{"role": "user", "content": user_input}]
+    
+    def remember(self, session_id, user_input, response):
+        """응답이 끝난 턴을 세션 대화 기록에 추가 (대체 응답은 기록하지 않음)"""
+        if not session_id or not response or response == FALLBACK_RESPONSE:
+            return
+        try:
+            get_conversation_memory().append(session_id, self._persona_name(), user_input, response, self.model_id)
+        except Exception as e:
+            # 기록 실패로 이미 만든 응답을 버리지 않음
+            print(f"⚠️ 대화 기록 저장 실패: {str(e)}")
+    
+    def _extra_body(self, stream=False):
+        """프롬프트 캐시 라우팅 키 / 스트리밍 usage 요청 (openai 1.3.x에는 전용 인자가 없어 extra_body로 전달)"""
+        body = {}
+        prefix = self.get_prompt_prefix()
+        if prefix is not None and SEND_PROMPT_CACHE_KEY:
+            body["prompt_cache_key"] = prefix.cache_key
+        if stream:
+            # 마지막 청크에 usage(cached_tokens 포함)를 받음
+            body["stream_options"] = {"include_usage": True}
+        return body or None
+    
+    def _response_cache_key(self, session_id=None):
+        """
+        응답 캐시를 쓸 수 있으면 (페르소나 이름, 버전) 반환 (꺼져 있거나 이어갈 대화 기록이 있으면 None)
         
-        return messages
+        대화 중인 세션의 짧은 입력("응", "왜?")은 앞 맥락에 따라 답이 달라지므로 캐시하지 않습니다.
+        """
+        if get_response_cache() is None or not self.persona_manager:
+            return None
+        if session_id and get_conversation_memory().has_history(session_id, self._persona_name()):
+            return None
+        prefix = self.get_prompt_prefix()
+        return (prefix.name, prefix.version)
+    
+    def _persona_name(self):
+        persona = self.persona_manager.get_current_persona() if self.persona_manager else None
+        return persona.get('name') if persona else None
     
-    def get_response(self, user_input: str) -> str:
-        """Few-shot learning을 활용한 응답 생성"""
+    def get_response(self, user_input: str, session_id=None) -> str:
+        """Few-shot learning을 활용한 응답 생성 (session_id가 있으면 대화 기록을 이어감)"""
         try:
-            messages = self.build_few_shot_messages(user_input)
+            # 자주 오는 인사 / 잡담은 비슷한 입력의 이전 응답으로 바로 답함
+            cache_key = self._response_cache_key(session_id)
+            if cache_key:
+                cached = get_response_cache().lookup(cache_key, user_input)
+                if cached:
+                    self.remember(session_id, user_input, cached)
+                    return cached
+            
+            messages = self.build_few_shot_messages(user_input, session_id)
+            extra_body = self._extra_body()
+            
+            with admit("llm"), track_stage("llm"):
+                # 일시적 오류는 마감 시간 안에서 재시도, 느린 호출에는 hedge 요청
+                response = call_with_retry("llm", lambda timeout: self.client.chat.completions.create(
+                    model=self.model_id,
+                    messages=messages,
+                    temperature=0.8,
+                    max_tokens=250,
+                    extra_body=extra_body,
+                    timeout=timeout
+                ), hedge=True)
+            
+            record_usage(self._persona_name(), getattr(response, "usage", None))
+            text = response.choices[0].message.content.strip()
+            if cache_key:
+                get_response_cache().store(cache_key, user_input, text)
+            self.remember(session_id, user_input, text)
+            return text
             
-            response = self.client.chat.completions.create(
+        except OverloadedError:
+            # 과부하는 대체 응답 대신 503으로 알림
+            raise
+        except Exception:
+            return FALLBACK_RESPONSE
+    
+    def _stream_chunks(self, messages, extra_body):
+        """LLM 스트리밍 호출의 청크 (입장 제어 자리는 업스트림 스트림이 끝나거나 닫힐 때 반납)"""
+        with admit("llm"), track_stage("llm_stream"):
+            # 응답 헤더를 받기 전 오류(429 / 5xx / 연결)만 재시도 (델타를 보낸 뒤에는 재시도하지 않음)
+            stream = call_with_retry("llm", lambda timeout: self.client.chat.completions.create(
                 model=self.model_id,
                 messages=messages,
                 temperature=0.8,
-                max_tokens=250
-            )
+                max_tokens=250,
+                stream=True,
+                extra_body=extra_body,
+                timeout=timeout
+            ))
+            yield from stream
+    
+    def stream_response(self, user_input: str, session_id=None) -> Iterator[str]:
+        """응답을 토큰 단위로 스트리밍 (stream=True 델타를 순서대로 반환, 끝까지 받으면 대화 기록에 추가)"""
+        started = False
+        parts = []
+        try:
+            cache_key = self._response_cache_key(session_id)
+            if cache_key:
+                cached = get_response_cache().lookup(cache_key, user_input)
+                if cached:
+                    started = True
+                    yield cached
+                    self.remember(session_id, user_input, cached)
+                    return
+            
+            messages = self.build_few_shot_messages(user_input, session_id)
+            extra_body = self._extra_body(stream=True)
             
-            return response.choices[0].message.content.strip()
+            requested = time.perf_counter()
+            # 업스트림 스트림은 별도 스레드에서 끝까지 읽어, 입장 제어 자리를 소비 속도와 무관하게 반납
+            with closing(read_ahead(self._stream_chunks(messages, extra_body))) as chunks:
+                for chunk in chunks:
+                    usage = getattr(chunk, "usage", None)
+                    if usage:
+                        record_usage(self._persona_name(), usage)
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta.content
+                    if not delta:
+                        continue
+                    # get_response와 동일하게 앞쪽 공백 제거
+                    if not started:
+                        delta = delta.lstrip()
+                        if not delta:
+                            continue
+                        started = True
+                        observe_stage("llm_first_token", time.perf_counter() - requested)
+                    parts.append(delta)
+                    yield delta
             
+            text = "".join(parts).strip()
+            if cache_key and text:
+                get_response_cache().store(cache_key, user_input, text)
+            self.remember(session_id, user_input, text)
+                
+        except OverloadedError:
+            raise
         except Exception:
-            return "아 미안, 지금 잠깐 말이 안 나오네 ㅋㅋ 다시 말해줘!"
+            if not started:
+                yield FALLBACK_RESPONSE
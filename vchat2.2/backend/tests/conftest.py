@@ -0,0 +1,21 @@
+"""
+테스트 공통 설정
+backend 디렉토리를 import 경로에 넣고, 세션 DB / 오디오 / TTS 캐시가 테스트용 임시 디렉토리를 쓰도록 설정
+"""
+
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+# main 등 모듈 전역 객체가 import 시점에 경로를 읽으므로 import 전에 설정
+_TEST_DIR = tempfile.mkdtemp(prefix="vchat-tests-")
+os.environ.setdefault('VCHAT_SESSION_DB', os.path.join(_TEST_DIR, 'sessions.db'))
+os.environ.setdefault('VCHAT_AUDIO_DIR', os.path.join(_TEST_DIR, 'audio'))
+os.environ.setdefault('VCHAT_TTS_CACHE_DIR', os.path.join(_TEST_DIR, 'tts_cache'))
+# 서비스 클래스가 만들 때 키 존재만 확인하므로 테스트용 값 (실제 호출은 가짜 클라이언트로)
+os.environ.setdefault('OPENAI_API_KEY', 'sk-test')
+os.environ.setdefault('ELEVENLABS_API_KEY', 'el-test')
@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+
+from modules.admission import OverloadedError, UpstreamLimiter, admit, admit_iter, get_limiter
+
+
+def test_rejects_immediately_when_queue_is_full():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_queue=0)
+    entered = limiter.acquire()
+    with pytest.raises(OverloadedError) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+    limiter.release(entered)
+    limiter.release(limiter.acquire())
+
+
+def test_queued_call_enters_when_slot_is_released():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_queue=1, max_wait=5)
+    entered = limiter.acquire()
+    admitted = threading.Event()
+
+    def waiter():
+        limiter.release(limiter.acquire())
+        admitted.set()
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    while limiter.stats()["queued"] == 0:
+        time.sleep(0.005)
+    assert not admitted.is_set()
+    limiter.release(entered)
+    assert admitted.wait(5)
+    thread.join()
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_queued_call_times_out():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_queue=1, max_wait=0.05)
+    entered = limiter.acquire()
+    with pytest.raises(OverloadedError) as rejected:
+        limiter.acquire()
+    assert rejected.value.reason == "timeout"
+    assert limiter.stats()["queued"] == 0
+    limiter.release(entered)
+
+
+def test_rate_limit_spaces_calls():
+    limiter = UpstreamLimiter("test", rate=20.0, burst=1, max_queue=5, max_wait=1)
+    started = time.monotonic()
+    limiter.release(limiter.acquire())
+    limiter.release(limiter.acquire())
+    assert time.monotonic() - started >= 0.04
+
+
+def test_rate_wait_longer_than_max_wait_is_rejected_without_queueing():
+    limiter = UpstreamLimiter("test", rate=0.1, burst=1, max_queue=5, max_wait=1)
+    limiter.release(limiter.acquire())
+    started = time.monotonic()
+    with pytest.raises(OverloadedError) as rejected:
+        limiter.acquire()
+    assert time.monotonic() - started < 0.5
+    assert rejected.value.retry_after >= 9
+
+
+def test_try_acquire_never_waits():
+    limiter = UpstreamLimiter("test", max_concurrency=1, max_queue=5)
+    entered = limiter.try_acquire()
+    assert entered is not None
+    assert limiter.try_acquire() is None
+    limiter.release(entered)
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_pause_blocks_new_calls():
+    limiter = UpstreamLimiter("test", max_queue=0)
+    limiter.pause(30)
+    with pytest.raises(OverloadedError) as rejected:
+        limiter.ensure_capacity()
+    assert rejected.value.retry_after >= 29
+
+
+class RateLimited(Exception):
+    status_code = 429
+    headers = {"retry-after": "3"}
+
+
+def test_admit_turns_upstream_429_into_overloaded():
+    with pytest.raises(OverloadedError) as rejected:
+        with admit("test-429"):
+            raise RateLimited()
+    assert rejected.value.reason == "upstream_429"
+    assert rejected.value.retry_after == 3
+    assert isinstance(rejected.value.__cause__, RateLimited)
+    assert get_limiter("test-429").stats()["in_flight"] == 0
+    with pytest.raises(OverloadedError):
+        get_limiter("test-429").ensure_capacity()
+
+
+def test_admit_iter_holds_slot_until_stream_ends():
+    limiter = get_limiter("test-stream")
+    stream = admit_iter("test-stream", iter([b"a", b"b"]))
+    assert limiter.stats()["in_flight"] == 0  # 첫 항목을 요청할 때 입장
+    assert next(stream) == b"a"
+    assert limiter.stats()["in_flight"] == 1
+    assert list(stream) == [b"b"]
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,116 @@
+import asyncio
+import contextvars
+import threading
+
+import pytest
+
+from modules.async_utils import iterate_blocking, run_blocking
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class Source:
+    """몇 개를 꺼냈는지와 close 여부를 기록하는 동기 이터레이터"""
+
+    def __init__(self, count, fail_at=None):
+        self.count = count
+        self.fail_at = fail_at
+        self.pulled = 0
+        self.closed = threading.Event()
+        self.threads = set()
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        self.threads.add(threading.get_ident())
+        if self.pulled == self.fail_at:
+            raise ValueError("upstream broke")
+        if self.pulled >= self.count:
+            raise StopIteration
+        self.pulled += 1
+        return self.pulled
+
+    def close(self):
+        self.closed.set()
+
+
+async def collect(agen, limit=None):
+    items = []
+    async for item in agen:
+        items.append(item)
+        if limit is not None and len(items) >= limit:
+            break
+    return items
+
+
+def test_yields_all_items_in_order_off_the_loop_thread():
+    source = Source(100)
+
+    async def main():
+        return await collect(iterate_blocking(source, max_buffer=4)), threading.get_ident()
+
+    items, loop_thread = asyncio.run(main())
+    assert items == list(range(1, 101))
+    assert loop_thread not in source.threads
+    assert not source.closed.is_set()
+
+
+def test_early_close_stops_and_closes_the_iterator():
+    source = Source(10 ** 6)
+
+    async def main():
+        agen = iterate_blocking(source, max_buffer=2)
+        items = await collect(agen, limit=3)
+        await agen.aclose()
+        return items
+
+    assert asyncio.run(main()) == [1, 2, 3]
+    assert source.closed.is_set()
+    # 소비한 3개 + 버퍼 2개 + 대기 중이던 1개를 넘겨 읽지 않음
+    assert source.pulled <= 6
+
+
+def test_close_while_producer_waits_on_full_buffer():
+    source = Source(10 ** 6)
+
+    async def main():
+        agen = iterate_blocking(source, max_buffer=1)
+        await agen.__anext__()
+        # 소비하지 않는 동안 워커는 버퍼가 비기를 기다림
+        await asyncio.sleep(0.05)
+        pulled = source.pulled
+        await asyncio.wait_for(agen.aclose(), timeout=2)
+        return pulled
+
+    assert asyncio.run(main()) <= 3
+    assert source.closed.is_set()
+
+
+def test_exception_propagates_after_earlier_items():
+    source = Source(10, fail_at=2)
+
+    async def main():
+        items = []
+        with pytest.raises(ValueError, match="upstream broke"):
+            async for item in iterate_blocking(source):
+                items.append(item)
+        return items
+
+    assert asyncio.run(main()) == [1, 2]
+
+
+def test_contextvars_are_copied_to_worker_thread():
+    def read_context():
+        yield request_id.get()
+        # 워커 스레드에서 바꾼 값은 호출한 쪽 컨텍스트에 새지 않음
+        request_id.set("changed")
+        yield request_id.get()
+
+    async def main():
+        request_id.set("req-1")
+        items = await collect(iterate_blocking(read_context()))
+        value = await run_blocking(request_id.get)
+        return items, value, request_id.get()
+
+    assert asyncio.run(main()) == (["req-1", "changed"], "req-1", "req-1")
@@ -0,0 +1,171 @@
+import io
+import sys
+import types
+import wave
+
+import numpy as np
+import pytest
+
+from modules import audio_preprocess
+from modules.audio_preprocess import (TARGET_SAMPLE_RATE, decode_wav, downmix, encode_pcm, prepare_for_whisper,
+                                      prepare_pcm_for_whisper, resample, to_pcm16)
+
+
+def tone(frequency, rate, seconds=1.0, amplitude=8000.0):
+    times = np.arange(int(rate * seconds)) / rate
+    return amplitude * np.sin(2 * np.pi * frequency * times)
+
+
+def make_wav(samples, rate, channels=1, sample_width=2):
+    """int16 범위 float 샘플(채널 인터리브)을 주어진 비트 깊이의 WAV로"""
+    samples = np.asarray(samples, dtype=np.float64)
+    if sample_width == 1:
+        frames = (np.round(samples / 256) + 128).astype(np.uint8).tobytes()
+    elif sample_width == 2:
+        frames = np.round(samples).astype('<i2').tobytes()
+    elif sample_width == 3:
+        values = np.round(samples * 256).astype('<i4').tobytes()
+        frames = b"".join(values[i:i + 3] for i in range(0, len(values), 4))
+    else:
+        frames = np.round(samples * 65536).astype('<i4').tobytes()
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(sample_width)
+        wf.setframerate(rate)
+        wf.writeframes(frames)
+    return buffer.getvalue()
+
+
+def read_wav(data):
+    with wave.open(io.BytesIO(data), 'rb') as wf:
+        return wf.getnchannels(), wf.getframerate(), wf.getsampwidth(), wf.getnframes()
+
+
+def rms(samples):
+    return float(np.sqrt(np.mean(np.square(samples))))
+
+
+@pytest.mark.parametrize("sample_width", [1, 2, 3, 4])
+def test_decode_wav_bit_depths(sample_width):
+    samples = tone(440, 8000, seconds=0.1)
+    decoded, rate = decode_wav(make_wav(samples, 8000, sample_width=sample_width))
+    assert rate == 8000
+    assert len(decoded) == len(samples)
+    # 8bit는 양자화 오차가 커서 오차 허용 범위를 넓게
+    tolerance = 200 if sample_width == 1 else 1
+    assert np.max(np.abs(decoded - samples)) <= tolerance
+
+
+def test_decode_wav_downmixes_stereo():
+    left, right = np.full(100, 1000.0), np.full(100, -3000.0)
+    interleaved = np.column_stack([left, right]).reshape(-1)
+    decoded, _ = decode_wav(make_wav(interleaved, 16000, channels=2))
+    assert len(decoded) == 100
+    assert np.allclose(decoded, -1000.0)
+
+
+def test_downmix_drops_incomplete_frame():
+    assert list(downmix(np.array([1.0, 3.0, 5.0, 7.0, 9.0]), 2)) == [2.0, 6.0]
+    assert list(downmix(np.array([1.0, 2.0]), 1)) == [1.0, 2.0]
+
+
+@pytest.mark.parametrize("source_rate, length", [(44100, 44100), (44100, 44101), (48000, 4799), (8000, 8001)])
+def test_resample_length(source_rate, length):
+    samples = np.zeros(length)
+    resampled = resample(samples, source_rate)
+    assert len(resampled) == max(1, int(round(length / source_rate * TARGET_SAMPLE_RATE)))
+
+
+def test_resample_keeps_passband_and_suppresses_aliases():
+    kept = resample(tone(1000, 44100), 44100)
+    assert rms(kept) == pytest.approx(rms(tone(1000, 16000)), rel=0.05)
+    # 새 나이퀴스트(8kHz)보다 높은 10kHz는 걸러져야 2kHz 가짜 신호로 접히지 않음
+    aliased = resample(tone(10000, 44100), 44100)
+    assert rms(aliased) < 0.1 * rms(tone(10000, 44100))
+
+
+def test_resample_noop_cases():
+    samples = np.arange(10.0)
+    assert resample(samples, TARGET_SAMPLE_RATE) is samples
+    assert len(resample(np.array([]), 44100)) == 0
+
+
+def test_to_pcm16_clips():
+    assert np.frombuffer(to_pcm16(np.array([40000.0, -40000.0, 1.4])), dtype='<i2').tolist() == [32767, -32768, 1]
+
+
+def test_prepare_stereo_44k_wav_for_whisper():
+    samples = tone(440, 44100)
+    stereo = np.column_stack([samples, samples]).reshape(-1)
+    original = make_wav(stereo, 44100, channels=2)
+
+    data, filename, stats = prepare_for_whisper(original, "voice.wav", codec="wav")
+    assert read_wav(data) == (1, TARGET_SAMPLE_RATE, 2, TARGET_SAMPLE_RATE)
+    assert filename == "voice.wav"
+    assert stats["codec"] == "wav"
+    assert stats["original_bytes"] == len(original)
+    assert stats["bytes"] == len(data)
+    assert stats["bytes_saved"] == len(original) - len(data) > 0
+
+
+def test_already_small_wav_is_left_unchanged():
+    original = make_wav(tone(440, 8000, seconds=0.1), 8000, sample_width=1)
+    data, filename, stats = prepare_for_whisper(original, "small.wav", codec="wav")
+    # 16kHz 16bit로 바꾸면 더 커지므로 원본 유지
+    assert (data, filename) == (original, "small.wav")
+    assert stats["bytes_saved"] == 0 and stats["codec"] is None
+
+
+def test_unsupported_or_broken_input_is_left_unchanged():
+    data, filename, stats = prepare_for_whisper(b"RIFF broken", "x.wav", codec="wav")
+    assert (data, filename, stats["bytes_saved"]) == (b"RIFF broken", "x.wav", 0)
+
+
+def test_prepare_pcm_for_whisper():
+    samples = tone(440, 44100, seconds=0.5)
+    pcm = np.round(samples).astype('<i2').tobytes()
+    data, filename, stats = prepare_pcm_for_whisper(pcm, 44100, codec="wav")
+    assert filename == "speech.wav"
+    assert read_wav(data) == (1, TARGET_SAMPLE_RATE, 2, TARGET_SAMPLE_RATE // 2)
+    assert stats["bytes_saved"] > 0
+
+
+@pytest.fixture
+def fake_pydub(monkeypatch):
+    """export가 정해진 오류를 내는 가짜 pydub (인코더 오류 처리만 확인)"""
+    module = types.ModuleType("pydub")
+    failure = {}
+
+    class AudioSegment:
+        def __init__(self, **kwargs):
+            pass
+
+        def export(self, buffer, **kwargs):
+            if failure.get("error"):
+                raise failure["error"]
+            buffer.write(b"flac")
+
+    module.AudioSegment = AudioSegment
+    monkeypatch.setitem(sys.modules, "pydub", module)
+    monkeypatch.setattr(audio_preprocess, "_unavailable_codecs", set())
+    return failure
+
+
+def test_transient_encoder_failure_is_not_latched(fake_pydub):
+    fake_pydub["error"] = RuntimeError("ffmpeg returned error code: 1")
+    assert encode_pcm(b"\0\0" * 10, "flac")[1] == "wav"
+    fake_pydub["error"] = None
+    assert encode_pcm(b"\0\0" * 10, "flac") == (b"flac", "flac")
+
+
+@pytest.mark.parametrize("error", [
+    FileNotFoundError(2, "No such file or directory", "ffmpeg"),
+    RuntimeError("Unknown encoder 'libopus'"),
+])
+def test_missing_encoder_is_latched(fake_pydub, error):
+    fake_pydub["error"] = error
+    assert encode_pcm(b"\0\0" * 10, "opus")[1] == "wav"
+    fake_pydub["error"] = None
+    assert encode_pcm(b"\0\0" * 10, "opus")[1] == "wav"
+    assert encode_pcm(b"\0\0" * 10, "flac") == (b"flac", "flac")
@@ -0,0 +1,82 @@
+import os
+import time
+
+from modules.audio_store import AudioStore
+
+
+def make_store(tmp_path, ttl_seconds=60, max_bytes=0):
+    return AudioStore(directory=str(tmp_path), ttl_seconds=ttl_seconds, max_bytes=max_bytes, sweep_interval=3600)
+
+
+def age(path, seconds):
+    then = time.time() - seconds
+    os.utime(path, (then, then))
+
+
+def test_save_and_lookup(tmp_path):
+    store = make_store(tmp_path)
+    audio_id = store.save(b"mp3-bytes")
+    path = store.path(audio_id)
+    with open(path, 'rb') as f:
+        assert f.read() == b"mp3-bytes"
+    assert store.url_for(audio_id) == f"/api/audio/{audio_id}"
+    assert 0 < store.expires_in(path) <= 60
+
+
+def test_invalid_or_empty_ids(tmp_path):
+    store = make_store(tmp_path)
+    assert store.save_stream([]) is None
+    assert store.path("../etc/passwd") is None
+    assert store.path(AudioStore.new_id()) is None
+
+
+def test_expired_file_is_hidden_then_swept(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=60)
+    audio_id = store.save(b"old")
+    path = store._file_path(audio_id)
+    age(path, 120)
+
+    assert store.path(audio_id) is None
+    assert store.sweep()["removed"] == 1
+    assert not os.path.exists(path)
+
+
+def test_sweep_keeps_fresh_files(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=60)
+    audio_id = store.save(b"new")
+    assert store.sweep() == {"removed": 0, "files": 1, "bytes": 3}
+    assert store.path(audio_id) is not None
+
+
+def test_sweep_removes_oldest_files_over_size_limit(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=0, max_bytes=8)
+    ids = [store.save(b"1234") for _ in range(3)]
+    for seconds, audio_id in zip((30, 20, 10), ids):
+        age(store._file_path(audio_id), seconds)
+
+    result = store.sweep()
+    assert result["removed"] == 1
+    assert result["bytes"] == 8
+    assert store.path(ids[0]) is None
+    assert store.path(ids[1]) is not None and store.path(ids[2]) is not None
+
+
+def test_stale_partial_file_is_swept(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=0)
+    partial = tmp_path / f"{AudioStore.new_id()}.mp3.part"
+    partial.write_bytes(b"half")
+    age(partial, 120)
+
+    assert store.sweep()["removed"] == 1
+    assert not partial.exists()
+
+
+def test_etag_is_stable_and_content_based(tmp_path):
+    store = make_store(tmp_path)
+    first = store.path(store.save(b"same"))
+    second = store.path(store.save(b"same"))
+    other = store.path(store.save(b"different"))
+
+    assert store.etag(first) == store.etag(first) == store.etag(second)
+    assert store.etag(first) != store.etag(other)
+    assert store.etag(first).startswith('"') and store.etag(first).endswith('"')
@@ -0,0 +1,109 @@
+import json
+import sys
+
+import pytest
+
+from bench import load
+from bench.load import EndpointStats, compare_baseline, percentile
+from bench.stubs import CACHE_INCREMENT, StubState
+
+
+def summary(p95_ms=100.0, throughput_rps=50.0, requests=100, errors=0):
+    return {"requests": requests, "errors": errors, "p95_ms": p95_ms, "throughput_rps": throughput_rps}
+
+
+def result(**endpoints):
+    return {"endpoints": endpoints}
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 95) == 95
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([7], 95) == 7
+    assert percentile([1, 2, 3], 0) == 1
+    assert percentile([], 95) is None
+
+
+def test_endpoint_summary_counts_only_ok_latencies():
+    stats = EndpointStats("chat")
+    stats.started, stats.finished = 10.0, 12.0
+    for seconds in (0.1, 0.2, 0.3, 0.4):
+        stats.record(200, seconds)
+    stats.record(503, 5.0)
+    stats.record("error:ConnectError", 9.0)
+    report = stats.summary()
+    assert (report["requests"], report["ok"], report["errors"]) == (6, 4, 2)
+    assert report["throughput_rps"] == 2.0
+    assert (report["p50_ms"], report["p95_ms"], report["max_ms"]) == (200.0, 400.0, 400.0)
+    assert report["statuses"] == {"200": 4, "503": 1, "error:ConnectError": 1}
+
+
+def test_within_tolerance_is_not_a_regression():
+    baseline = result(chat=summary())
+    assert compare_baseline(result(chat=summary(p95_ms=119.0, throughput_rps=41.0)), baseline, 0.2) == []
+    # 기준에 없는 엔드포인트는 비교하지 않음
+    assert compare_baseline(result(tts=summary(p95_ms=1000.0)), baseline, 0.2) == []
+
+
+@pytest.mark.parametrize("current, expected", [
+    (summary(p95_ms=121.0), "chat p95"),
+    (summary(throughput_rps=39.0), "chat 처리량"),
+    (summary(errors=3), "chat 오류율"),
+])
+def test_regressions_over_tolerance(current, expected):
+    regressions = compare_baseline(result(chat=current), result(chat=summary()), 0.2)
+    assert len(regressions) == 1
+    assert regressions[0].startswith(expected)
+
+
+def run_main(monkeypatch, tmp_path, current, baseline):
+    path = tmp_path / "baseline.json"
+    path.write_text(json.dumps(baseline), encoding="utf-8")
+
+    async def run_benchmark(args):
+        return current
+
+    monkeypatch.setattr(load, "run_benchmark", run_benchmark)
+    monkeypatch.setattr(sys, "argv", ["load", "--baseline", str(path), "--max-regression", "0.2"])
+    load.main()
+
+
+def test_main_exits_1_on_regression(monkeypatch, tmp_path, capsys):
+    current = result(chat=dict(summary(p95_ms=130.0), ok=100, statuses={}, p50_ms=1.0, p99_ms=1.0, max_ms=1.0))
+    with pytest.raises(SystemExit) as exited:
+        run_main(monkeypatch, tmp_path, current, result(chat=summary()))
+    assert exited.value.code == 1
+    assert "성능 회귀" in capsys.readouterr().out
+
+
+def test_main_passes_without_regression(monkeypatch, tmp_path, capsys):
+    current = result(chat=dict(summary(p95_ms=110.0), ok=100, statuses={}, p50_ms=1.0, p99_ms=1.0, max_ms=1.0))
+    run_main(monkeypatch, tmp_path, current, result(chat=summary()))
+    assert "회귀 없음" in capsys.readouterr().out
+
+
+def messages(prefix_chars, user):
+    return [{"role": "system", "content": "가" * prefix_chars}, {"role": "user", "content": user}]
+
+
+def test_stub_reports_cached_tokens_for_repeated_prefix():
+    state = StubState(None, None, None, cache_min_tokens=1024)
+    first = state.prompt_usage(messages(3000, "안녕"), 10)
+    second = state.prompt_usage(messages(3000, "뭐 해?"), 10)
+    assert first["prompt_tokens_details"]["cached_tokens"] == 0
+    cached = second["prompt_tokens_details"]["cached_tokens"]
+    # 같은 접두부(시스템 프롬프트)만큼 CACHE_INCREMENT 단위로 재사용
+    assert 0 < cached <= second["prompt_tokens"]
+    assert cached % CACHE_INCREMENT == 0
+    assert second["total_tokens"] == second["prompt_tokens"] + 10
+
+
+def test_stub_skips_cache_for_short_or_new_prefix():
+    state = StubState(None, None, None, cache_min_tokens=1024)
+    state.prompt_usage(messages(30, "안녕"), 10)
+    assert state.prompt_usage(messages(30, "뭐 해?"), 10)["prompt_tokens_details"]["cached_tokens"] == 0
+    state.prompt_usage(messages(3000, "안녕"), 10)
+    assert state.prompt_usage(messages(3001, "안녕"), 10)["prompt_tokens_details"]["cached_tokens"] == 0
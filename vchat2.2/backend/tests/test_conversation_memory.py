@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules.conversation_memory import SUMMARY_PREFIX, ConversationMemory, _turn_tokens
+from modules.session_store import SessionStore
+
+USER = "오늘 뭐 했어?"
+ASSISTANT = "방송 준비했지~ 너는?"
+TURN_TOKENS = _turn_tokens(USER, ASSISTANT, None)
+
+
+class FakeCompletions:
+    def __init__(self, reply):
+        self.reply = reply
+        self.requests = []
+
+    def create(self, **kwargs):
+        self.requests.append(kwargs)
+        message = SimpleNamespace(content=self.reply)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+def fake_client(reply="시청자는 민수이고 고양이를 좋아함"):
+    completions = FakeCompletions(reply)
+    return SimpleNamespace(chat=SimpleNamespace(completions=completions)), completions
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SessionStore(path=str(tmp_path / "sessions.db"))
+
+
+def make_memory(store, turns=2, **kwargs):
+    kwargs.setdefault("summarize", False)
+    return ConversationMemory(store=store, budget_tokens=TURN_TOKENS * turns, **kwargs)
+
+
+def append_turns(memory, count, persona="a", session_id="s1"):
+    for i in range(count):
+        memory.append(session_id, persona, f"{USER} {i}", ASSISTANT)
+
+
+def test_keeps_only_turns_within_budget(store):
+    memory = make_memory(store, turns=2)
+    append_turns(memory, 5)
+
+    messages = memory.load_messages("s1", "a")
+    assert [message["role"] for message in messages] == ["user", "assistant"] * len(messages[::2])
+    users = [message["content"] for message in messages if message["role"] == "user"]
+    # 숫자 자릿수 때문에 턴 토큰이 조금 달라도 가장 최근 턴은 항상 남음
+    assert users[-1] == f"{USER} 4"
+    assert 1 <= len(users) <= 2
+    assert sum(turn["tokens"] for turn in store.get("s1", "history:a")["turns"]) <= memory.budget_tokens
+
+
+def test_smaller_budget_applies_to_stored_history(store):
+    append_turns(make_memory(store, turns=10), 5)
+    messages = make_memory(store, turns=1).load_messages("s1", "a")
+    assert len(messages) == 2
+    assert messages[0]["content"] == f"{USER} 4"
+
+
+def test_history_is_per_session_and_persona(store):
+    memory = make_memory(store, turns=10)
+    append_turns(memory, 1, persona="a")
+    append_turns(memory, 1, persona="b")
+    assert memory.has_history("s1", "a") and memory.has_history("s1", "b")
+    assert not memory.has_history("s2", "a")
+    assert memory.load_messages(None, "a") == []
+
+
+def test_disabled_or_empty_turns_are_not_stored(store):
+    memory = ConversationMemory(store=store, budget_tokens=0)
+    memory.append("s1", "a", USER, ASSISTANT)
+    assert not memory.enabled
+    assert store.get("s1", "history:a") is None
+
+    memory = make_memory(store)
+    memory.append("s1", "a", USER, "")
+    assert not memory.has_history("s1", "a")
+
+
+def test_clear_one_persona_or_all(store):
+    memory = make_memory(store, turns=10)
+    for persona in ("a", "b"):
+        append_turns(memory, 1, persona=persona)
+    append_turns(memory, 1, persona="a", session_id="s2")
+    store.set("s1", "persona", "a")
+
+    assert memory.clear("s1", "a") == 1
+    assert memory.clear("s1", "a") == 0
+    append_turns(memory, 1, persona="a")
+    assert memory.clear("s1") == 2
+    assert not memory.has_history("s1", "a") and not memory.has_history("s1", "b")
+    assert memory.has_history("s2", "a")
+    assert store.get("s1", "persona") == "a"  # 대화 기록이 아닌 세션 값은 유지
+
+
+def test_evicted_turns_are_summarized(store):
+    client, completions = fake_client()
+    memory = make_memory(store, turns=4, summarize=True, summary_tokens=TURN_TOKENS, client=client)
+    append_turns(memory, 5)
+    memory._summarizer.shutdown(wait=True)
+
+    assert len(completions.requests) >= 1
+    assert "[이전 요약]" not in completions.requests[0]["messages"][1]["content"]
+    messages = memory.load_messages("s1", "a")
+    assert messages[0] == {"role": "system", "content": SUMMARY_PREFIX + "시청자는 민수이고 고양이를 좋아함"}
+    assert messages[-2]["content"] == f"{USER} 4"
+    assert all(message["content"] != f"{USER} 0" for message in messages)
+
+
+def test_failed_summary_keeps_previous_state(store):
+    client, completions = fake_client(reply="")
+    memory = make_memory(store, turns=1, summarize=True, summary_tokens=0, client=client)
+    append_turns(memory, 2)
+    memory._summarizer.shutdown(wait=True)
+
+    assert completions.requests
+    assert store.get("s1", "history:a")["summary"] == ""
+    assert memory.load_messages("s1", "a")[0]["role"] == "user"
+
+
+def test_delete_endpoint_without_persona_clears_every_persona():
+    import main
+    from fastapi.testclient import TestClient
+
+    from modules.conversation_memory import get_conversation_memory
+
+    memory = get_conversation_memory()
+    for persona in ("a", "b"):
+        memory.append("endpoint", persona, USER, ASSISTANT)
+
+    client = TestClient(main.app)
+    response = client.delete("/api/chat/history", params={"session_id": "endpoint", "persona": "a"})
+    assert response.json() == {"success": True, "persona": "a", "deleted": 1}
+    memory.append("endpoint", "a", USER, ASSISTANT)
+
+    response = client.delete("/api/chat/history", params={"session_id": "endpoint"})
+    assert response.json() == {"success": True, "persona": None, "deleted": 2}
+    assert not memory.has_history("endpoint", "a") and not memory.has_history("endpoint", "b")
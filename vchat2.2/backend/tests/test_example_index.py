@@ -0,0 +1,76 @@
+from modules.example_index import ExampleIndex, char_ngrams
+from modules.persona_manager import PersonaContext
+from modules.prompt_cache import compile_prefix
+
+EXAMPLES = [
+    {"user": "오늘 무슨 게임 해?", "assistant": "오늘은 마크 할 거야~"},
+    {"user": "저녁 뭐 먹었어?", "assistant": "떡볶이 먹었지!"},
+    {"user": "좋아하는 음식이 뭐야?", "assistant": "나는 떡볶이가 최고야!"},
+    {"user": "노래 한 곡 불러줘", "assistant": "음~ 조금만 불러볼게!"},
+    {"user": "게임 잘해?", "assistant": "당연하지! 나 게임 장인이야"},
+]
+
+
+def test_char_ngrams():
+    assert char_ngrams("  게임  해 ") == ["게임", "임 ", " 해", "게임 ", "임 해"]
+    assert char_ngrams("a") == ["a"]
+    assert char_ngrams("   ") == []
+
+
+def test_scores_prefer_overlapping_examples():
+    scores = ExampleIndex(EXAMPLES).scores("게임 뭐 해?")
+    best = max(scores, key=scores.get)
+    assert best in (0, 4)
+    assert 3 not in scores or scores[3] < scores[best]
+
+
+def test_select_respects_limit_and_keeps_stored_order():
+    index = ExampleIndex(EXAMPLES)
+    chosen = index.select("저녁에 좋아하는 음식 먹었어", budget_tokens=10 ** 6, limit=2)
+    assert chosen == [1, 2]
+
+
+def test_select_respects_token_budget():
+    index = ExampleIndex(EXAMPLES)
+    budget = index.tokens[0] + index.tokens[4]
+    chosen = index.select("게임", budget_tokens=budget, limit=10)
+    assert sum(index.tokens[position] for position in chosen) <= budget
+    assert chosen == [0, 4]
+
+
+def test_select_fills_with_leading_examples_when_nothing_matches():
+    index = ExampleIndex(EXAMPLES)
+    assert index.select("zzz", budget_tokens=10 ** 6, limit=2) == [0, 1]
+    assert index.select("zzz", budget_tokens=0, limit=2) == []
+
+
+def test_messages_are_user_assistant_pairs():
+    messages = ExampleIndex(EXAMPLES).messages("노래", budget_tokens=10 ** 6, limit=1)
+    assert messages == [
+        {"role": "user", "content": "노래 한 곡 불러줘"},
+        {"role": "assistant", "content": "음~ 조금만 불러볼게!"},
+    ]
+
+
+def test_empty_index():
+    index = ExampleIndex([])
+    assert len(index) == 0
+    assert index.select("게임", budget_tokens=100, limit=3) == []
+
+
+def persona_context():
+    return PersonaContext({"name": "테스트", "persona_data": {}, "few_shot_examples": EXAMPLES})
+
+
+def test_prefix_inlines_examples_within_budget():
+    prefix = compile_prefix(persona_context(), budget_tokens=10 ** 6, limit=10)
+    assert prefix.index is None
+    assert len(prefix.messages) == 1 + 2 * len(EXAMPLES)
+    assert prefix.example_messages("게임") == []
+
+
+def test_prefix_searches_examples_over_limit():
+    prefix = compile_prefix(persona_context(), budget_tokens=10 ** 6, limit=2)
+    assert [message["role"] for message in prefix.messages] == ["system"]
+    messages = prefix.example_messages("저녁에 좋아하는 음식 먹었어")
+    assert [message["content"] for message in messages[::2]] == ["저녁 뭐 먹었어?", "좋아하는 음식이 뭐야?"]
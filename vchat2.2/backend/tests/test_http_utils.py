@@ -0,0 +1,113 @@
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from modules.http_utils import etag_matches, parse_byte_range, ranged_file_response
+
+ETAG = '"abc123"'
+BODY = bytes(range(100))
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("bytes=0-9", (0, 9)),
+    ("bytes=90-", (90, 99)),
+    ("bytes=-10", (90, 99)),
+    ("bytes=-500", (0, 99)),
+    ("bytes=50-500", (50, 99)),
+    ("bytes= 5 - 9 ", (5, 9)),
+])
+def test_parse_valid_ranges(header, expected):
+    assert parse_byte_range(header, 100) == expected
+
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    "items=0-9",
+    " bytes=0-1",
+    "bytes=abc",
+    "bytes=a-b",
+    "bytes=1-a",
+    "bytes=-",
+    "bytes=+5-9",
+    "bytes=9-5",
+    "bytes=0-1,5-9",
+])
+def test_malformed_ranges_are_ignored(header):
+    assert parse_byte_range(header, 100) is None
+
+
+@pytest.mark.parametrize("header, size", [
+    ("bytes=100-", 100),
+    ("bytes=200-300", 100),
+    ("bytes=-0", 100),
+    ("bytes=-5", 0),
+])
+def test_unsatisfiable_ranges_raise(header, size):
+    with pytest.raises(ValueError):
+        parse_byte_range(header, size)
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ('"abc123"', True),
+    ('W/"abc123"', True),
+    ('"other", "abc123"', True),
+    ('"other"', False),
+    ('*', True),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "clip.mp3"
+    path.write_bytes(BODY)
+    app = FastAPI()
+
+    @app.get("/clip")
+    async def clip(request: Request):
+        return ranged_file_response(request, str(path), ETAG, "audio/mpeg", "public, max-age=60")
+
+    return TestClient(app)
+
+
+def test_full_response_has_validators(client):
+    response = client.get("/clip")
+    assert response.status_code == 200
+    assert response.content == BODY
+    assert response.headers["etag"] == ETAG
+    assert response.headers["accept-ranges"] == "bytes"
+
+
+def test_range_response(client):
+    response = client.get("/clip", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == BODY[10:20]
+    assert response.headers["content-range"] == "bytes 10-19/100"
+
+
+@pytest.mark.parametrize("header", ["bytes=abc", "bytes=a-b", "bytes=9-5"])
+def test_malformed_range_gets_full_body(client, header):
+    response = client.get("/clip", headers={"Range": header})
+    assert response.status_code == 200
+    assert response.content == BODY
+
+
+def test_unsatisfiable_range_is_416(client):
+    response = client.get("/clip", headers={"Range": "bytes=500-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */100"
+
+
+def test_if_none_match_is_304(client):
+    response = client.get("/clip", headers={"If-None-Match": ETAG})
+    assert response.status_code == 304
+    assert response.content == b""
+
+
+def test_stale_if_range_ignores_range(client):
+    response = client.get("/clip", headers={"Range": "bytes=0-9", "If-Range": '"old"'})
+    assert response.status_code == 200
+    assert response.content == BODY
@@ -0,0 +1,69 @@
+import contextvars
+
+import pytest
+
+from modules import metrics
+from modules.metrics import Counter, Histogram, render_metrics, set_request_labels, track_stage
+
+
+def in_new_context(func):
+    # 요청 라벨은 contextvar이므로 테스트마다 새 컨텍스트에서 실행
+    return contextvars.copy_context().run(func)
+
+
+@pytest.mark.parametrize("mode, expected", [
+    ("text-to-speech", "text-to-speech"),
+    ("voice-ws", "voice-ws"),
+    ("bogus", "other"),
+    ("", "other"),
+    ("x" * 1000, "other"),
+])
+def test_mode_label_is_bounded(mode, expected):
+    def run():
+        set_request_labels(persona="p", mode=mode)
+        return metrics.current_labels()
+    assert in_new_context(run) == {"persona": "p", "mode": expected}
+
+
+def test_labels_default_to_none():
+    assert in_new_context(metrics.current_labels) == {"persona": "none", "mode": "none"}
+
+
+def test_counter_render_escapes_labels():
+    counter = Counter("vchat_test_counter_total", "테스트 카운터", ("name",))
+    counter.inc(name='a"b')
+    counter.inc(2, name='a"b')
+    lines = counter.render()
+    assert lines[1] == "# TYPE vchat_test_counter_total counter"
+    assert lines[2] == 'vchat_test_counter_total{name="a\\"b"} 3'
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("vchat_test_seconds", "테스트 히스토그램", buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value)
+    assert histogram.render()[2:] == [
+        'vchat_test_seconds_bucket{le="0.1"} 1',
+        'vchat_test_seconds_bucket{le="1"} 2',
+        'vchat_test_seconds_bucket{le="+Inf"} 3',
+        'vchat_test_seconds_sum 5.55',
+        'vchat_test_seconds_count 3',
+    ]
+
+
+def test_track_stage_records_duration_and_errors():
+    def run():
+        set_request_labels(persona="metrics-test", mode="bogus")
+        with track_stage("test_stage"):
+            pass
+        with pytest.raises(KeyError):
+            with track_stage("test_stage"):
+                raise KeyError("x")
+
+    in_new_context(run)
+    text = render_metrics()
+    labels = 'stage="test_stage",persona="metrics-test",mode="other"'
+    assert f"vchat_stage_duration_seconds_count{{{labels}}} 2" in text
+    assert f'vchat_stage_errors_total{{{labels},error="KeyError"}} 1' in text
+    assert f"vchat_stage_in_flight{{{labels}}} 0" in text
+    assert 'mode="bogus"' not in text
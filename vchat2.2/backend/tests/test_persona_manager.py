@@ -0,0 +1,101 @@
+import json
+
+from modules.persona_manager import MAX_MISSING_NAMES, PersonaManager
+
+
+class FakeDocument:
+    def __init__(self, data):
+        self._data = data
+        self.exists = data is not None
+
+    def to_dict(self):
+        return self._data
+
+
+class FakeFirestore:
+    """personas 컬렉션 하나만 흉내 내는 Firestore (문서 조회 / 전체 읽기 횟수 기록)"""
+
+    def __init__(self, documents=None):
+        self.documents = dict(documents or {})
+        self.document_reads = 0
+        self.collection_reads = 0
+
+    def collection(self, name):
+        return self
+
+    def document(self, name):
+        return FakeDocumentRef(self, name)
+
+    def stream(self):
+        self.collection_reads += 1
+        return []
+
+
+class FakeDocumentRef:
+    def __init__(self, db, name):
+        self.db = db
+        self.name = name
+
+    def get(self):
+        self.db.document_reads += 1
+        return FakeDocument(self.db.documents.get(self.name))
+
+
+def make_manager(tmp_path, db):
+    manager = PersonaManager(personas_file=str(tmp_path / "personas.json"), auto_load=False)
+    manager.db = db
+    return manager
+
+
+def test_unknown_name_reads_one_document_and_is_remembered(tmp_path):
+    db = FakeFirestore()
+    manager = make_manager(tmp_path, db)
+
+    assert manager.fetch_persona("없는이름") is None
+    assert manager.fetch_persona("없는이름") is None
+    assert db.document_reads == 1
+    assert db.collection_reads == 0
+
+    assert manager.fetch_persona("없는이름", retry_after=0) is None
+    assert db.document_reads == 2
+
+
+def test_persona_added_by_another_worker_is_found(tmp_path):
+    db = FakeFirestore()
+    manager = make_manager(tmp_path, db)
+    manager.personas_data = {"기존": {"name": "기존"}}
+
+    db.documents["새로운"] = {"name": "새로운"}
+    assert manager.fetch_persona("새로운") == {"name": "새로운"}
+    assert manager.get_available_personas() == ["기존", "새로운"]
+    assert manager.fetch_persona("새로운") == {"name": "새로운"}
+    assert db.document_reads == 1
+    assert db.collection_reads == 0
+
+
+def test_known_and_empty_names_skip_the_store(tmp_path):
+    db = FakeFirestore()
+    manager = make_manager(tmp_path, db)
+    manager.personas_data = {"기존": {"name": "기존"}}
+
+    assert manager.fetch_persona("기존") == {"name": "기존"}
+    assert manager.fetch_persona("") is None
+    assert db.document_reads == 0
+
+
+def test_missing_names_are_bounded(tmp_path):
+    manager = make_manager(tmp_path, FakeFirestore())
+    for i in range(MAX_MISSING_NAMES + 10):
+        manager.fetch_persona(f"bogus-{i}")
+    assert len(manager._missing) == MAX_MISSING_NAMES
+    assert "bogus-0" not in manager._missing
+
+
+def test_local_backup_is_used_without_firestore(tmp_path):
+    manager = make_manager(tmp_path, None)
+    assert manager.fetch_persona("로컬") is None
+
+    with open(manager.personas_file, 'w', encoding='utf-8') as f:
+        json.dump({"로컬": {"name": "로컬"}}, f, ensure_ascii=False)
+    assert manager.fetch_persona("로컬") is None  # 없다고 확인한 이름은 잠시 다시 보지 않음
+    assert manager.fetch_persona("로컬", retry_after=0) == {"name": "로컬"}
@@ -0,0 +1,137 @@
+from types import SimpleNamespace
+
+from modules import prompt_cache
+from modules.persona_manager import PersonaContext
+from modules.prompt_cache import PromptCacheUsage, PromptPrefixCache
+
+EXAMPLES = [
+    {"user": "오늘 무슨 게임 해?", "assistant": "오늘은 마크 할 거야~"},
+    {"user": "저녁 뭐 먹었어?", "assistant": "떡볶이 먹었지!"},
+    {"user": "좋아하는 음식이 뭐야?", "assistant": "나는 떡볶이가 최고야!"},
+]
+
+
+def persona_context(examples=EXAMPLES, **persona_data):
+    return PersonaContext({"name": "테스트", "persona_data": persona_data, "few_shot_examples": examples})
+
+
+def test_same_version_reuses_prefix(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "10")
+    cache = PromptPrefixCache()
+    first = cache.get(persona_context())
+    # 내용이 같으면 새 PersonaContext여도 같은 버전이라 같은 객체를 재사용
+    second = cache.get(persona_context())
+    assert second is first
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert len(first.messages) == 1 + 2 * len(EXAMPLES)
+
+
+def test_version_change_rebuilds_and_drops_old_prefix(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "10")
+    cache = PromptPrefixCache()
+    old = cache.get(persona_context())
+    new = cache.get(persona_context(EXAMPLES[:1]))
+    assert new is not old
+    assert new.version != old.version
+    assert len(new.messages) == 3
+    assert new.fingerprint != old.fingerprint
+    # 예전 버전은 바로 제거되어 항목은 하나만 남음
+    assert cache.stats()["entries"] == 1
+    assert cache.peek("테스트") is new
+    assert cache.get(persona_context()) is not old
+    assert cache.misses == 3
+
+
+def test_models_are_cached_separately(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "10")
+    cache = PromptPrefixCache()
+    assert cache.get(persona_context(), "gpt-4o") is not cache.get(persona_context(), "gpt-4o-mini")
+    assert cache.stats()["entries"] == 2
+
+
+def test_examples_over_limit_fall_back_to_per_turn_search(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "2")
+    monkeypatch.setenv("VCHAT_FEW_SHOT_TOKENS", "100000")
+    prefix = PromptPrefixCache().get(persona_context())
+    assert [message["role"] for message in prefix.messages] == ["system"]
+    assert prefix.limit == 2
+    messages = prefix.example_messages("저녁에 뭐 먹었어")
+    assert 0 < len(messages) <= 4
+    assert messages[0] == {"role": "user", "content": "저녁 뭐 먹었어?"}
+
+
+def test_examples_over_token_budget_fall_back_to_per_turn_search(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "10")
+    monkeypatch.setenv("VCHAT_FEW_SHOT_TOKENS", "5")
+    cache = PromptPrefixCache()
+    prefix = cache.get(persona_context())
+    assert prefix.index is not None and prefix.budget_tokens == 5
+    assert len(prefix.messages) == 1
+    assert cache.stats()["example_pools"] == {"테스트": len(EXAMPLES)}
+
+
+def test_invalidate_and_lru_limit(monkeypatch):
+    monkeypatch.setenv("VCHAT_FEW_SHOT_LIMIT", "10")
+    cache = PromptPrefixCache(max_entries=1)
+    cache.get(persona_context(), "a")
+    cache.get(persona_context(), "b")
+    assert cache.stats()["entries"] == 1
+    cache.invalidate("테스트")
+    assert cache.peek("테스트") is None
+
+
+def usage_object(prompt_tokens, cached_tokens=None):
+    # openai SDK 응답처럼 속성으로 접근하는 usage
+    details = None if cached_tokens is None else SimpleNamespace(cached_tokens=cached_tokens)
+    return SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=5, prompt_tokens_details=details)
+
+
+def test_record_usage_from_sdk_object_and_dict():
+    usage = PromptCacheUsage()
+    usage.record("테스트", usage_object(1000, 768))
+    usage.record("테스트", {"prompt_tokens": 1000, "prompt_tokens_details": {"cached_tokens": 256}})
+    entry = usage.stats()["테스트"]
+    assert entry["requests"] == 2 and entry["hits"] == 2
+    assert entry["prompt_tokens"] == 2000
+    assert entry["cached_tokens"] == 1024
+
+
+def test_missing_cached_tokens_count_as_miss():
+    usage = PromptCacheUsage()
+    usage.record("테스트", usage_object(100))
+    usage.record("테스트", {"prompt_tokens": 100})
+    usage.record("테스트", {"prompt_tokens": 100, "prompt_tokens_details": None})
+    usage.record("테스트", {"prompt_tokens": 100, "prompt_tokens_details": {"cached_tokens": None}})
+    entry = usage.stats()["테스트"]
+    assert (entry["requests"], entry["hits"], entry["cached_tokens"]) == (4, 0, 0)
+    assert entry["hit_rate"] == 0.0 and entry["cached_ratio"] == 0.0
+
+
+def test_usage_without_prompt_tokens_is_ignored():
+    usage = PromptCacheUsage()
+    usage.record("테스트", None)
+    usage.record("테스트", {"prompt_tokens": 0})
+    usage.record("테스트", SimpleNamespace())
+    assert usage.stats() == {}
+
+
+def test_hit_rate_and_cached_ratio():
+    usage = PromptCacheUsage()
+    usage.record("테스트", usage_object(1000, 900))
+    usage.record("테스트", usage_object(1000, 0))
+    usage.record("테스트", usage_object(1000))
+    usage.record(None, usage_object(300, 100))
+    stats = usage.stats()
+    assert stats["테스트"]["hit_rate"] == round(1 / 3, 4)
+    assert stats["테스트"]["cached_ratio"] == 0.3
+    # 페르소나 이름이 없으면 "none"으로 집계
+    assert stats["none"]["hit_rate"] == 1.0
+    assert stats["none"]["cached_ratio"] == round(100 / 300, 4)
+
+
+def test_record_usage_updates_metrics_and_module_stats(monkeypatch):
+    monkeypatch.setattr(prompt_cache, "_usage", PromptCacheUsage())
+    before = prompt_cache.LLM_CACHED_TOKENS._values.get(("지표",), 0.0)
+    prompt_cache.record_usage("지표", usage_object(500, 128))
+    assert prompt_cache.LLM_CACHED_TOKENS._values[("지표",)] == before + 128
+    assert prompt_cache.usage_stats()["지표"]["cached_ratio"] == round(128 / 500, 4)
@@ -0,0 +1,181 @@
+import itertools
+import threading
+import time
+
+import pytest
+
+from modules import admission, resilience
+from modules.resilience import LatencyTracker, RetryPolicy, call_with_retry, is_transient
+
+_names = itertools.count()
+
+
+class UpstreamError(Exception):
+    def __init__(self, status_code, headers=None, code=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.code = code
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """빠른 백오프 설정을 쓰는 테스트 전용 업스트림 이름"""
+    name = f"test-{next(_names)}"
+    monkeypatch.setitem(resilience._policies, name, RetryPolicy(attempts=3, base_delay=0.001, max_delay=0.01,
+                                                                 deadline=5.0))
+    return name
+
+
+def flaky(*errors, result="ok"):
+    calls = []
+
+    def func(timeout):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return func, calls
+
+
+@pytest.mark.parametrize("error, expected", [
+    (UpstreamError(429), True),
+    (UpstreamError(503), True),
+    (UpstreamError(400), False),
+    (UpstreamError(429, code="insufficient_quota"), False),
+    (TimeoutError(), True),
+    (ConnectionError(), True),
+    (ValueError(), False),
+])
+def test_is_transient(error, expected):
+    assert is_transient(error) is expected
+
+
+def test_backoff_is_bounded_and_respects_retry_after():
+    policy = RetryPolicy(base_delay=0.2, max_delay=0.5)
+    for attempt in range(1, 6):
+        assert 0 <= policy.backoff(attempt) <= min(0.5, 0.2 * 2 ** (attempt - 1))
+    assert policy.backoff(1, retry_after=3) == 3
+
+
+def test_retries_transient_errors(upstream):
+    func, calls = flaky(UpstreamError(503), UpstreamError(502))
+    rewinds = []
+    assert call_with_retry(upstream, func, rewind=lambda: rewinds.append(1)) == "ok"
+    assert len(calls) == 3
+    assert len(rewinds) == 2
+    # 재시도마다 남은 마감 시간을 넘김
+    assert calls[0] >= calls[1] >= calls[2]
+
+
+def test_gives_up_after_attempts(upstream):
+    func, calls = flaky(*[UpstreamError(503)] * 5)
+    with pytest.raises(UpstreamError):
+        call_with_retry(upstream, func)
+    assert len(calls) == 3
+
+
+def test_permanent_error_is_not_retried(upstream):
+    func, calls = flaky(UpstreamError(400))
+    with pytest.raises(UpstreamError):
+        call_with_retry(upstream, func)
+    assert len(calls) == 1
+
+
+def test_retry_after_past_deadline_fails_fast(upstream):
+    func, calls = flaky(UpstreamError(429, headers={"retry-after": "30"}))
+    started = time.monotonic()
+    with pytest.raises(UpstreamError):
+        call_with_retry(upstream, func, deadline=1.0)
+    assert len(calls) == 1
+    assert time.monotonic() - started < 0.5
+
+
+def test_latency_tracker_percentile():
+    tracker = LatencyTracker(min_samples=5)
+    for value in (0.1, 0.2, 0.3, 0.4):
+        tracker.record(value)
+    assert tracker.percentile(95) is None
+    tracker.record(1.0)
+    assert tracker.percentile(95) == 1.0
+    assert tracker.percentile(50) == 0.3
+
+
+def slow_then_fast(slow_seconds=0.5):
+    calls = []
+    lock = threading.Lock()
+
+    def func(timeout):
+        with lock:
+            calls.append(timeout)
+            index = len(calls)
+        if index == 1:
+            time.sleep(slow_seconds)
+            return "slow"
+        return "fast"
+
+    return func, calls
+
+
+def warm_tracker(monkeypatch, upstream, seconds=0.05):
+    tracker = LatencyTracker(min_samples=1)
+    tracker.record(seconds)
+    monkeypatch.setitem(resilience._trackers, upstream, tracker)
+
+
+def test_hedge_returns_first_result(monkeypatch, upstream):
+    warm_tracker(monkeypatch, upstream)
+    func, calls = slow_then_fast()
+    started = time.monotonic()
+    assert call_with_retry(upstream, func, hedge=True) == "fast"
+    assert time.monotonic() - started < 0.4
+    assert len(calls) == 2
+
+
+def test_hedge_is_skipped_without_free_slot(monkeypatch, upstream):
+    warm_tracker(monkeypatch, upstream)
+    limiter = admission.UpstreamLimiter(upstream, max_concurrency=1)
+    monkeypatch.setitem(admission._limiters, upstream, limiter)
+    entered = limiter.acquire()  # 다른 호출이 자리를 차지한 상태
+    try:
+        func, calls = slow_then_fast(slow_seconds=0.2)
+        assert call_with_retry(upstream, func, hedge=True) == "slow"
+        assert len(calls) == 1
+    finally:
+        limiter.release(entered)
+
+
+def test_no_hedge_without_samples(upstream):
+    func, calls = slow_then_fast(slow_seconds=0.1)
+    assert call_with_retry(upstream, func, hedge=True) == "slow"
+    assert len(calls) == 1
+
+
+def test_losing_primary_keeps_hedge_slot_until_it_finishes(monkeypatch, upstream):
+    warm_tracker(monkeypatch, upstream)
+    limiter = admission.UpstreamLimiter(upstream, max_concurrency=2)
+    monkeypatch.setitem(admission._limiters, upstream, limiter)
+    release_primary = threading.Event()
+    primary_done = threading.Event()
+    calls = []
+
+    def func(timeout):
+        calls.append(timeout)
+        if len(calls) == 1:
+            release_primary.wait(5)
+            primary_done.set()
+            return "slow"
+        return "fast"
+
+    entered = limiter.acquire()  # 호출한 쪽(admit)이 잡은 자리
+    assert call_with_retry(upstream, func, hedge=True) == "fast"
+    limiter.release(entered)
+    # hedge가 이겨도 아직 실행 중인 첫 요청이 자리를 차지
+    assert limiter.stats()["in_flight"] == 1
+    release_primary.set()
+    assert primary_done.wait(5)
+    deadline = time.monotonic() + 2
+    while limiter.stats()["in_flight"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert limiter.stats()["in_flight"] == 0
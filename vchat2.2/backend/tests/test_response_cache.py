@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from modules import response_cache
+from modules.response_cache import ResponseCache, embed, get_response_cache, normalize_message
+
+PERSONA = ("테스트", "v1")
+
+
+def make_cache(**kwargs):
+    kwargs.setdefault("threshold", 0.88)
+    kwargs.setdefault("ttl_seconds", 3600)
+    kwargs.setdefault("max_entries", 16)
+    kwargs.setdefault("variants", 2)
+    kwargs.setdefault("max_chars", 20)
+    return ResponseCache(**kwargs)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("안녕!!", "안녕"),
+    ("  안녕~ ", "안녕"),
+    ("HI there", "hithere"),
+])
+def test_normalize_message(text, expected):
+    assert normalize_message(text) == expected
+
+
+def test_repeated_letters_are_collapsed():
+    # NFKC가 호환용 자모를 조합형 자모로 바꾸므로 결과 문자열끼리 비교
+    assert normalize_message("안녕ㅋㅋㅋㅋ") == normalize_message("안녕ㅋㅋ") != normalize_message("안녕")
+
+
+def test_embedding_is_unit_length_and_deterministic():
+    vector = embed("안녕")
+    assert abs(float(vector @ vector) - 1.0) < 1e-5
+    assert (vector == embed("안녕")).all()
+    assert not embed("").any()
+
+
+def test_miss_fill_then_hit():
+    cache = make_cache(variants=2)
+    assert cache.lookup(PERSONA, "안녕!") is None           # miss
+    cache.store(PERSONA, "안녕!", "안녕~ 반가워!")
+    assert cache.lookup(PERSONA, "안녕") is None            # 변형을 더 모음 (fill)
+    cache.store(PERSONA, "안녕", "왔구나!")
+    assert cache.lookup(PERSONA, "안녕~~") in ("안녕~ 반가워!", "왔구나!")
+
+    stats = cache.stats()
+    assert (stats["misses"], stats["fills"], stats["hits"]) == (1, 1, 1)
+    assert stats["entries"] == {"테스트": 1}
+
+
+def test_identical_replies_still_warm_the_entry():
+    cache = make_cache(variants=3)
+    for _ in range(3):
+        assert cache.lookup(PERSONA, "잘자") is None
+        cache.store(PERSONA, "잘자", "잘자~")
+    assert cache.lookup(PERSONA, "잘자") == "잘자~"
+
+
+def test_dissimilar_or_long_inputs_are_not_served():
+    cache = make_cache(variants=1)
+    cache.store(PERSONA, "안녕", "안녕~")
+    assert cache.lookup(PERSONA, "배고파") is None
+    long_message = "안녕 " + "오늘 방송에서 뭐 할 건지 자세히 알려줘" * 2
+    cache.store(PERSONA, long_message, "응답")
+    assert cache.lookup(PERSONA, long_message) is None
+    assert cache.stats()["entries"] == {"테스트": 1}
+
+
+def test_personas_and_versions_are_separate():
+    cache = make_cache(variants=1)
+    cache.store(PERSONA, "안녕", "안녕~")
+    assert cache.lookup(("다른", "v1"), "안녕") is None
+    # 페르소나가 바뀌면 예전 버전 항목은 버림
+    assert cache.lookup(("테스트", "v2"), "안녕") is None
+    assert cache.lookup(PERSONA, "안녕") is None
+
+
+def test_expired_entry_is_a_miss(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = make_cache(variants=1, ttl_seconds=60)
+    cache.store(PERSONA, "안녕", "안녕~")
+    assert cache.lookup(PERSONA, "안녕") == "안녕~"
+    now[0] += 61
+    assert cache.lookup(PERSONA, "안녕") is None
+    assert cache.stats()["entries"] == {"테스트": 0}
+
+
+def test_storing_to_expired_entry_starts_over(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(response_cache.time, "time", lambda: now[0])
+    cache = make_cache(variants=2, ttl_seconds=60)
+    cache.store(PERSONA, "안녕", "예전 답 1")
+    cache.store(PERSONA, "안녕", "예전 답 2")
+    now[0] += 61
+    # 만료된 같은 키에 저장하면 예전 변형 없이 새로 모으고 만료 시각도 새로 계산
+    cache.store(PERSONA, "안녕", "새 답 1")
+    assert cache.lookup(PERSONA, "안녕") is None
+    cache.store(PERSONA, "안녕", "새 답 2")
+    for _ in range(10):
+        assert cache.lookup(PERSONA, "안녕") in ("새 답 1", "새 답 2")
+    now[0] += 59
+    assert cache.lookup(PERSONA, "안녕") is not None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = make_cache(variants=1, max_entries=2)
+    cache.store(PERSONA, "안녕", "a")
+    cache.store(PERSONA, "잘자", "b")
+    assert cache.lookup(PERSONA, "안녕") == "a"
+    cache.store(PERSONA, "배고파", "c")
+
+    assert cache.lookup(PERSONA, "잘자") is None
+    assert cache.lookup(PERSONA, "안녕") == "a"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.setattr(response_cache, "_cache", None)
+    monkeypatch.delenv("VCHAT_RESPONSE_CACHE", raising=False)
+    assert get_response_cache() is None
+    monkeypatch.setenv("VCHAT_RESPONSE_CACHE", "1")
+    assert get_response_cache() is get_response_cache() is not None
+
+
+def test_importing_the_app_does_not_load_numpy():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run(
+        [sys.executable, "-c", "import sys, main; print('numpy' in sys.modules)"],
+        cwd=backend, env=dict(os.environ), capture_output=True, text=True, timeout=60
+    )
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,88 @@
+from modules.persona_manager import PersonaContext
+from modules.service_pool import PersonaServicePool
+
+
+class FakePersonaManager:
+    """이름 -> 페르소나 dict를 그대로 돌려주는 최소 PersonaManager"""
+
+    def __init__(self, *names):
+        self.personas = {name: persona(name) for name in names}
+
+    def get_persona_context(self, persona_name):
+        data = self.personas.get(persona_name)
+        return PersonaContext(data) if data else None
+
+
+def persona(name, description="", **extra):
+    return dict({
+        "name": name,
+        "voice_id": f"voice-{name}",
+        "fine_tuned_model_id": "ft:test",
+        "persona_data": {"description": description},
+        "few_shot_examples": [],
+    }, **extra)
+
+
+def test_reuses_bundle_for_same_version():
+    pool = PersonaServicePool(FakePersonaManager("a"), max_size=4, max_bytes=10 ** 6)
+    bundle = pool.get("a")
+    assert pool.get("a") is bundle
+    assert bundle.tts.persona_manager is bundle.context
+    assert pool.stats()["builds"] == 1
+    assert pool.get("missing") is None
+
+
+def test_evicts_least_recently_used_by_count():
+    pool = PersonaServicePool(FakePersonaManager("a", "b", "c"), max_size=2, max_bytes=10 ** 6)
+    pool.get("a")
+    pool.get("b")
+    pool.get("a")
+    pool.get("c")
+    stats = pool.stats()
+    assert stats["personas"] == ["a", "c"]
+    assert stats["evictions"] == 1
+
+
+def test_evicts_by_bytes_but_keeps_newest():
+    manager = FakePersonaManager("a", "b")
+    bundle_size = PersonaServicePool(manager, max_size=4, max_bytes=10 ** 6).get("a").size
+    pool = PersonaServicePool(manager, max_size=4, max_bytes=bundle_size + 1)
+    pool.get("a")
+    pool.get("b")
+    stats = pool.stats()
+    assert stats["personas"] == ["b"]
+    assert stats["bytes"] == pool.get("b").size
+    assert stats["evictions"] == 1
+
+
+def test_explicit_zero_limits_are_not_replaced_by_env(monkeypatch):
+    monkeypatch.setenv("VCHAT_PERSONA_POOL_SIZE", "100")
+    monkeypatch.setenv("VCHAT_PERSONA_POOL_MB", "100")
+    pool = PersonaServicePool(FakePersonaManager("a", "b"), max_size=0, max_bytes=0)
+    assert (pool.max_size, pool.max_bytes) == (0, 0)
+    pool.get("a")
+    pool.get("b")
+    # 0이어도 방금 만든 번들 하나는 남김
+    assert pool.stats()["personas"] == ["b"]
+
+
+def test_defaults_come_from_env(monkeypatch):
+    monkeypatch.setenv("VCHAT_PERSONA_POOL_SIZE", "3")
+    monkeypatch.setenv("VCHAT_PERSONA_POOL_MB", "0.5")
+    pool = PersonaServicePool(FakePersonaManager())
+    assert (pool.max_size, pool.max_bytes) == (3, 512 * 1024)
+
+
+def test_rebuilds_when_persona_version_changes():
+    manager = FakePersonaManager("a", "b")
+    pool = PersonaServicePool(manager, max_size=4, max_bytes=10 ** 6)
+    old = pool.get("a")
+    pool.get("b")
+    manager.personas["a"] = persona("a", description="바뀐 설명이 꽤 깁니다")
+    new = pool.get("a")
+    assert new is not old
+    assert new.version != old.version
+    stats = pool.stats()
+    assert stats["personas"] == ["b", "a"]
+    assert stats["builds"] == 3
+    assert stats["bytes"] == new.size + pool.get("b").size
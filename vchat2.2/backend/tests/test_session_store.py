@@ -0,0 +1,79 @@
+import time
+
+from modules.session_store import DEFAULT_SESSION, SessionStore
+
+
+def make_store(tmp_path, ttl_seconds=3600):
+    return SessionStore(path=str(tmp_path / "sessions.db"), ttl_seconds=ttl_seconds)
+
+
+def test_values_are_shared_between_instances(tmp_path):
+    make_store(tmp_path).set("s1", "history:a", {"turns": [1, 2]})
+    assert make_store(tmp_path).get("s1", "history:a") == {"turns": [1, 2]}
+
+
+def test_persona_falls_back_to_default_session(tmp_path):
+    store = make_store(tmp_path)
+    assert store.get_persona("s1") is None
+    store.set_persona("기본")
+    assert store.get_persona("s1") == "기본"
+    assert store.get_persona() == "기본"
+    store.set_persona("세션", "s1")
+    assert store.get_persona("s1") == "세션"
+    assert store.get(DEFAULT_SESSION, "persona") == "기본"
+
+
+def test_delete_returns_row_count(tmp_path):
+    store = make_store(tmp_path)
+    store.set("s1", "a", 1)
+    store.set("s1", "b", 2)
+    assert store.delete("s1", "a") == 1
+    assert store.delete("s1", "a") == 0
+    assert store.delete("s1") == 1
+
+
+def test_delete_prefix_is_literal_and_per_session(tmp_path):
+    store = make_store(tmp_path)
+    for key in ("history:a", "history:b_c", "historyX", "persona"):
+        store.set("s1", key, 1)
+    store.set("s2", "history:a", 1)
+
+    # "_"나 "%"도 LIKE 패턴이 아니라 글자 그대로 비교
+    assert store.delete_prefix("s1", "history:b_") == 1
+    assert store.delete_prefix("s1", "history:") == 1
+    assert store.get("s1", "historyX") == 1
+    assert store.get("s1", "persona") == 1
+    assert store.get("s2", "history:a") == 1
+
+
+def test_expired_values_are_hidden_and_purged(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=1)
+    store.set("s1", "a", 1)
+    store.set_persona("기본")
+    with store._connect() as connection:
+        connection.execute("UPDATE sessions SET updated_at = ?", (time.time() - 10,))
+
+    assert store.get("s1", "a") is None
+    assert store.purge_expired() == 1
+    # 기본 세션은 만료 정리 대상이 아님
+    with store._connect() as connection:
+        assert connection.execute("SELECT COUNT(*) FROM sessions").fetchone()[0] == 1
+
+
+def test_default_session_never_expires(tmp_path):
+    store = make_store(tmp_path, ttl_seconds=1)
+    store.set_persona("기본")
+    store.set_persona("세션", "s1")
+    with store._connect() as connection:
+        connection.execute("UPDATE sessions SET updated_at = ?", (time.time() - 10,))
+
+    # 오래 바뀌지 않아도 모든 워커가 같은 기본 페르소나를 봄
+    assert store.get_persona() == "기본"
+    assert store.get_persona("s1") == "기본"
+    assert store.get(DEFAULT_SESSION, "persona") == "기본"
+
+
+def test_memory_database(tmp_path):
+    store = SessionStore(path=":memory:")
+    store.set("s1", "a", [1])
+    assert store.get("s1", "a") == [1]
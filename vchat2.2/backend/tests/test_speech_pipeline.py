@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from modules.admission import OverloadedError
+from modules.speech_pipeline import SentenceSplitter, pipeline_events
+
+
+def test_cuts_at_sentence_end_followed_by_space():
+    splitter = SentenceSplitter()
+    assert splitter.feed("안녕하세요 반가워요! 오늘") == ["안녕하세요 반가워요!"]
+    assert splitter.flush() == "오늘"
+
+
+def test_waits_when_punctuation_ends_the_buffer():
+    # 다음 델타에서 "!"가 이어질 수 있으므로 공백이 올 때까지 자르지 않음
+    splitter = SentenceSplitter()
+    assert splitter.feed("정말 재밌었어요!") == []
+    assert splitter.feed("! 다음에") == ["정말 재밌었어요!!"]
+
+
+def test_short_sentence_is_merged_with_the_next():
+    splitter = SentenceSplitter(min_chars=8)
+    assert splitter.feed("응! 그래서 말이야. 그리고") == ["응! 그래서 말이야."]
+
+
+def test_sentences_across_many_deltas():
+    splitter = SentenceSplitter(min_chars=1)
+    sentences = []
+    for delta in ["오늘 ", "날씨 ", "좋다. ", "산책 ", "갈래? ", "응"]:
+        sentences += splitter.feed(delta)
+    assert sentences == ["오늘 날씨 좋다.", "산책 갈래?"]
+    assert splitter.flush() == "응"
+    assert splitter.flush() == ""
+
+
+def test_long_text_without_punctuation_is_cut_at_space():
+    splitter = SentenceSplitter(max_chars=15)
+    assert splitter.feed("가" * 10 + " " + "나" * 10) == ["가" * 10]
+    assert splitter.flush() == "나" * 10
+
+
+def test_long_text_without_space_is_cut_at_max_chars():
+    splitter = SentenceSplitter(max_chars=10)
+    assert splitter.feed("가" * 25) == ["가" * 10, "가" * 10]
+    assert splitter.flush() == "가" * 5
+
+
+async def stream(*deltas):
+    for delta in deltas:
+        yield delta
+
+
+def collect(deltas, synthesize, max_parallel=2):
+    async def run():
+        return [event async for event in pipeline_events(deltas, synthesize, max_parallel)]
+    return asyncio.run(run())
+
+
+DELTAS = ("첫 번째 문장이야. ", "두 번째 문장이야. ", "세 번째")
+
+
+def test_pipeline_keeps_sentence_order():
+    def synthesize(sentence):
+        # 앞 문장이 더 늦게 끝나도 결과는 문장 순서대로
+        time.sleep(0.05 if sentence.startswith("첫") else 0)
+        return f"url:{sentence}"
+
+    events = collect(stream(*DELTAS), synthesize)
+    assert [event[1] for event in events if event[0] == "delta"] == list(DELTAS)
+    sentences = [event[1:] for event in events if event[0] == "sentence"]
+    assert sentences == [
+        (0, "첫 번째 문장이야.", "url:첫 번째 문장이야."),
+        (1, "두 번째 문장이야.", "url:두 번째 문장이야."),
+        (2, "세 번째", "url:세 번째"),
+    ]
+
+
+def test_failed_sentence_yields_none():
+    def synthesize(sentence):
+        if sentence.startswith("두"):
+            raise RuntimeError("tts failed")
+        return "url"
+
+    results = [event[3] for event in collect(stream(*DELTAS), synthesize) if event[0] == "sentence"]
+    assert results == ["url", None, "url"]
+
+
+def test_overloaded_synthesis_is_raised_to_caller():
+    lock = threading.Lock()
+    calls = []
+
+    def synthesize(sentence):
+        with lock:
+            calls.append(sentence)
+        if sentence.startswith("두"):
+            raise OverloadedError("tts", retry_after=3, reason="upstream_429")
+        return "url"
+
+    received = []
+
+    async def run():
+        async for event in pipeline_events(stream(*DELTAS), synthesize, 1):
+            received.append(event)
+
+    with pytest.raises(OverloadedError) as rejected:
+        asyncio.run(run())
+    assert rejected.value.retry_after == 3
+    sentences = [event for event in received if event[0] == "sentence"]
+    assert sentences == [("sentence", 0, "첫 번째 문장이야.", "url")]
@@ -0,0 +1,115 @@
+import json
+import threading
+import time
+
+import pytest
+
+import main
+from modules.persona_manager import PersonaManager
+
+PERSONAS = {"테스트": {"name": "테스트", "url": "https://example.com", "persona_data": {}, "few_shot_examples": []}}
+
+
+@pytest.fixture
+def app_state(monkeypatch, tmp_path):
+    """로컬 백업 파일을 쓰는 새 PersonaManager와 초기 준비 상태로 main을 바꿈 (Firestore / 예열은 테스트에서 지정)"""
+    backup = tmp_path / "personas.json"
+    manager = PersonaManager(personas_file=str(backup), auto_load=False)
+    manager.db = None
+    monkeypatch.setattr(main, "persona_manager", manager)
+    monkeypatch.setattr(main, "readiness", {"personas": "pending", "firestore": "pending", "services": "pending"})
+    monkeypatch.setattr(main, "startup_report", {"import_seconds": 0.0})
+    monkeypatch.setattr(main.session_store, "get_persona", lambda session_id=None: None)
+
+    async def shutdown_sequence():
+        # 공용 스레드 풀 / 클라이언트는 다른 테스트도 쓰므로 백그라운드 작업만 정리
+        for task in list(main.background_tasks):
+            task.cancel()
+        main.audio_store.stop_sweeper()
+
+    monkeypatch.setattr(main, "shutdown_sequence", shutdown_sequence)
+    released = threading.Event()
+    yield manager, backup, released
+    released.set()
+
+
+def wait_for_status(client, status_code, seconds=3):
+    deadline = time.monotonic() + seconds
+    while True:
+        response = client.get("/readyz")
+        if response.status_code == status_code or time.monotonic() > deadline:
+            return response
+        time.sleep(0.02)
+
+
+def test_readyz_is_503_until_warm_up_finishes(app_state, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    manager, backup, released = app_state
+    backup.write_text(json.dumps(PERSONAS, ensure_ascii=False), encoding="utf-8")
+    monkeypatch.setattr(manager, "sync_from_firebase", lambda: False)
+    monkeypatch.setattr(main, "warm_up_services", lambda: released.wait(5))
+
+    with TestClient(main.app) as client:
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["status"] == "starting"
+        assert response.json()["checks"]["personas"] == "local"
+        assert response.json()["checks"]["services"] == "pending"
+        assert client.get("/healthz").status_code == 200
+
+        released.set()
+        response = wait_for_status(client, 200)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["checks"]["services"] == "ready"
+        assert response.json()["personas"] == 1
+        assert "warmup_seconds" in response.json()["startup"]
+
+
+def test_firestore_timeout_still_serves_local_backup(app_state, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    manager, backup, released = app_state
+    backup.write_text(json.dumps(PERSONAS, ensure_ascii=False), encoding="utf-8")
+    # Firestore 동기화가 제한 시간 안에 끝나지 않음
+    monkeypatch.setattr(manager, "sync_from_firebase", lambda: released.wait(5))
+    monkeypatch.setattr(main, "FIRESTORE_SYNC_TIMEOUT", 0.1)
+    monkeypatch.setattr(main, "warm_up_services", lambda: True)
+
+    with TestClient(main.app) as client:
+        response = wait_for_status(client, 200)
+        assert response.status_code == 200
+        deadline = time.monotonic() + 3
+        while client.get("/readyz").json()["checks"]["firestore"] == "pending" and time.monotonic() < deadline:
+            time.sleep(0.02)
+        checks = client.get("/readyz").json()["checks"]
+        assert checks == {"personas": "local", "firestore": "timeout", "services": "ready"}
+
+        personas = client.get("/api/personas").json()
+        assert personas["personas"] == ["테스트"]
+        assert personas["current_persona"] == "테스트"
+
+
+def test_without_backup_waits_for_firestore(app_state, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    manager, backup, released = app_state
+
+    def sync_from_firebase():
+        released.wait(5)
+        manager._set_personas_data(dict(PERSONAS))
+        return True
+
+    monkeypatch.setattr(manager, "sync_from_firebase", sync_from_firebase)
+    monkeypatch.setattr(main, "warm_up_services", lambda: True)
+
+    with TestClient(main.app) as client:
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["checks"]["personas"] == "pending"
+
+        released.set()
+        response = wait_for_status(client, 200)
+        assert response.status_code == 200
+        assert response.json()["checks"] == {"personas": "firestore", "firestore": "synced", "services": "ready"}
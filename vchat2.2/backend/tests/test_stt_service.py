@@ -0,0 +1,134 @@
+import io
+from types import SimpleNamespace
+
+import pytest
+
+from modules import admission, resilience, stt_service
+from modules.resilience import RetryPolicy
+from modules.stt_service import AudioTooLargeError, RealTimeSTT, max_upload_bytes, read_audio_stream, spool_stream
+
+KB = 1024
+
+
+class NonSeekable(io.RawIOBase):
+    """업로드 본문처럼 되감을 수 없는 스트림 (읽은 양 기록)"""
+
+    def __init__(self, data):
+        self.data = io.BytesIO(data)
+        self.consumed = 0
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        chunk = self.data.read(size)
+        self.consumed += len(chunk)
+        return chunk
+
+
+class FakeClient:
+    """transcriptions.create에 넘어온 파일 내용과 디스크 전환 여부를 기록하는 OpenAI 클라이언트"""
+
+    def __init__(self):
+        self.calls = []
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self.create))
+
+    def create(self, file, **kwargs):
+        filename, content = file
+        self.calls.append({
+            "filename": filename,
+            "data": content.read(),
+            "on_disk": getattr(content, "_rolled", False),
+        })
+        return SimpleNamespace(text="안녕하세요")
+
+
+@pytest.fixture
+def stt(monkeypatch):
+    monkeypatch.setitem(resilience._policies, "stt", RetryPolicy(attempts=1, deadline=5.0))
+    monkeypatch.setitem(admission._limiters, "stt", admission.UpstreamLimiter("stt"))
+    return RealTimeSTT(client=FakeClient())
+
+
+def test_max_upload_bytes_from_env(monkeypatch):
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "0.5")
+    assert max_upload_bytes() == 512 * KB
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "abc")
+    assert max_upload_bytes() == 25 * 1024 * KB
+
+
+def test_spool_stays_in_memory_below_threshold():
+    with spool_stream(NonSeekable(b"a" * KB), max_bytes=10 * KB) as spool:
+        assert not spool._rolled
+        assert spool.read() == b"a" * KB
+
+
+def test_spool_moves_to_disk_above_threshold(monkeypatch):
+    monkeypatch.setattr(stt_service, "SPOOL_MEMORY_BYTES", 4 * KB)
+    with spool_stream(NonSeekable(b"a" * 8 * KB), max_bytes=10 * KB) as spool:
+        assert spool._rolled
+        assert spool.read() == b"a" * 8 * KB
+
+
+def test_limit_stops_reading_early():
+    stream = NonSeekable(b"a" * 1024 * KB)
+    with pytest.raises(AudioTooLargeError):
+        spool_stream(stream, max_bytes=100 * KB)
+    # 제한을 넘은 청크까지만 읽고 중단
+    assert stream.consumed <= 100 * KB + stt_service.READ_CHUNK_SIZE
+    with pytest.raises(AudioTooLargeError):
+        read_audio_stream(NonSeekable(b"a" * 200 * KB), max_bytes=100 * KB)
+
+
+def test_transcribe_stream_spools_non_seekable_to_disk(stt, monkeypatch):
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "1")
+    monkeypatch.setattr(stt_service, "SPOOL_MEMORY_BYTES", 64 * KB)
+    data = b"b" * 200 * KB
+    assert stt.transcribe_stream(NonSeekable(data), "upload.webm") == "안녕하세요"
+    call = stt.client.calls[0]
+    assert call == {"filename": "upload.webm", "data": data, "on_disk": True}
+
+
+def test_transcribe_stream_passes_seekable_stream_through(stt, monkeypatch):
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "1")
+    stream = io.BytesIO(b"c" * 10 * KB)
+    assert stt.transcribe_stream(stream) == "안녕하세요"
+    assert stt.client.calls[0]["data"] == b"c" * 10 * KB
+
+
+@pytest.mark.parametrize("stream_type", [io.BytesIO, NonSeekable])
+def test_transcribe_stream_rejects_over_env_limit(stt, monkeypatch, stream_type):
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "0.01")
+    with pytest.raises(AudioTooLargeError):
+        stt.transcribe_stream(stream_type(b"d" * 20 * KB))
+    with pytest.raises(AudioTooLargeError):
+        stt.transcribe_bytes(b"d" * 20 * KB)
+    assert stt.client.calls == []
+
+
+@pytest.fixture
+def client(stt, monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+
+    monkeypatch.setattr(main, "get_stt_service", lambda: stt)
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("preprocess", ["0", "1"])
+def test_upload_over_limit_returns_413(client, monkeypatch, preprocess):
+    monkeypatch.setenv("VCHAT_STT_PREPROCESS", preprocess)
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "0.01")
+    response = client.post("/api/speech/upload", files={"file": ("a.webm", b"e" * 20 * KB, "audio/webm")})
+    assert response.status_code == 413
+    assert "너무 큽니다" in response.json()["detail"]
+
+
+def test_upload_within_limit_is_transcribed(client, stt, monkeypatch):
+    monkeypatch.setenv("VCHAT_STT_PREPROCESS", "0")
+    monkeypatch.setenv("VCHAT_MAX_UPLOAD_MB", "1")
+    response = client.post("/api/speech/upload", files={"file": ("a.webm", b"f" * 20 * KB, "audio/webm")})
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "transcription": "안녕하세요"}
+    assert stt.client.calls[0]["filename"] == "upload.webm"
+    assert stt.client.calls[0]["data"] == b"f" * 20 * KB
@@ -0,0 +1,106 @@
+import json
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from modules.tracing import JsonlSpanExporter, Trace, TracingMiddleware, _current_trace, record_span, span
+
+
+def run_traced(func):
+    trace = Trace("test")
+    token = _current_trace.set(trace)
+    try:
+        func()
+    finally:
+        _current_trace.reset(token)
+    return trace
+
+
+def test_span_without_trace_is_noop():
+    with span("llm"):
+        pass
+    record_span("llm_first_token", 0.1)
+
+
+def test_nested_spans_and_errors():
+    def work():
+        with span("outer"):
+            with span("inner", sentence=1):
+                pass
+            try:
+                with span("failing"):
+                    raise RuntimeError("x")
+            except RuntimeError:
+                pass
+
+    spans = {record["name"]: record for record in run_traced(work).spans()}
+    assert spans["outer"]["parent_id"] is None
+    assert spans["inner"]["parent_id"] == spans["outer"]["span_id"]
+    assert spans["inner"]["attributes"] == {"sentence": 1}
+    assert spans["failing"]["error"] == "RuntimeError"
+
+
+def test_server_timing_sums_repeated_spans():
+    def work():
+        record_span("tts", 0.1)
+        record_span("tts", 0.2)
+        record_span("llm", 0.5)
+
+    parts = run_traced(work).server_timing().split(", ")
+    assert parts[0] == 'tts;dur=300.0;desc="x2"'
+    assert parts[1] == "llm;dur=500.0"
+    assert parts[2].startswith("total;dur=")
+
+
+def test_middleware_adds_headers_and_writes_jsonl(tmp_path):
+    trace_file = tmp_path / "trace.jsonl"
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        with span("llm"):
+            pass
+        return {"ok": True}
+
+    traced = TracingMiddleware(app, trace_file=str(trace_file))
+    response = TestClient(traced).get("/work")
+    assert "llm;dur=" in response.headers["server-timing"]
+    trace_id = response.headers["x-trace-id"]
+    traced.exporter.close()
+
+    records = [json.loads(line) for line in trace_file.read_text(encoding='utf-8').splitlines()]
+    assert [record["name"] for record in records] == ["http", "llm"]
+    assert all(record["trace_id"] == trace_id for record in records)
+    assert records[0]["attributes"] == {"method": "GET", "path": "/work", "status": 200}
+
+
+class BlockingExporter(JsonlSpanExporter):
+    """첫 기록에서 멈춰 대기열이 차는 상황을 만드는 기록기"""
+
+    def __init__(self, path, max_pending):
+        super().__init__(path, max_pending=max_pending)
+        self.writing = threading.Event()
+        self.release = threading.Event()
+
+    def _write(self, batch):
+        self.writing.set()
+        self.release.wait(5)
+        super()._write(batch)
+
+
+def test_exporter_drops_when_queue_is_full(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    exporter = BlockingExporter(str(path), max_pending=1)
+    root = {"span_id": "r", "parent_id": None, "name": "http", "start_ms": 0.0, "duration_ms": 1.0}
+
+    exporter.export(Trace("a"), root)
+    assert exporter.writing.wait(5)
+    exporter.export(Trace("b"), root)  # 대기열 1칸
+    exporter.export(Trace("c"), root)  # 가득 참 → 버림
+    assert exporter.dropped == 1
+
+    exporter.release.set()
+    exporter.flush()
+    assert len(path.read_text(encoding='utf-8').splitlines()) == 2
+    exporter.close()
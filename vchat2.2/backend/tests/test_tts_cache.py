@@ -0,0 +1,61 @@
+import os
+
+from modules.tts_cache import TTSCache
+
+
+def make_cache(tmp_path, memory_budget=10, disk_budget=0):
+    return TTSCache(cache_dir=str(tmp_path), memory_budget=memory_budget, disk_budget=disk_budget)
+
+
+def test_key_changes_with_every_setting():
+    key = TTSCache.make_key("voice", "model", {"stability": 0.5}, "안녕")
+    assert key == TTSCache.make_key("voice", "model", {"stability": 0.5}, "안녕")
+    assert key != TTSCache.make_key("voice", "model", {"stability": 0.6}, "안녕")
+    assert key != TTSCache.make_key("other", "model", {"stability": 0.5}, "안녕")
+    assert key != TTSCache.make_key("voice", "model", {"stability": 0.5}, "안녕!")
+
+
+def test_memory_lru_evicts_least_recently_used(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=10)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    assert cache.get("a") == b"aaaa"  # a를 최근 사용으로
+    cache.put("c", b"cccc")           # 12바이트 > 10 → 오래된 b 제거
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"aaaa"
+    assert cache.get("c") == b"cccc"
+    stats = cache.stats()
+    assert stats["evictions"] == 1
+    assert stats["memory_bytes"] == 8
+    assert (stats["hits"], stats["misses"]) == (3, 1)
+
+
+def test_entry_larger_than_budget_is_not_kept_in_memory(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=4)
+    cache.put("big", b"0123456789")
+    assert cache.get("big") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_disk_hit_survives_a_new_instance(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=100, disk_budget=100)
+    cache.put("k", b"audio")
+
+    reopened = make_cache(tmp_path, memory_budget=100, disk_budget=100)
+    assert reopened.get("k") == b"audio"
+    assert reopened.stats()["disk_hits"] == 1
+    assert reopened.get("k") == b"audio"
+    assert reopened.stats()["memory_hits"] == 1
+
+
+def test_disk_budget_evicts_oldest_file(tmp_path):
+    cache = make_cache(tmp_path, memory_budget=0, disk_budget=8)
+    cache.put("a", b"aaaa")
+    cache.put("b", b"bbbb")
+    cache.put("c", b"cccc")
+
+    assert not os.path.exists(tmp_path / "a.mp3")
+    assert cache.get("a") is None
+    assert cache.get("c") == b"cccc"
+    assert cache.stats()["disk_bytes"] == 8
@@ -0,0 +1,123 @@
+from types import SimpleNamespace
+
+import pytest
+
+from modules import admission, resilience
+from modules.admission import OverloadedError, UpstreamLimiter
+from modules.metrics import STAGE_ERRORS
+from modules.resilience import RetryPolicy
+from modules.tts_cache import TTSCache
+from modules.tts_service import VoiceConverter
+
+
+class FakeApiError(Exception):
+    """ElevenLabs SDK의 ApiError처럼 status_code / headers를 가진 오류"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status_code: {status_code}, body: error")
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeTextToSpeech:
+    """요청마다 미리 정한 결과(청크 목록 또는 첫 청크에서 낼 오류)를 돌려주는 가짜 SDK"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.calls = 0
+
+    def convert(self, **kwargs):
+        result = self.results[min(self.calls, len(self.results) - 1)]
+        self.calls += 1
+
+        # SDK처럼 첫 청크를 요청할 때 실제 호출
+        def chunks():
+            if isinstance(result, Exception):
+                raise result
+            yield from result
+
+        return chunks()
+
+
+@pytest.fixture(autouse=True)
+def fast_tts_upstream(monkeypatch):
+    # 재시도 대기를 줄이고, 429로 멈춘 입장 제어가 다른 테스트에 남지 않도록 테스트마다 새로 만듦
+    monkeypatch.setitem(resilience._policies, "tts", RetryPolicy(attempts=2, base_delay=0.001, max_delay=0.01,
+                                                                  deadline=5.0))
+    monkeypatch.setitem(admission._limiters, "tts", UpstreamLimiter("tts", max_concurrency=2, max_queue=2))
+
+
+def make_converter(*results, cache=False):
+    tts = FakeTextToSpeech(*results)
+    client = SimpleNamespace(text_to_speech=tts)
+    return VoiceConverter(client=client, cache=cache), tts
+
+
+def tts_errors(error):
+    return sum(value for key, value in STAGE_ERRORS._values.items() if key[0] == "tts" and key[3] == error)
+
+
+def test_returns_audio_with_first_chunk_prefetched():
+    converter, tts = make_converter([b"a", b"b", b"c"])
+    audio = converter.convert_text_to_speech("안녕")
+    assert tts.calls == 1  # 반환 전에 이미 요청함
+    assert b"".join(audio) == b"abc"
+
+
+def test_rejected_key_returns_none_and_records_one_error():
+    converter, tts = make_converter(FakeApiError(401))
+    before = tts_errors("FakeApiError")
+    assert converter.convert_text_to_speech("안녕") is None
+    assert tts.calls == 1  # 401은 재시도하지 않음
+    assert tts_errors("FakeApiError") == before + 1
+
+
+def test_upstream_429_on_first_chunk_raises_overloaded():
+    converter, tts = make_converter(FakeApiError(429))
+    with pytest.raises(OverloadedError) as rejected:
+        converter.convert_text_to_speech("안녕")
+    assert rejected.value.reason == "upstream_429"
+    assert tts.calls == 2  # 재시도 후 포기
+    assert admission._limiters["tts"].stats()["in_flight"] == 0
+
+
+def test_transient_error_is_retried_before_audio_starts():
+    converter, tts = make_converter(FakeApiError(503), [b"ok"])
+    assert b"".join(converter.convert_text_to_speech("안녕")) == b"ok"
+    assert tts.calls == 2
+
+
+def test_empty_upstream_audio_returns_none():
+    converter, _ = make_converter([])
+    assert converter.convert_text_to_speech("안녕") is None
+    assert admission._limiters["tts"].stats()["in_flight"] == 0
+
+
+def test_slot_is_released_when_audio_is_abandoned():
+    converter, _ = make_converter([b"a", b"b"])
+    audio = converter.convert_text_to_speech("안녕")
+    assert admission._limiters["tts"].stats()["in_flight"] == 1
+    audio.close()
+    assert admission._limiters["tts"].stats()["in_flight"] == 0
+
+
+def test_completed_audio_is_cached(tmp_path):
+    cache = TTSCache(cache_dir=str(tmp_path), memory_budget=1024, disk_budget=0)
+    converter, tts = make_converter([b"a", b"b"], cache=cache)
+    assert b"".join(converter.convert_text_to_speech("안녕")) == b"ab"
+    assert b"".join(converter.convert_text_to_speech("안녕")) == b"ab"
+    assert tts.calls == 1
+
+
+def test_synthesize_segment_handles_upstream_failure():
+    import main
+
+    converter, _ = make_converter(FakeApiError(401))
+    assert main.synthesize_segment("안녕", converter) is None
+
+    converter, _ = make_converter([b"mp3"])
+    assert main.synthesize_segment("안녕", converter).startswith("/api/audio/")
+
+    converter, _ = make_converter(FakeApiError(429))
+    with pytest.raises(OverloadedError):
+        main.synthesize_segment("안녕", converter)
@@ -0,0 +1,110 @@
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from modules import admission, resilience
+from modules.admission import OverloadedError
+from modules.resilience import RetryPolicy
+from modules.vchat_bot import FALLBACK_RESPONSE, VChatBot
+
+
+def chunk(content=None, usage=None):
+    choices = [] if content is None else [SimpleNamespace(delta=SimpleNamespace(content=content))]
+    return SimpleNamespace(choices=choices, usage=usage)
+
+
+class FakeStream:
+    """업스트림 스트림 (닫혔는지 기록)"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.finished = threading.Event()
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        try:
+            for item in self.chunks:
+                yield item
+            self.finished.set()
+        finally:
+            self.closed.set()
+
+
+class FakeClient:
+    """chat.completions.create(stream=True)가 정해진 스트림 또는 오류를 돌려주는 OpenAI 클라이언트"""
+
+    def __init__(self, result):
+        self.result = result
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, **kwargs):
+        assert kwargs["stream"] is True
+        if isinstance(self.result, Exception):
+            raise self.result
+        return iter(self.result)
+
+
+class RateLimited(Exception):
+    status_code = 429
+    headers = {}
+
+
+@pytest.fixture
+def limiter(monkeypatch):
+    monkeypatch.setitem(resilience._policies, "llm", RetryPolicy(attempts=1, deadline=5.0))
+    limiter = admission.UpstreamLimiter("llm", max_concurrency=4)
+    monkeypatch.setitem(admission._limiters, "llm", limiter)
+    return limiter
+
+
+def wait_for(condition, seconds=2):
+    deadline = time.monotonic() + seconds
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_slot_is_released_when_upstream_finishes_before_consumer(limiter):
+    stream = FakeStream([chunk(" 안녕"), chunk("하세요"), chunk(None, usage={"prompt_tokens": 10})])
+    deltas = VChatBot(client=FakeClient(stream)).stream_response("안녕")
+
+    assert next(deltas) == "안녕"
+    # 소비자가 첫 델타에서 멈춰 있어도 업스트림을 끝까지 읽으면 자리를 반납
+    assert stream.finished.wait(2)
+    assert wait_for(lambda: limiter.stats()["in_flight"] == 0)
+    assert list(deltas) == ["하세요"]
+
+
+def test_closing_early_closes_upstream_and_releases_slot(limiter):
+    gate = threading.Event()
+
+    def slow_chunks():
+        yield chunk("하나")
+        gate.wait(2)
+        yield chunk("둘")
+
+    stream = FakeStream(slow_chunks())
+    deltas = VChatBot(client=FakeClient(stream)).stream_response("안녕")
+    assert next(deltas) == "하나"
+    assert limiter.stats()["in_flight"] == 1
+    deltas.close()
+    gate.set()
+    assert stream.closed.wait(2)
+    assert not stream.finished.is_set()
+    assert wait_for(lambda: limiter.stats()["in_flight"] == 0)
+
+
+def test_upstream_429_raises_overloaded(limiter):
+    deltas = VChatBot(client=FakeClient(RateLimited())).stream_response("안녕")
+    with pytest.raises(OverloadedError) as rejected:
+        list(deltas)
+    assert rejected.value.reason == "upstream_429"
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_other_errors_fall_back_before_first_delta(limiter):
+    deltas = VChatBot(client=FakeClient(ValueError("bad request"))).stream_response("안녕")
+    assert list(deltas) == [FALLBACK_RESPONSE]
+    assert limiter.stats()["in_flight"] == 0
@@ -0,0 +1,83 @@
+import struct
+from types import SimpleNamespace
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from modules.stt_service import SpeechSegmenter
+
+RATE = 16000
+
+
+def pcm(amplitude, seconds, rate=RATE):
+    return struct.pack(f"<{int(rate * seconds)}h", *([amplitude] * int(rate * seconds)))
+
+
+@pytest.mark.parametrize("sample_rate, channels", [(0, 1), (-16000, 1), (16000, 0)])
+def test_segmenter_rejects_invalid_settings(sample_rate, channels):
+    with pytest.raises(ValueError):
+        SpeechSegmenter(sample_rate=sample_rate, channels=channels)
+
+
+def test_segmenter_returns_utterance_after_silence():
+    segmenter = SpeechSegmenter(sample_rate=RATE, silence_threshold=0.5)
+    assert segmenter.feed(pcm(0, 0.2)) is None            # 말하기 전 침묵은 버림
+    assert segmenter.feed(pcm(3000, 0.3)) is None
+    assert segmenter.feed(pcm(0, 0.3)) is None
+    utterance = segmenter.feed(pcm(0, 0.3))
+    assert utterance is not None
+    assert len(utterance) == len(pcm(0, 0.9))
+    assert segmenter.flush() is None
+
+
+def test_segmenter_keeps_odd_byte_for_next_frame():
+    segmenter = SpeechSegmenter(sample_rate=RATE)
+    data = pcm(3000, 0.1)
+    assert segmenter.feed(data[:-1]) is None
+    assert segmenter.feed(data[-1:]) is None
+    assert segmenter.flush() == data
+
+
+def test_segmenter_cuts_at_max_duration():
+    segmenter = SpeechSegmenter(sample_rate=RATE, max_duration=0.5)
+    frame = pcm(3000, 0.1)
+    results = [segmenter.feed(frame) for _ in range(10)]
+    utterances = [result for result in results if result is not None]
+    # 침묵 없이 말해도 max_duration 근처에서 잘림 (시간은 프레임 단위로 계산)
+    assert len(utterances) == 1
+    assert len(frame) * 5 <= len(utterances[0]) <= len(frame) * 7
+
+
+@pytest.fixture
+def client(monkeypatch):
+    import main
+    from fastapi.testclient import TestClient
+
+    # 페르소나 / STT 없이 소켓 인자 검증만 확인
+    services = SimpleNamespace(name="test", chatbot=None, tts=None)
+    monkeypatch.setattr(main, "resolve_services", lambda persona=None, session_id=None: services)
+    monkeypatch.setattr(main, "get_stt_service", lambda: None)
+    return TestClient(main.app)
+
+
+@pytest.mark.parametrize("sample_rate", [0, -5, 7999, 96000])
+def test_socket_rejects_unsupported_sample_rate(client, sample_rate):
+    with client.websocket_connect(f"/ws/voice?sample_rate={sample_rate}") as websocket:
+        message = websocket.receive_json()
+        assert message["type"] == "error"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1003
+
+
+def test_socket_rejects_unknown_format(client):
+    with client.websocket_connect("/ws/voice?format=flac") as websocket:
+        assert websocket.receive_json()["type"] == "error"
+        with pytest.raises(WebSocketDisconnect) as closed:
+            websocket.receive_json()
+    assert closed.value.code == 1003
+
+
+def test_socket_accepts_supported_sample_rate(client):
+    with client.websocket_connect("/ws/voice?sample_rate=16000") as websocket:
+        assert websocket.receive_json() == {"type": "ready", "format": "pcm16", "sample_rate": 16000}
@@ -71,7 +71,7 @@ export function useChat({ selectedPersona, onMessagesUpdate }: UseChatProps) {
       const response = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_URL}/api/speech/tts`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ text: lastAssistantMessage.content }),
+        body: JSON.stringify({ text: lastAssistantMessage.content, persona: selectedPersona }),
       })
 
       const data = await response.json()
@@ -82,7 +82,7 @@ export function useChat({ selectedPersona, onMessagesUpdate }: UseChatProps) {
     } catch (error) {
       console.error("TTS error:", error)
     }
-  }, [messages])
+  }, [messages, selectedPersona])
 
   return {
     messages,